@@ -0,0 +1,7 @@
+"""
+Local benchmarks for the review API.
+
+Run from REVIEW-APP-BACKEND with ``python -m benchmarks.run --help``.
+Everything happens against a throwaway test database; no external
+services are needed.
+"""
@@ -0,0 +1,111 @@
+"""
+Compare the async read endpoints under ASGI with the sync ones under WSGI.
+
+Start both servers against the same database, e.g.
+
+    uvicorn peerreview.asgi:application --port 8001 --workers 1
+    gunicorn peerreview.wsgi:application --bind 127.0.0.1:8002 --workers 1 --threads 8
+
+then run
+
+    python -m benchmarks.asgi_vs_wsgi --username alice --password secret \
+        --cycle 3 --concurrency 1 8 32 --requests 400
+
+Each endpoint is hit with the given number of concurrent clients; the
+ASGI server is exercised on ``/api/async/...`` and the WSGI server on the
+matching synchronous route.  The user must be a staff member of the
+cycle's group so every endpoint (including results) answers 200.  Only
+the standard library is used on the client side so the numbers are not
+skewed by client dependencies.
+"""
+import argparse
+import json
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+ENDPOINTS = [
+    ("review-cycle/list/", "review-cycle/list/"),
+    ("users/list/", "users/list/"),
+    ("metrics/list/", "metrics/list/"),
+    ("review-cycle/participants/{cycle}/", "review-cycle/participants/{cycle}/"),
+    ("review-cycle/{cycle}/results/", "review-cycle/{cycle}/results/"),
+]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--asgi", default="http://127.0.0.1:8001")
+    parser.add_argument("--wsgi", default="http://127.0.0.1:8002")
+    parser.add_argument("--username", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--cycle", type=int, required=True, help="Review cycle id the user belongs to")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=400, help="Requests per endpoint and concurrency level")
+    parser.add_argument("--output", help="Optional JSON file for the results")
+    return parser.parse_args(argv)
+
+
+def obtain_token(base_url, username, password):
+    request = urllib.request.Request(
+        f"{base_url}/api/auth/token/",
+        data=json.dumps({"username": username, "password": password}).encode(),
+        headers={"Content-Type": "application/json"},
+    )
+    with urllib.request.urlopen(request) as response:
+        return json.load(response)["access"]
+
+
+def fetch(url, token):
+    request = urllib.request.Request(url, headers={"Authorization": f"Bearer {token}"})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as error:
+        status = error.code
+    return status, (time.perf_counter() - start) * 1000
+
+
+def load(url, token, concurrency, total):
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        start = time.perf_counter()
+        results = list(pool.map(lambda _: fetch(url, token), range(total)))
+        elapsed = time.perf_counter() - start
+    latencies = sorted(latency for _, latency in results)
+    errors = sum(1 for status, _ in results if status != 200)
+    return {
+        "throughput_rps": total / elapsed,
+        "p50_ms": latencies[len(latencies) // 2],
+        "p95_ms": latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)],
+        "errors": errors,
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    token = obtain_token(args.wsgi, args.username, args.password)
+
+    report = []
+    print(f"{'endpoint':<40} {'conc':>4} {'wsgi rps':>10} {'asgi rps':>10} {'gain':>6} {'wsgi p95':>9} {'asgi p95':>9}")
+    for async_path, sync_path in ENDPOINTS:
+        for concurrency in args.concurrency:
+            wsgi = load(f"{args.wsgi}/api/{sync_path.format(cycle=args.cycle)}", token, concurrency, args.requests)
+            asgi = load(f"{args.asgi}/api/async/{async_path.format(cycle=args.cycle)}", token,
+                        concurrency, args.requests)
+            gain = asgi["throughput_rps"] / wsgi["throughput_rps"]
+            print(f"{sync_path:<40} {concurrency:>4} {wsgi['throughput_rps']:>10.1f} {asgi['throughput_rps']:>10.1f} "
+                  f"{gain:>5.2f}x {wsgi['p95_ms']:>8.1f}ms {asgi['p95_ms']:>8.1f}ms")
+            report.append({"endpoint": sync_path, "concurrency": concurrency, "wsgi": wsgi, "asgi": asgi})
+
+    if args.output:
+        with open(args.output, "w") as handle:
+            json.dump(report, handle, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+# benchmarks/generator.py
+import random
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+
+from django.contrib.auth.models import Group, User
+from django.utils import timezone
+
+from review.aggregates import rebuild_aggregates
+from review.models import Metric, Rating, ReviewCycle, SubmissionStatus
+from review.submissions import reviewer_token
+
+BENCH_PASSWORD = "bench-password"
+
+
+@dataclass
+class Org:
+    groups: list = field(default_factory=list)
+    members: dict = field(default_factory=dict)  # group id -> [user ids]
+    metrics: list = field(default_factory=list)
+    cycles: dict = field(default_factory=dict)  # group id -> [cycle ids]
+    login_user: User = None
+    rating_count: int = 0
+
+
+def generate_org(groups=5, users=40, metrics=8, cycles=4, finalized_ratio=0.6, seed=1):
+    """
+    Build a synthetic organisation with bulk inserts.
+
+    ``users`` members are created per group, every cycle gets all
+    ``metrics`` linked, and the last cycle of each group is left open
+    while earlier ones are populated with all-pairs ratings from
+    ``finalized_ratio`` of the members.  Everything is derived from
+    ``seed`` so runs are comparable.
+    """
+    rng = random.Random(seed)
+    org = Org()
+
+    org.login_user = User.objects.create_user(username="bench-login", password=BENCH_PASSWORD, is_staff=True)
+    org.metrics = [m.id for m in Metric.objects.bulk_create(
+        [Metric(name=f"Metric {index}", description="Synthetic") for index in range(metrics)]
+    )]
+
+    created_groups = Group.objects.bulk_create([Group(name=f"Bench group {index}") for index in range(groups)])
+    org.groups = [group.id for group in created_groups]
+
+    created_users = User.objects.bulk_create([
+        User(username=f"bench-{g}-{u}", email=f"bench-{g}-{u}@example.com", password="!")
+        for g in range(groups) for u in range(users)
+    ])
+    memberships = []
+    for index, group in enumerate(created_groups):
+        member_ids = [user.id for user in created_users[index * users:(index + 1) * users]]
+        org.members[group.id] = member_ids
+        memberships += [User.groups.through(user_id=user_id, group_id=group.id) for user_id in member_ids]
+    memberships.append(User.groups.through(user_id=org.login_user.id, group_id=created_groups[0].id))
+    org.members[created_groups[0].id].append(org.login_user.id)
+    User.groups.through.objects.bulk_create(memberships, batch_size=1000)
+
+    start = date(2025, 1, 6)
+    created_cycles = []
+    for group in created_groups:
+        for index in range(cycles):
+            created_cycles.append(ReviewCycle(
+                name=f"Sprint {index + 1}",
+                group=group,
+                start_date=start + timedelta(weeks=2 * index),
+                end_date=start + timedelta(weeks=2 * index + 2),
+                is_active=True,
+            ))
+    created_cycles = ReviewCycle.objects.bulk_create(created_cycles)
+    Metric.review_cycles.through.objects.bulk_create([
+        Metric.review_cycles.through(metric_id=metric_id, reviewcycle_id=cycle.id)
+        for cycle in created_cycles for metric_id in org.metrics
+    ], batch_size=1000)
+
+    ratings = []
+    statuses = []
+    now = timezone.now()
+    for cycle in created_cycles:
+        org.cycles.setdefault(cycle.group_id, []).append(cycle.id)
+    for group_id, cycle_ids in org.cycles.items():
+        member_ids = org.members[group_id]
+        for cycle_id in cycle_ids[:-1]:
+            reviewers = rng.sample(member_ids, int(len(member_ids) * finalized_ratio))
+            for reviewer_id in reviewers:
+                statuses.append(SubmissionStatus(user_id=reviewer_id, review_cycle_id=cycle_id,
+                                                 finalized=True, finalized_at=now))
+                for target_id in member_ids:
+                    is_self_review = reviewer_id == target_id
+                    token = None if is_self_review else reviewer_token(cycle_id, reviewer_id, target_id)
+                    for metric_id in org.metrics:
+                        ratings.append(Rating(
+                            review_cycle_id=cycle_id,
+                            reviewer_token=token,
+                            target_user_id=target_id,
+                            metric_id=metric_id,
+                            value=rng.randint(1, 5),
+                            is_self_review=is_self_review,
+                        ))
+            if len(ratings) > 20000:
+                org.rating_count += len(Rating.objects.bulk_create(ratings, batch_size=1000))
+                ratings = []
+    org.rating_count += len(Rating.objects.bulk_create(ratings, batch_size=1000))
+    SubmissionStatus.objects.bulk_create(statuses, batch_size=1000)
+    rebuild_aggregates()
+    return org
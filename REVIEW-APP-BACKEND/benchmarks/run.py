@@ -0,0 +1,145 @@
+"""
+Run the API benchmark scenarios against a synthetic organisation.
+
+    python -m benchmarks.run --groups 5 --users 40 --metrics 8 --cycles 4 \
+        --iterations 50 --output bench.json --baseline benchmarks/baseline.json
+
+Results are written as JSON.  With ``--baseline`` every scenario is
+compared against a previous result file and the command exits non-zero
+if p95 latency grew by more than ``--tolerance`` or the query count went up.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import django
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--groups", type=int, default=5)
+    parser.add_argument("--users", type=int, default=40, help="Members per group")
+    parser.add_argument("--metrics", type=int, default=8)
+    parser.add_argument("--cycles", type=int, default=4, help="Cycles per group")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--scenario", action="append", dest="scenarios",
+                        help="Only run the named scenario (repeatable)")
+    parser.add_argument("--output", default="bench_output.json")
+    parser.add_argument("--baseline", help="Previous result file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed relative p95 slowdown before a scenario counts as regressed")
+    return parser.parse_args(argv)
+
+
+def run_scenario(scenario, iterations, warmup):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from review.profiling import percentile
+
+    scenario.setup()
+    for _ in range(warmup):
+        scenario.before_each()
+        scenario.request()
+
+    latencies = []
+    queries = []
+    for _ in range(iterations):
+        scenario.before_each()
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            response = scenario.request()
+            latencies.append((time.perf_counter() - start) * 1000)
+        if response.status_code != scenario.expected_status:
+            raise RuntimeError(f"{scenario.name}: expected {scenario.expected_status}, "
+                               f"got {response.status_code}: {response.content[:200]!r}")
+        queries.append(len(captured.captured_queries))
+
+    latencies.sort()
+    return {
+        "iterations": iterations,
+        "throughput_rps": iterations / (sum(latencies) / 1000),
+        "mean_ms": sum(latencies) / len(latencies),
+        "p50_ms": percentile(latencies, 0.50),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+        "queries": max(queries),
+    }
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if previous is None:
+            continue
+        if current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {previous['p95_ms']:.2f}ms -> {current['p95_ms']:.2f}ms")
+        if current["queries"] > previous["queries"]:
+            regressions.append(f"{name}: queries {previous['queries']} -> {current['queries']}")
+    return regressions
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "peerreview.settings")
+    django.setup()
+
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    from .generator import generate_org
+    from .scenarios import SCENARIOS
+
+    selected = [cls for cls in SCENARIOS if not args.scenarios or cls.name in args.scenarios]
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        start = time.perf_counter()
+        org = generate_org(args.groups, args.users, args.metrics, args.cycles, seed=args.seed)
+        print(f"Generated {len(org.groups)} groups, {sum(map(len, org.members.values()))} members, "
+              f"{org.rating_count} ratings in {time.perf_counter() - start:.1f}s")
+
+        results = {}
+        for cls in selected:
+            results[cls.name] = run_scenario(cls(Client(), org), args.iterations, args.warmup)
+            row = results[cls.name]
+            print(f"{cls.name:<28} {row['throughput_rps']:>9.1f} req/s  p50 {row['p50_ms']:>8.2f}ms  "
+                  f"p95 {row['p95_ms']:>8.2f}ms  p99 {row['p99_ms']:>8.2f}ms  {row['queries']:>4} queries")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+    report = {
+        "meta": {
+            "groups": args.groups, "users": args.users, "metrics": args.metrics, "cycles": args.cycles,
+            "seed": args.seed, "iterations": args.iterations,
+            "python": platform.python_version(), "django": django.get_version(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "scenarios": results,
+    }
+    with open(args.output, "w") as handle:
+        json.dump(report, handle, indent=2)
+    print(f"Wrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as handle:
+            regressions = compare(results, json.load(handle), args.tolerance)
+        if regressions:
+            print("Regressions against baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("No regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
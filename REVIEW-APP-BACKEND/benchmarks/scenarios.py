@@ -0,0 +1,164 @@
+# benchmarks/scenarios.py
+from review.models import PackedSubmission, Rating, RatingAggregate, ReviewCycle, SubmissionStatus
+
+from .generator import BENCH_PASSWORD
+
+
+class Scenario:
+    """
+    One repeatable request against the API.
+
+    ``setup`` runs once before timing, ``before_each`` runs untimed before
+    every iteration and ``request`` is the timed part; it must return the
+    response so the runner can check the status code.
+    """
+    name = None
+    expected_status = 200
+    headers = {}
+
+    def __init__(self, client, org):
+        self.client = client
+        self.org = org
+
+    def setup(self):
+        pass
+
+    def before_each(self):
+        pass
+
+    def request(self):
+        raise NotImplementedError
+
+    def authenticate(self, user):
+        response = self.client.post("/api/auth/token/", {"username": user.username, "password": BENCH_PASSWORD},
+                                    content_type="application/json")
+        self.headers = {"HTTP_AUTHORIZATION": f"Bearer {response.json()['access']}"}
+        return response.json()
+
+    def get(self, url, **params):
+        return self.client.get(url, params, **self.headers)
+
+
+class ReviewCycleList(Scenario):
+    name = "review_cycle_list"
+
+    def setup(self):
+        self.authenticate(self.org.login_user)
+
+    def request(self):
+        return self.get("/api/review-cycle/list/")
+
+
+class ReviewCycleListByGroup(ReviewCycleList):
+    name = "review_cycle_list_by_group"
+
+    def request(self):
+        return self.get("/api/review-cycle/list/", group_id=self.org.groups[0])
+
+
+class Participants(Scenario):
+    name = "participants_and_metrics"
+
+    def setup(self):
+        self.authenticate(self.org.login_user)
+        self.cycle_id = self.org.cycles[self.org.groups[0]][-1]
+
+    def request(self):
+        return self.get(f"/api/review-cycle/participants/{self.cycle_id}/")
+
+
+class CycleReport(Scenario):
+    name = "cycle_report"
+
+    def setup(self):
+        self.authenticate(self.org.login_user)
+        self.cycle_id = self.org.cycles[self.org.groups[0]][0]
+
+    def request(self):
+        return self.get(f"/api/review-cycle/{self.cycle_id}/report/")
+
+
+class UserListAll(Scenario):
+    name = "user_list"
+
+    def setup(self):
+        self.authenticate(self.org.login_user)
+
+    def request(self):
+        return self.get("/api/users/list/")
+
+
+class UserListByGroup(UserListAll):
+    name = "user_list_by_group"
+
+    def request(self):
+        return self.get("/api/users/list/", group_id=self.org.groups[0])
+
+
+class BulkRatingSubmit(Scenario):
+    """Full-group submission into the open cycle; the reviewer's previous submission is reset untimed."""
+    name = "bulk_rating_submit"
+    expected_status = 201
+    packed = False
+
+    def setup(self):
+        self.authenticate(self.org.login_user)
+        group_id = self.org.groups[0]
+        self.cycle_id = self.org.cycles[group_id][-1]
+        ReviewCycle.objects.filter(id=self.cycle_id).update(packed_ratings=self.packed)
+        members = self.org.members[group_id]
+        self.payload = {
+            "ratings": [
+                {"metric": metric_id, "values": [{"target_user": user_id, "value": 3} for user_id in members]}
+                for metric_id in self.org.metrics
+            ]
+        }
+
+    def before_each(self):
+        SubmissionStatus.objects.filter(review_cycle_id=self.cycle_id).delete()
+        Rating.objects.filter(review_cycle_id=self.cycle_id).delete()
+        PackedSubmission.objects.filter(review_cycle_id=self.cycle_id).delete()
+        RatingAggregate.objects.filter(review_cycle_id=self.cycle_id).delete()
+
+    def request(self):
+        return self.client.post(f"/api/ratings/bulk-submit/{self.cycle_id}/", self.payload,
+                                content_type="application/json", **self.headers)
+
+
+class BulkRatingSubmitPacked(BulkRatingSubmit):
+    """The same submission into the open cycle switched to packed storage."""
+    name = "bulk_rating_submit_packed"
+    packed = True
+
+
+class TokenObtain(Scenario):
+    name = "token_obtain"
+
+    def request(self):
+        return self.client.post("/api/auth/token/",
+                                {"username": self.org.login_user.username, "password": BENCH_PASSWORD},
+                                content_type="application/json")
+
+
+class TokenRefresh(Scenario):
+    name = "token_refresh"
+
+    def setup(self):
+        self.refresh = self.authenticate(self.org.login_user)["refresh"]
+
+    def request(self):
+        return self.client.post("/api/token/refresh/", {"refresh": self.refresh}, content_type="application/json")
+
+
+SCENARIOS = [
+    ReviewCycleList,
+    ReviewCycleListByGroup,
+    Participants,
+    CycleReport,
+    UserListAll,
+    UserListByGroup,
+    BulkRatingSubmit,
+    BulkRatingSubmitPacked,
+    TokenObtain,
+    TokenRefresh,
+]
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 from datetime import timedelta
 
@@ -47,11 +48,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'review.middleware.QueryProfilingMiddleware',  # no-op unless REVIEW_PROFILING['ENABLED']
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'review.routers.PrimaryPinMiddleware',  # no-op without a replica database
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -77,7 +80,7 @@ TEMPLATES = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'review.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -91,10 +94,58 @@ WSGI_APPLICATION = 'peerreview.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Configured from PEERREVIEW_DB_* (and PEERREVIEW_REPLICA_DB_* for an
+# optional read replica, see review/routers.py).  ENGINE is a backend name
+# such as sqlite3 or postgresql.  To try the routing locally point
+# PEERREVIEW_REPLICA_DB_NAME at a second SQLite file and migrate it with
+# `manage.py migrate --database replica`.
+
+def database_from_env(prefix, fallback=None):
+    fallback = fallback or {}
+    engine = os.environ.get(f'{prefix}_ENGINE')
+    database = {
+        'ENGINE': f'django.db.backends.{engine}' if engine else fallback.get('ENGINE', 'django.db.backends.sqlite3'),
+        'NAME': os.environ.get(f'{prefix}_NAME', fallback.get('NAME', BASE_DIR / 'db.sqlite3')),
+        # seconds a connection is reused across requests; 0 closes it after each request
+        'CONN_MAX_AGE': int(os.environ.get(f'{prefix}_CONN_MAX_AGE', fallback.get('CONN_MAX_AGE', 60))),
+        # re-check reused connections before each request instead of failing mid-request
+        'CONN_HEALTH_CHECKS': True,
+    }
+    for key in ('USER', 'PASSWORD', 'HOST', 'PORT'):
+        value = os.environ.get(f'{prefix}_{key}', fallback.get(key))
+        if value:
+            database[key] = value
+    if os.environ.get(f'{prefix}_POOL', '') == '1':
+        # psycopg 3 connection pool (PostgreSQL only); replaces persistent connections
+        database['OPTIONS'] = {'pool': True}
+        database['CONN_MAX_AGE'] = 0
+    return database
+
+
 DATABASES = {
+    'default': database_from_env('PEERREVIEW_DB'),
+}
+if os.environ.get('PEERREVIEW_REPLICA_DB_NAME'):
+    DATABASES['replica'] = {
+        **database_from_env('PEERREVIEW_REPLICA_DB', fallback=DATABASES['default']),
+        # tests read the replica through the default connection
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['review.routers.ReplicaRouter']
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Holds the per-cycle participants/metrics snapshots (review/caching.py).
+# Invalidation only reaches the cache it runs against, so outside DEBUG a
+# cache shared by all workers (Redis, Memcached) is required; the app
+# refuses to start with a process-local one.
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': os.environ.get('PEERREVIEW_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('PEERREVIEW_CACHE_LOCATION', 'peerreview'),
     }
 }
 
@@ -160,4 +211,63 @@ SIMPLE_JWT = {
     "ROTATE_REFRESH_TOKENS": False,
     "BLACKLIST_AFTER_ROTATION": False,
     "AUTH_HEADER_TYPES": ("Bearer",),
-}
\ No newline at end of file
+}
+
+# In-process cache of users resolved from JWTs (review/authentication.py).
+# TTL (seconds) bounds how long another process may serve a stale user.
+REVIEW_USER_CACHE = {
+    "MAX_SIZE": 10000,
+    "TTL": 60,
+}
+
+# Per-request SQL/latency profiling, see review/middleware.py.
+# Enable with PEERREVIEW_PROFILING=1; report with `manage.py profiling_report`.
+REVIEW_PROFILING = {
+    "ENABLED": os.environ.get("PEERREVIEW_PROFILING", "") == "1",
+    "STORE": os.environ.get("PEERREVIEW_PROFILING_STORE", str(BASE_DIR / "profiling.sqlite3")),
+    "MAX_SAMPLES": 50000,
+    "DUPLICATE_THRESHOLD": 3,
+    "SAMPLE_RATE": float(os.environ.get("PEERREVIEW_PROFILING_SAMPLE_RATE", "1.0")),
+}
+
+# Background jobs run by `manage.py run_jobs`, see review/jobs.py.
+REVIEW_JOBS = {
+    "WORKERS": int(os.environ.get("PEERREVIEW_JOB_WORKERS", "4")),
+    "POLL_INTERVAL": 1.0,   # seconds between polls when the queue is empty
+    "RETRY_DELAY": 10,      # seconds, doubled on every further attempt
+    "STALE_AFTER": 900,     # seconds without a heartbeat before a running job is assumed lost
+    "HEARTBEAT_INTERVAL": 60,  # seconds between heartbeats of a running job
+}
+
+# Live cycle events streamed at api/async/review-cycle/<id>/events/, see
+# review/events.py.  The in-process broker only reaches subscribers served
+# by the same ASGI process as the submissions.
+REVIEW_EVENTS = {
+    "BACKEND": "review.events.InProcessBroker",
+    "HEARTBEAT": 15,
+    "QUEUE_SIZE": 100,
+}
+
+# Columnar archives of closed cycles' ratings, see review/archive.py and
+# `manage.py archive_ratings` / `manage.py restore_ratings`.
+REVIEW_ARCHIVE = {
+    "ROOT": os.environ.get("PEERREVIEW_ARCHIVE_ROOT", str(BASE_DIR / "archive")),
+    "PURGE": False,     # default for archiving without --purge/--keep
+}
+
+# Bulk user import, see review/user_import.py.  Imports sent to the API with
+# more than SYNC_MAX_ROWS rows are queued; only the job worker and the
+# import_users command hash on a pool of WORKERS processes.
+REVIEW_USER_IMPORT = {
+    "WORKERS": int(os.environ.get("PEERREVIEW_IMPORT_WORKERS", "2")),
+    "SYNC_MAX_ROWS": 100,
+}
+
+# Read replica routing, see review/routers.py.  Users who just wrote read
+# from the primary for PIN_SECONDS, which should exceed the replication lag.
+# The pins live in CACHES['default'], which must be shared by all workers
+# once a replica is configured, DEBUG or not.
+REVIEW_REPLICA = {
+    "ALIAS": "replica",
+    "PIN_SECONDS": int(os.environ.get("PEERREVIEW_REPLICA_PIN_SECONDS", "5")),
+}
@@ -0,0 +1,151 @@
+# review/aggregates.py
+from collections import defaultdict
+
+from django.db.models import Count, F, Max, Min, Sum
+
+from .archive import archived_aggregates
+from .models import Rating, RatingAggregate
+from .packing import packed_aggregates
+
+AGGREGATE_FIELDS = ['count', 'total', 'total_squares', 'min_value', 'max_value']
+
+
+def _key(obj):
+    return (obj.target_user_id, obj.metric_id, obj.is_self_review)
+
+
+def apply_rating_changes(review_cycle, added):
+    """
+    Fold newly written ratings into the cycle's ``RatingAggregate`` rows.
+
+    ``added`` is an iterable of ``(target_user_id, metric_id,
+    is_self_review, value)`` tuples.  Must run inside the transaction that
+    wrote the ratings.  Missing rows are created empty with
+    ``ignore_conflicts``, so concurrent first submissions cannot collide,
+    then the rows are locked with ``select_for_update`` before being read
+    and written back, so concurrent submissions never lose an update.
+    """
+    changes = defaultdict(list)
+    for target_user_id, metric_id, is_self_review, value in added:
+        changes[(target_user_id, metric_id, is_self_review)].append(value)
+    if not changes:
+        return
+
+    RatingAggregate.objects.bulk_create([
+        RatingAggregate(review_cycle=review_cycle, target_user_id=target_user_id, metric_id=metric_id,
+                        is_self_review=is_self_review)
+        for target_user_id, metric_id, is_self_review in changes
+    ], ignore_conflicts=True)
+    aggregates = RatingAggregate.objects.select_for_update().filter(
+        review_cycle=review_cycle,
+        target_user_id__in={key[0] for key in changes},
+        metric_id__in={key[1] for key in changes},
+    ).order_by('target_user_id', 'metric_id', 'is_self_review')
+
+    updates = []
+    for aggregate in aggregates:
+        values = changes.get(_key(aggregate))
+        if values is None:
+            continue
+        aggregate.count += len(values)
+        aggregate.total += sum(values)
+        aggregate.total_squares += sum(value * value for value in values)
+        aggregate.min_value = min(values if aggregate.min_value is None else [aggregate.min_value, *values])
+        aggregate.max_value = max(values if aggregate.max_value is None else [aggregate.max_value, *values])
+        updates.append(aggregate)
+    RatingAggregate.objects.bulk_update(updates, AGGREGATE_FIELDS)
+
+
+def compute_aggregates(review_cycle_ids=None):
+    """
+    Build unsaved ``RatingAggregate`` rows straight from ``Rating`` and
+    packed submissions, or from the archive file of cycles whose rows were
+    purged.
+    """
+    ratings = Rating.objects.all()
+    if review_cycle_ids is not None:
+        ratings = ratings.filter(review_cycle_id__in=review_cycle_ids)
+    rows = ratings.values('review_cycle_id', 'target_user_id', 'metric_id', 'is_self_review').annotate(
+        count=Count('id'),
+        total=Sum('value'),
+        total_squares=Sum(F('value') * F('value')),
+        min_value=Min('value'),
+        max_value=Max('value'),
+    ).order_by()
+    return ([RatingAggregate(**row) for row in rows] + packed_aggregates(review_cycle_ids)
+            + archived_aggregates(review_cycle_ids))
+
+
+def find_drift(review_cycle_ids=None):
+    """
+    Compare stored aggregates against a fresh computation.
+
+    Returns a list of ``(key, stored, expected)`` tuples where either side
+    may be ``None`` when the row is missing.
+    """
+    def as_dict(aggregates):
+        return {
+            (a.review_cycle_id, a.target_user_id, a.metric_id, a.is_self_review):
+                tuple(getattr(a, field) for field in AGGREGATE_FIELDS)
+            for a in aggregates
+        }
+
+    stored_rows = RatingAggregate.objects.all()
+    if review_cycle_ids is not None:
+        stored_rows = stored_rows.filter(review_cycle_id__in=review_cycle_ids)
+    stored = as_dict(stored_rows)
+    expected = as_dict(compute_aggregates(review_cycle_ids))
+
+    return [
+        (key, stored.get(key), expected.get(key))
+        for key in sorted(stored.keys() | expected.keys())
+        if stored.get(key) != expected.get(key)
+    ]
+
+
+def rebuild_aggregates(review_cycle_ids=None):
+    """Replace stored aggregates with a fresh computation; returns the row count."""
+    stale_rows = RatingAggregate.objects.all()
+    if review_cycle_ids is not None:
+        stale_rows = stale_rows.filter(review_cycle_id__in=review_cycle_ids)
+    stale_rows.delete()
+    return len(RatingAggregate.objects.bulk_create(compute_aggregates(review_cycle_ids), batch_size=500))
+
+
+def cycle_results_queryset(review_cycle_id):
+    """Aggregate rows for a cycle with the target username and metric name joined in."""
+    return RatingAggregate.objects.filter(review_cycle_id=review_cycle_id).order_by(
+        'target_user_id', 'metric_id'
+    ).values(
+        'target_user_id', 'metric_id', 'is_self_review', *AGGREGATE_FIELDS,
+        username=F('target_user__username'), metric_name=F('metric__name'),
+    )
+
+
+def describe(row):
+    count = row['count']
+    mean = row['total'] / count
+    variance = row['total_squares'] / count - mean ** 2
+    return {
+        "count": count,
+        "mean": mean,
+        "stddev": max(variance, 0) ** 0.5,
+        "min": row['min_value'],
+        "max": row['max_value'],
+    }
+
+
+def build_results(rows):
+    """Fold self/peer aggregate rows into one result entry per (user, metric)."""
+    results = {}
+    for row in rows:
+        entry = results.setdefault((row['target_user_id'], row['metric_id']), {
+            "target_user": row['target_user_id'],
+            "username": row['username'],
+            "metric": row['metric_id'],
+            "metric_name": row['metric_name'],
+            "self": None,
+            "peer": None,
+        })
+        entry["self" if row['is_self_review'] else "peer"] = describe(row) if row['count'] else None
+    return list(results.values())
@@ -0,0 +1,188 @@
+# review/analytics.py
+import warnings
+
+import numpy as np
+
+from .models import RatingAggregate
+
+SELF, PEER = 0, 1
+
+
+class CycleMatrix:
+    """
+    A cycle's ratings as a dense ``users × metrics × (self, peer)`` array.
+
+    Each cell holds the mean rating a member received for a metric, or
+    ``NaN`` when nobody rated it.  Users are the members of the cycle's
+    group and metrics the cycle's metrics, both ordered by id.
+    """
+
+    def __init__(self, user_ids, usernames, metric_ids, metric_names, values, counts):
+        self.user_ids = user_ids
+        self.usernames = usernames
+        self.metric_ids = metric_ids
+        self.metric_names = metric_names
+        self.values = values
+        self.counts = counts
+
+    def user_index(self, user_id):
+        index = int(np.searchsorted(self.user_ids, user_id))
+        if index < len(self.user_ids) and self.user_ids[index] == user_id:
+            return index
+        return None
+
+
+def _positions(ids, keys):
+    """Index of each key in the sorted ``ids`` array and a mask of keys found."""
+    positions = np.searchsorted(ids, keys)
+    positions = np.minimum(positions, max(len(ids) - 1, 0))
+    found = ids[positions] == keys if len(ids) else np.zeros(len(keys), dtype=bool)
+    return positions, found
+
+
+def load_cycle_matrix(review_cycle):
+    """
+    Build the ``CycleMatrix`` for a cycle.
+
+    Cells are filled from ``RatingAggregate`` in one query: it holds one
+    row per (member, metric, self/peer) instead of one per submitted
+    rating, so the read does not grow with the number of reviewers.
+    """
+    members = list(review_cycle.group.user_set.order_by('id').values_list('id', 'username'))
+    metrics = list(review_cycle.metrics.order_by('id').values_list('id', 'name'))
+    user_ids = np.array([user_id for user_id, _ in members], dtype=np.int64)
+    metric_ids = np.array([metric_id for metric_id, _ in metrics], dtype=np.int64)
+
+    rows = np.array(
+        RatingAggregate.objects.filter(review_cycle=review_cycle, count__gt=0).values_list(
+            'target_user_id', 'metric_id', 'is_self_review', 'count', 'total'
+        ),
+        dtype=np.int64,
+    ).reshape(-1, 5)
+
+    users, user_found = _positions(user_ids, rows[:, 0])
+    metric_positions, metric_found = _positions(metric_ids, rows[:, 1])
+    # Ratings for people who have since left the group, or metrics detached
+    # from the cycle, have no cell.
+    keep = user_found & metric_found
+    cells = (users[keep], metric_positions[keep], np.where(rows[keep, 2] == 1, SELF, PEER))
+
+    shape = (len(user_ids), len(metric_ids), 2)
+    values = np.full(shape, np.nan)
+    counts = np.zeros(shape, dtype=np.int64)
+    values[cells] = rows[keep, 4] / rows[keep, 3]
+    counts[cells] = rows[keep, 3]
+
+    return CycleMatrix(
+        user_ids, [username for _, username in members],
+        metric_ids, [name for _, name in metrics],
+        values, counts,
+    )
+
+
+def percentile_ranks(values):
+    """
+    Percentile rank of each entry among the non-NaN entries of ``values``.
+
+    Ties count half, so equal scores share a rank; NaN entries stay NaN.
+    """
+    ranked = np.sort(values[~np.isnan(values)])
+    ranks = np.full(values.shape, np.nan)
+    if len(ranked):
+        present = ~np.isnan(values)
+        below = np.searchsorted(ranked, values[present], side='left')
+        at_or_below = np.searchsorted(ranked, values[present], side='right')
+        ranks[present] = (below + at_or_below) / 2 / len(ranked) * 100
+    return ranks
+
+
+def _stats(matrix):
+    """Per-user and per-metric statistics over the dense array."""
+    self_scores = matrix.values[:, :, SELF]
+    peer_scores = matrix.values[:, :, PEER]
+    gaps = self_scores - peer_scores
+
+    with warnings.catch_warnings():
+        # all-NaN rows (nobody rated a user yet) legitimately give NaN
+        warnings.simplefilter('ignore', RuntimeWarning)
+        users = {
+            'peer_mean': np.nanmean(peer_scores, axis=1),
+            'peer_median': np.nanmedian(peer_scores, axis=1),
+            'peer_stddev': np.nanstd(peer_scores, axis=1),
+            'self_mean': np.nanmean(self_scores, axis=1),
+            'gap': np.nanmean(gaps, axis=1),
+        }
+        if len(matrix.user_ids) and len(matrix.metric_ids):
+            low, p25, median, p75, high = np.nanpercentile(peer_scores, [0, 25, 50, 75, 100], axis=0)
+        else:
+            low = p25 = median = p75 = high = np.full(len(matrix.metric_ids), np.nan)
+        metrics = {
+            'peer_mean': np.nanmean(peer_scores, axis=0),
+            'peer_stddev': np.nanstd(peer_scores, axis=0),
+            'min': low,
+            'p25': p25,
+            'median': median,
+            'p75': p75,
+            'max': high,
+            'self_mean': np.nanmean(self_scores, axis=0),
+            'gap': np.nanmean(gaps, axis=0),
+        }
+    users['percentile'] = percentile_ranks(users['peer_mean'])
+    metrics['rated_users'] = (~np.isnan(peer_scores)).sum(axis=0)
+    return users, metrics
+
+
+def _clean(array):
+    """JSON-friendly list: NaN becomes None, floats are rounded."""
+    return [None if value != value else value for value in np.round(array, 3).tolist()]
+
+
+def _columns(stats, index):
+    return {name: column[index] for name, column in stats.items()}
+
+
+def build_report(matrix):
+    """The per-cycle report: one entry per member and one per metric."""
+    users, metrics = _stats(matrix)
+    users = {name: _clean(column) for name, column in users.items()}
+    metrics = {name: _clean(column) for name, column in metrics.items()}
+    rated = (matrix.counts[:, :, PEER] > 0).sum(axis=1).tolist()
+    return {
+        "users": [
+            {"user_id": int(user_id), "username": username, "metrics_rated": rated[i], **_columns(users, i)}
+            for i, (user_id, username) in enumerate(zip(matrix.user_ids, matrix.usernames))
+        ],
+        "metrics": [
+            {"metric_id": int(metric_id), "metric_name": name, **_columns(metrics, i)}
+            for i, (metric_id, name) in enumerate(zip(matrix.metric_ids, matrix.metric_names))
+        ],
+    }
+
+
+def build_user_report(matrix, index):
+    """One member's summary plus their per-metric scores against the group."""
+    users, metrics = _stats(matrix)
+    peer_scores = matrix.values[:, :, PEER]
+    metric_percentiles = np.column_stack(
+        [percentile_ranks(peer_scores[:, i]) for i in range(len(matrix.metric_ids))]
+    ) if len(matrix.metric_ids) else np.empty((len(matrix.user_ids), 0))
+
+    own = matrix.values[index]
+    per_metric = {
+        'self': _clean(own[:, SELF]),
+        'peer': _clean(own[:, PEER]),
+        'gap': _clean(own[:, SELF] - own[:, PEER]),
+        'peer_count': matrix.counts[index, :, PEER].tolist(),
+        'group_peer_mean': _clean(metrics['peer_mean']),
+        'percentile': _clean(metric_percentiles[index]),
+    }
+    summary = {name: _clean(column[index:index + 1])[0] for name, column in users.items()}
+    return {
+        "user_id": int(matrix.user_ids[index]),
+        "username": matrix.usernames[index],
+        **summary,
+        "metrics": [
+            {"metric_id": int(metric_id), "metric_name": name, **_columns(per_metric, i)}
+            for i, (metric_id, name) in enumerate(zip(matrix.metric_ids, matrix.metric_names))
+        ],
+    }
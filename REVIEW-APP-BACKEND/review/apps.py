@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class ReviewConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'review'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .caching import check_shared_cache
+        check_shared_cache()
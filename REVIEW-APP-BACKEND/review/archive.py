@@ -0,0 +1,244 @@
+# review/archive.py
+"""
+Columnar archives of closed cycles' ratings.
+
+An archive is one file holding a small JSON header followed by one typed
+array per ``Rating`` column, each stored contiguously and 8-byte aligned,
+so a reader memory-maps exactly the columns it needs.  Once an archive
+is written the cycle's ``Rating`` rows (and packed submissions, see
+review/packing.py) can be purged; exports and aggregate rebuilds then
+read the file instead, and ``restore_cycle`` writes the ratings back to
+the tables they came from.
+"""
+import json
+import os
+import struct
+import uuid
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from .anonymous import insert_anonymously
+from .models import PackedSubmission, Rating, RatingArchive, ReviewCycle
+from .packing import (column_aggregates, column_rating_rows, drop_deleted, narrow, pack_ratings,
+                      packed_columns)
+
+ARCHIVE_DEFAULTS = {
+    'ROOT': 'archive',
+    'PURGE': False,     # purge Rating rows once archived unless told otherwise
+}
+
+FORMAT_VERSION = 1
+MAGIC = b'PRARCHV1'
+ALIGNMENT = 8
+COLUMNS = ['id', 'target_user_id', 'metric_id', 'value', 'is_self_review']
+TOKEN_LENGTH = Rating._meta.get_field('reviewer_token').max_length
+
+
+class ArchiveError(Exception):
+    pass
+
+
+def archive_settings():
+    return {**ARCHIVE_DEFAULTS, **getattr(settings, 'REVIEW_ARCHIVE', {})}
+
+
+def archive_root():
+    return Path(archive_settings()['ROOT'])
+
+
+def _padding(offset):
+    return -offset % ALIGNMENT
+
+
+def write_archive(path, columns):
+    """
+    Write ``columns`` (name -> 1-d array, equal lengths) to ``path``.
+
+    The file is written next to its destination and moved into place, so
+    readers never see a half-written archive.
+    """
+    rows = len(next(iter(columns.values())))
+    layout = []
+    offset = 0
+    for name, array in columns.items():
+        offset += _padding(offset)
+        layout.append({"name": name, "dtype": array.dtype.str, "offset": offset})
+        offset += array.nbytes
+    header = json.dumps({"version": FORMAT_VERSION, "rows": rows, "columns": layout}).encode()
+    prefix = MAGIC + struct.pack('<Q', len(header)) + header
+    start = len(prefix) + _padding(len(prefix))
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_name(f".{path.name}.{uuid.uuid4().hex}")
+    try:
+        with open(partial, 'wb') as file:
+            file.write(prefix + b'\0' * (start - len(prefix)))
+            for (name, array), column in zip(columns.items(), layout):
+                file.write(b'\0' * (start + column['offset'] - file.tell()))
+                file.write(np.ascontiguousarray(array).tobytes())
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(partial, path)
+    finally:
+        if partial.exists():
+            partial.unlink()
+    return path.stat().st_size
+
+
+def read_archive(path):
+    """Memory-map the columns of an archive file (name -> read-only array)."""
+    with open(path, 'rb') as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ArchiveError(f"{path} is not a rating archive.")
+        (length,) = struct.unpack('<Q', file.read(8))
+        header = json.loads(file.read(length))
+    if header['version'] != FORMAT_VERSION:
+        raise ArchiveError(f"Unsupported rating archive version {header['version']}.")
+    prefix = len(MAGIC) + 8 + length
+    start = prefix + _padding(prefix)
+    rows = header['rows']
+    if not rows:
+        return {column['name']: np.empty(0, dtype=column['dtype']) for column in header['columns']}
+    return {
+        column['name']: np.memmap(path, dtype=column['dtype'], mode='r', offset=start + column['offset'],
+                                  shape=(rows,))
+        for column in header['columns']
+    }
+
+
+def archive_path(archive):
+    return archive_root() / archive.file_name
+
+
+def cycle_columns(review_cycle):
+    """
+    A cycle's ``Rating`` rows as compactly typed column arrays, ordered by
+    id, followed by its packed ratings (with id 0) in packed cycles.
+    """
+    ratings = list(Rating.objects.filter(review_cycle_id=review_cycle.id).order_by('id').values_list(
+        *COLUMNS, 'reviewer_token'))
+    rows = np.array([rating[:-1] for rating in ratings], dtype=np.int64).reshape(-1, len(COLUMNS))
+    columns = {}
+    for index, name in enumerate(COLUMNS):
+        column = rows[:, index]
+        columns[name] = column.astype(bool) if name == 'is_self_review' else column.astype(narrow(column))
+    # fixed-width bytes; rows from before reviewer tokens existed store b''
+    columns['reviewer_token'] = np.array([(rating[-1] or '').encode() for rating in ratings],
+                                         dtype=f'S{TOKEN_LENGTH}')
+    if review_cycle.packed_ratings:
+        packed = packed_columns(review_cycle.id)
+        for name, column in columns.items():
+            merged = np.concatenate([column, packed[name]])
+            columns[name] = merged if merged.dtype.kind != 'i' else merged.astype(narrow(merged))
+    return columns
+
+
+def archive_cycle(review_cycle, purge=None):
+    """
+    Write a closed cycle's ratings to its archive file, optionally purging
+    them from ``Rating``.  Returns the ``RatingArchive``.
+    """
+    if review_cycle.closed_at is None:
+        raise ArchiveError("Only closed review cycles can be archived.")
+    if purge is None:
+        purge = archive_settings()['PURGE']
+    existing = RatingArchive.objects.filter(review_cycle=review_cycle).first()
+    if existing is not None and existing.purged:
+        # the rows are gone; rewriting would replace the archive with an empty one
+        raise ArchiveError("Review cycle is already archived and purged; restore it first.")
+
+    file_name = f"cycle-{review_cycle.id}.ratings"
+    with transaction.atomic():
+        columns = cycle_columns(review_cycle)
+        size = write_archive(archive_root() / file_name, columns)
+        archive, _ = RatingArchive.objects.update_or_create(review_cycle=review_cycle, defaults={
+            'file_name': file_name,
+            'row_count': len(columns['id']),
+            'size': size,
+            'purged': purge,
+        })
+        if purge:
+            Rating.objects.filter(review_cycle=review_cycle).delete()
+            PackedSubmission.objects.filter(review_cycle=review_cycle).delete()
+    return archive
+
+
+def load_archive(archive):
+    columns = read_archive(archive_path(archive))
+    if len(columns['id']) != archive.row_count:
+        raise ArchiveError(f"Archive of cycle {archive.review_cycle_id} holds {len(columns['id'])} ratings, "
+                           f"expected {archive.row_count}.")
+    return columns
+
+
+def purged_archive(review_cycle_id):
+    return RatingArchive.objects.filter(review_cycle_id=review_cycle_id, purged=True).first()
+
+
+def live_columns(archive):
+    """The archive's columns and name lookups, see ``packing.drop_deleted``."""
+    return drop_deleted(load_archive(archive))
+
+
+def restore_cycle(review_cycle, batch_size=1000):
+    """
+    Write a purged cycle's ratings back; returns how many.  ``Rating`` rows
+    keep their ids, and packed ratings (id 0) are re-packed into one
+    ``PackedSubmission`` per target and token under fresh random ids, so
+    the cycle reads exactly as it did before it was purged.
+    """
+    archive = purged_archive(review_cycle.id)
+    if archive is None:
+        return 0
+    columns, _, _ = live_columns(archive)
+    # archives written before reviewer tokens existed have no token column
+    tokens = columns['reviewer_token'].tolist() if 'reviewer_token' in columns else [b''] * len(columns['id'])
+    ratings = []
+    packed = {}
+    for rating_id, target_user_id, metric_id, value, is_self_review, token in zip(
+            *(columns[name].tolist() for name in COLUMNS), tokens):
+        if rating_id:
+            ratings.append(Rating(id=rating_id, review_cycle_id=review_cycle.id, target_user_id=target_user_id,
+                                  metric_id=metric_id, value=value, is_self_review=is_self_review,
+                                  reviewer_token=None if is_self_review else token.decode() or None))
+        else:
+            packed.setdefault((target_user_id, token.decode()), []).append((metric_id, value))
+    with transaction.atomic():
+        Rating.objects.bulk_create(ratings, batch_size=batch_size)
+        insert_anonymously(PackedSubmission, [
+            PackedSubmission(review_cycle_id=review_cycle.id, target_user_id=target_user_id,
+                             reviewer_token=token, rating_count=len(entries), data=pack_ratings(entries))
+            for (target_user_id, token), entries in packed.items()
+        ], batch_size=batch_size)
+        if packed and not review_cycle.packed_ratings:
+            # readers only look for packed rows in packed cycles
+            ReviewCycle.objects.filter(id=review_cycle.id).update(packed_ratings=True)
+            review_cycle.packed_ratings = True
+        RatingArchive.objects.filter(id=archive.id).update(purged=False)
+    return len(ratings) + sum(len(entries) for entries in packed.values())
+
+
+def archived_rating_rows(archive, chunk_size):
+    """Export rows of a purged cycle, in the column order of ``export.RATING_COLUMNS``."""
+    return column_rating_rows(*live_columns(archive), chunk_size)
+
+
+def archived_aggregates(review_cycle_ids=None):
+    """Unsaved ``RatingAggregate`` rows computed from purged archives."""
+    archives = RatingArchive.objects.filter(purged=True)
+    if review_cycle_ids is not None:
+        archives = archives.filter(review_cycle_id__in=review_cycle_ids)
+    aggregates = []
+    for archive in archives:
+        columns, _, _ = live_columns(archive)
+        aggregates += column_aggregates(archive.review_cycle_id, columns)
+    return aggregates
+
+
+def delete_archive_file(file_name):
+    path = archive_root() / file_name
+    if path.exists():
+        path.unlink()
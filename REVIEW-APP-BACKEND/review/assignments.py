@@ -0,0 +1,131 @@
+# review/assignments.py
+import random
+
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from .caching import invalidate_cycle_snapshots
+from .models import ReviewAssignment, ReviewCycle, SubmissionStatus
+
+
+def balanced_pairs(user_ids, reviews_per_reviewer, seed):
+    """
+    ``(reviewer, target)`` pairs in which every user reviews ``k`` others and
+    is reviewed by ``k`` others, ``k`` being ``reviews_per_reviewer`` capped
+    at the group size minus one.
+
+    Users are shuffled with ``seed`` and each one reviews the next ``k``
+    around the circle, so the result depends only on the ids and the seed.
+    """
+    order = sorted(user_ids)
+    random.Random(seed).shuffle(order)
+    size = len(order)
+    k = min(reviews_per_reviewer, max(size - 1, 0))
+    return [(order[i], order[(i + offset) % size]) for i in range(size) for offset in range(1, k + 1)]
+
+
+def assign_reviewers(review_cycle, seed=None):
+    """
+    Replace the cycle's assignments with balanced ones for its current members.
+
+    Uses ``seed`` when given, else the cycle's stored seed, else a new random
+    one; the seed is stored so the assignment can be reproduced.  Returns
+    the number of assignments written.
+    """
+    if seed is None:
+        seed = review_cycle.assignment_seed
+    if seed is None:
+        seed = random.SystemRandom().getrandbits(62)
+    user_ids = User.objects.filter(groups=review_cycle.group_id).values_list('id', flat=True)
+    pairs = balanced_pairs(user_ids, review_cycle.reviews_per_reviewer, seed)
+
+    with transaction.atomic():
+        review_cycle.assignment_seed = seed
+        review_cycle.save(update_fields=['assignment_seed'])
+        ReviewAssignment.objects.filter(review_cycle=review_cycle).delete()
+        ReviewAssignment.objects.bulk_create([
+            ReviewAssignment(review_cycle=review_cycle, reviewer_id=reviewer_id, target_user_id=target_user_id)
+            for reviewer_id, target_user_id in pairs
+        ], batch_size=1000)
+        transaction.on_commit(lambda: invalidate_cycle_snapshots([review_cycle.id]))
+    return len(pairs)
+
+
+def sync_assignments(review_cycle):
+    """
+    Bring an open cycle's assignments in line with its group after members
+    joined or left, without reshuffling anyone who is already assigned.
+
+    Pairs involving departed members are dropped.  Then every member who
+    has not finalized gets targets up to ``k``, preferring the peers with
+    the fewest reviewers, and every member with fewer than ``k`` reviewers
+    gets them from the members who have not finalized, preferring those
+    with the fewest targets.  Ties are broken with the cycle's seed.
+    Returns ``(removed, added)``.
+    """
+    members = set(User.objects.filter(groups=review_cycle.group_id).values_list('id', flat=True))
+    assignments = ReviewAssignment.objects.filter(review_cycle=review_cycle)
+    pairs = set(assignments.values_list('reviewer_id', 'target_user_id'))
+    departed = {(reviewer, target) for reviewer, target in pairs if reviewer not in members or target not in members}
+    pairs -= departed
+    finalized = set(SubmissionStatus.objects.filter(review_cycle=review_cycle, finalized=True)
+                    .values_list('user_id', flat=True))
+
+    k = min(review_cycle.reviews_per_reviewer, max(len(members) - 1, 0))
+    order = sorted(members)
+    random.Random(review_cycle.assignment_seed).shuffle(order)
+    position = {user_id: index for index, user_id in enumerate(order)}
+    targets = {user_id: {t for r, t in pairs if r == user_id} for user_id in order}
+    reviewers = {user_id: {r for r, t in pairs if t == user_id} for user_id in order}
+    added = []
+
+    def assign(reviewer, target):
+        targets[reviewer].add(target)
+        reviewers[target].add(reviewer)
+        added.append((reviewer, target))
+
+    for reviewer in order:
+        if reviewer in finalized:
+            continue
+        candidates = sorted((user_id for user_id in order if user_id != reviewer and user_id not in targets[reviewer]),
+                            key=lambda user_id: (len(reviewers[user_id]), position[user_id]))
+        for target in candidates[:max(k - len(targets[reviewer]), 0)]:
+            assign(reviewer, target)
+    for target in order:
+        candidates = sorted((user_id for user_id in order if user_id != target and user_id not in finalized
+                             and user_id not in reviewers[target]),
+                            key=lambda user_id: (len(targets[user_id]), position[user_id]))
+        for reviewer in candidates[:max(k - len(reviewers[target]), 0)]:
+            assign(reviewer, target)
+
+    if not departed and not added:
+        return 0, 0
+    with transaction.atomic():
+        if departed:
+            assignments.exclude(reviewer_id__in=members, target_user_id__in=members).delete()
+        ReviewAssignment.objects.bulk_create([
+            ReviewAssignment(review_cycle=review_cycle, reviewer_id=reviewer_id, target_user_id=target_user_id)
+            for reviewer_id, target_user_id in added
+        ], batch_size=1000)
+        transaction.on_commit(lambda: invalidate_cycle_snapshots([review_cycle.id]))
+    return len(departed), len(added)
+
+
+def sync_group_assignments(group_ids):
+    """Run ``sync_assignments`` for the open, assigned cycles of ``group_ids``."""
+    cycles = ReviewCycle.objects.filter(group_id__in=list(group_ids), closed_at__isnull=True,
+                                        reviews_per_reviewer__isnull=False).exclude(reviews_per_reviewer=0)
+    for review_cycle in cycles:
+        sync_assignments(review_cycle)
+
+
+def review_targets(snapshot, reviewer_id):
+    """
+    The snapshot participants ``reviewer_id`` rates: everyone, or in cycles
+    with assignments themselves plus their assigned peers.
+    """
+    participants = snapshot["participants"]
+    if not snapshot["cycle"].get("reviews_per_reviewer"):
+        return participants
+    targets = {reviewer_id, *snapshot["assignments"].get(reviewer_id, ())}
+    return [p for p in participants if p["id"] in targets]
@@ -0,0 +1,242 @@
+# review/async_views.py
+"""
+Async (ASGI) versions of the read-heavy review endpoints.
+
+Under ASGI every synchronous DRF view is pushed onto the single
+thread-sensitive executor, so slow reads queue behind each other.  These
+views use Django's async ORM instead and authenticate the JWT without
+blocking the event loop.  Response bodies match the synchronous views in
+``review/rest.py``.
+"""
+import json
+from functools import wraps
+
+from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+from django.http import HttpResponse, HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
+from django.utils.http import parse_etags
+from rest_framework.exceptions import AuthenticationFailed, ValidationError
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from .assignments import review_targets
+from .authentication import aget_user
+from .aggregates import build_results, cycle_results_queryset
+from .caching import aget_cycle_snapshot
+from .completion import percentage
+from .events import cycle_channel, event_settings, get_broker
+from .models import CycleCompletion, Metric, ReviewCycle
+from .pagination import apaginate_keyset, link_header, project_fields
+from .rest import REVIEW_CYCLE_LIST_FIELDS
+from .routers import ais_pinned, replica_alias, replica_reads
+
+
+async def aauthenticate(request, query_token=False):
+    """
+    Resolve the bearer token on ``request`` to a user.
+
+    Token decoding and signature checks are pure CPU work; users come from
+    the shared auth cache or, on a miss, the async ORM.  Returns ``None``
+    when no credentials were sent and raises ``AuthenticationFailed`` for
+    bad ones.  With ``query_token`` an access token may also be passed as
+    ``?token=``, for clients such as ``EventSource`` that cannot set headers.
+    """
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    if header is not None:
+        raw_token = authentication.get_raw_token(header)
+    elif query_token and request.GET.get('token'):
+        raw_token = request.GET['token'].encode()
+    else:
+        raw_token = None
+    if raw_token is None:
+        return None
+
+    return await aget_user(authentication.get_validated_token(raw_token))
+
+
+def async_api_view(admin_only=False, query_token=False):
+    """
+    Restrict an async view to authenticated GET requests, like the DRF
+    defaults; DRF ``ValidationError``s become 400 responses.
+    """
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method != 'GET':
+                return HttpResponseNotAllowed(['GET'])
+            try:
+                user = await aauthenticate(request, query_token)
+            except AuthenticationFailed as exc:
+                detail = exc.detail if isinstance(exc.detail, dict) else {"detail": str(exc.detail)}
+                return JsonResponse(detail, status=401)
+            if user is None:
+                return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+            if admin_only and not user.is_staff:
+                return JsonResponse({"detail": "You do not have permission to perform this action."}, status=403)
+            request.user = user
+            # every async view is a read
+            use_replica = replica_alias() is not None and not await ais_pinned(user.id)
+            with replica_reads(use_replica):
+                try:
+                    return await view(request, *args, **kwargs)
+                except ValidationError as exc:
+                    return JsonResponse(exc.detail, status=400)
+        return wrapper
+    return decorator
+
+
+def json_list(data):
+    return JsonResponse(data, safe=False)
+
+
+@async_api_view()
+async def review_cycle_list(request):
+    cycles = ReviewCycle.objects.filter(is_active=True)
+    group_id = request.GET.get('group_id')
+    if group_id:
+        cycles = cycles.filter(group_id=group_id)
+
+    cycles = cycles.values('id', 'name', 'group_id', 'start_date', 'end_date', group_name=F('group__name'))
+    cycles, next_url = await apaginate_keyset(request, cycles, ('start_date', 'id'))
+    data = [
+        {
+            "id": cycle["id"],
+            "name": cycle["name"],
+            "group_id": cycle["group_id"],
+            "group": cycle["group_name"],
+            "start_date": cycle["start_date"],
+            "end_date": cycle["end_date"]
+        } for cycle in cycles
+    ]
+    return link_header(json_list(project_fields(request, data, REVIEW_CYCLE_LIST_FIELDS)), next_url)
+
+
+@async_api_view()
+async def participants_and_metrics(request, cycle_id):
+    snapshot = await aget_cycle_snapshot(cycle_id)
+    if snapshot is None:
+        return JsonResponse({"detail": "Review cycle not found."}, status=404)
+    if not any(p["id"] == request.user.id for p in snapshot["participants"]):
+        return JsonResponse({"detail": "Not allowed to access this review cycle."}, status=403)
+
+    etag = f'"{snapshot["version"]}-{request.user.id}"'
+    if etag in parse_etags(request.headers.get("If-None-Match", "")):
+        response = HttpResponse(status=304)
+        response["ETag"] = etag
+        return response
+
+    cycle = snapshot["cycle"]
+    response = JsonResponse({
+        "cycle_id": cycle["id"],
+        "cycle_name": cycle["name"],
+        "start_date": cycle["start_date"],
+        "end_date": cycle["end_date"],
+        "metrics": snapshot["metrics"],
+        "participants": [
+            {"id": u["id"], "username": u["username"], "is_self": u["id"] == request.user.id}
+            for u in review_targets(snapshot, request.user.id)
+        ]
+    })
+    response["ETag"] = etag
+    response["Cache-Control"] = "private, no-cache"
+    return response
+
+
+@async_api_view()
+async def metric_list(request):
+    metrics = Metric.objects.order_by('id')
+    review_cycle_id = request.GET.get('review_cycle_id')
+    if review_cycle_id:
+        metrics = metrics.filter(review_cycles__id=review_cycle_id)
+
+    rows = {m["id"]: {**m, "review_cycles": []}
+            async for m in metrics.values('id', 'name', 'description').aiterator()}
+    links = Metric.review_cycles.through.objects.filter(metric_id__in=metrics.values('id')).order_by('id')
+    async for link in links.values('metric_id', 'reviewcycle_id').aiterator():
+        rows[link["metric_id"]]["review_cycles"].append(link["reviewcycle_id"])
+    return json_list(list(rows.values()))
+
+
+@async_api_view()
+async def user_list(request):
+    users = User.objects.order_by('id')
+    group_id = request.GET.get('group_id')
+    if group_id:
+        users = users.filter(groups__id=group_id)
+
+    rows = {u["id"]: {**u, "groups": []}
+            async for u in users.values('id', 'username', 'email', 'is_staff').aiterator()}
+    memberships = User.groups.through.objects.filter(user_id__in=users.values('id')).order_by('id')
+    async for membership in memberships.values('user_id', 'group_id', 'group__name').aiterator():
+        rows[membership["user_id"]]["groups"].append(
+            {"id": membership["group_id"], "name": membership["group__name"]}
+        )
+    return json_list([
+        {"id": u["id"], "username": u["username"], "email": u["email"], "groups": u["groups"],
+         "is_staff": u["is_staff"]}
+        for u in rows.values()
+    ])
+
+
+@async_api_view(admin_only=True)
+async def review_cycle_results(request, cycle_id):
+    review_cycle = await ReviewCycle.objects.filter(id=cycle_id).values(
+        'id', 'name', frozen=F('frozen_results__results')
+    ).afirst()
+    if review_cycle is None:
+        return JsonResponse({"detail": "Review cycle not found."}, status=404)
+
+    results = review_cycle["frozen"]
+    if results is None:
+        results = build_results([row async for row in cycle_results_queryset(cycle_id).aiterator()])
+    return JsonResponse({
+        "cycle_id": review_cycle["id"],
+        "cycle_name": review_cycle["name"],
+        "results": results,
+    })
+
+
+def sse_message(name, data, event_id=None):
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines += [f"event: {name}", f"data: {json.dumps(data, cls=DjangoJSONEncoder)}"]
+    return ("\n".join(lines) + "\n\n").encode()
+
+
+@async_api_view(admin_only=True, query_token=True)
+async def review_cycle_events(request, cycle_id):
+    """
+    Server-sent events for one cycle: a ``completion`` event with the
+    current counters, then ``submission_finalized`` and
+    ``aggregates_changed`` as submissions commit.  Comments are sent as
+    keep-alives while nothing happens.
+    """
+    if not await ReviewCycle.objects.filter(id=cycle_id).aexists():
+        return JsonResponse({"detail": "Review cycle not found."}, status=404)
+    heartbeat = event_settings()['HEARTBEAT']
+
+    async def stream():
+        # subscribe before reading the counters so nothing falls in between
+        subscription = get_broker().subscribe(cycle_channel(cycle_id))
+        try:
+            counts = await CycleCompletion.objects.filter(review_cycle_id=cycle_id).values(
+                'participant_count', 'finalized_count').afirst() or {'participant_count': 0, 'finalized_count': 0}
+            yield sse_message("completion", {
+                "cycle_id": cycle_id,
+                "participants": counts['participant_count'],
+                "finalized": counts['finalized_count'],
+                "percentage": percentage(counts['finalized_count'], counts['participant_count']),
+            })
+            while True:
+                event = await subscription.get(heartbeat)
+                if event is None:
+                    yield b": keep-alive\n\n"
+                else:
+                    yield sse_message(event["event"], event["data"], event["id"])
+        finally:
+            subscription.close()
+
+    response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # don't let a proxy hold events back
+    return response
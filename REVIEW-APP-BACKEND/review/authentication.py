@@ -0,0 +1,153 @@
+# review/authentication.py
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+STAFF_CLAIM = 'is_staff'
+GROUPS_CLAIM = 'groups'
+
+
+class ReviewRefreshToken(RefreshToken):
+    """Refresh token whose access tokens also carry ``is_staff`` and group ids."""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token[STAFF_CLAIM] = user.is_staff
+        token[GROUPS_CLAIM] = sorted(user.groups.values_list('id', flat=True))
+        return token
+
+
+class UserCache:
+    """
+    Bounded LRU of resolved users with a time-to-live.
+
+    Entries are ``(user, loaded_at)``; ``user.group_ids`` is filled in when
+    the user is loaded so token claims can be checked against it.  The
+    cache is per process: signals evict entries in the process that made
+    the change and the TTL bounds staleness everywhere else.
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def get(self, user_id):
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is None:
+                return None
+            if time.time() - entry[1] > self.ttl:
+                del self.entries[user_id]
+                return None
+            self.entries.move_to_end(user_id)
+            return entry
+
+    def set(self, user):
+        with self.lock:
+            self.entries[user.pk] = (user, time.time())
+            self.entries.move_to_end(user.pk)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, user_ids):
+        with self.lock:
+            for user_id in user_ids:
+                self.entries.pop(user_id, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+_config = {'MAX_SIZE': 10000, 'TTL': 60, **getattr(settings, 'REVIEW_USER_CACHE', {})}
+user_cache = UserCache(_config['MAX_SIZE'], _config['TTL'])
+
+
+def claims_match(user, validated_token):
+    """Whether the token's ``is_staff``/``groups`` claims agree with ``user``."""
+    if STAFF_CLAIM in validated_token and validated_token[STAFF_CLAIM] != user.is_staff:
+        return False
+    if GROUPS_CLAIM in validated_token and set(validated_token[GROUPS_CLAIM]) != user.group_ids:
+        return False
+    return True
+
+
+def cached_user(validated_token):
+    """
+    Return a copy of the cached user for ``validated_token`` or ``None``.
+
+    A token issued after the entry was loaded whose claims disagree with it
+    means the user changed in another process, so the entry is ignored and
+    reloaded once.
+    """
+    entry = user_cache.get(validated_token.get(api_settings.USER_ID_CLAIM))
+    if entry is None:
+        return None
+    user, loaded_at = entry
+    if validated_token.get('iat', 0) > loaded_at and not claims_match(user, validated_token):
+        return None
+    return copy.copy(user)
+
+
+def check_user(user):
+    if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+        raise AuthenticationFailed("User is inactive", code="user_inactive")
+    return user
+
+
+def user_id_from(validated_token):
+    try:
+        return validated_token[api_settings.USER_ID_CLAIM]
+    except KeyError:
+        raise InvalidToken("Token contained no recognizable user identification")
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    ``JWTAuthentication`` that resolves users through ``user_cache``.
+
+    A cache hit costs no queries; a miss loads the user and their group ids
+    once and caches them.
+    """
+
+    def get_user(self, validated_token):
+        user = cached_user(validated_token)
+        if user is not None:
+            return check_user(user)
+
+        user_id = user_id_from(validated_token)
+        try:
+            user = User.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+        except User.DoesNotExist:
+            raise AuthenticationFailed("User not found", code="user_not_found")
+        user.group_ids = frozenset(user.groups.values_list('id', flat=True))
+        user_cache.set(user)
+        return check_user(copy.copy(user))
+
+
+async def aget_user(validated_token):
+    """Async ORM counterpart of ``CachedJWTAuthentication.get_user``."""
+    user = cached_user(validated_token)
+    if user is not None:
+        return check_user(user)
+
+    user_id = user_id_from(validated_token)
+    try:
+        user = await User.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+    except User.DoesNotExist:
+        raise AuthenticationFailed("User not found", code="user_not_found")
+    user.group_ids = frozenset([group_id async for group_id in user.groups.values_list('id', flat=True)])
+    user_cache.set(user)
+    return check_user(copy.copy(user))
+
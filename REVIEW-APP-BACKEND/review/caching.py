@@ -0,0 +1,141 @@
+# review/caching.py
+import hashlib
+import json
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+
+from .models import Metric, ReviewAssignment, ReviewCycle
+from .routers import primary_reads, replica_alias
+
+SNAPSHOT_TIMEOUT = 60 * 60
+# backends whose entries live in one process, out of reach of other workers' invalidations
+PROCESS_LOCAL_CACHES = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+
+def check_shared_cache():
+    """
+    Refuse a process-local default cache outside DEBUG, or at all when a
+    read replica is configured.
+
+    Snapshots are invalidated by signals in the process that made the
+    change; with a per-process cache every other worker would keep serving
+    the old snapshot until it expires.  Primary pins (``routers``) live in
+    the same cache, and a pin only one worker can see lets the user's next
+    request read its own write from the lagging replica.
+    """
+    backend = settings.CACHES['default']['BACKEND']
+    if (not settings.DEBUG or replica_alias() is not None) and backend in PROCESS_LOCAL_CACHES:
+        raise ImproperlyConfigured(
+            f"{backend} is local to one process; set PEERREVIEW_CACHE_BACKEND to a cache shared by all "
+            f"workers, e.g. django.core.cache.backends.redis.RedisCache."
+        )
+
+
+def snapshot_key(cycle_id):
+    return f"review:cycle-snapshot:{cycle_id}"
+
+
+def build_cycle_snapshot(cycle_id):
+    """
+    Load everything about an active cycle that is the same for every reviewer,
+    including who reviews whom in cycles with assignments.
+
+    Returns ``None`` when the cycle does not exist or is not active.
+    """
+    cycle = ReviewCycle.objects.filter(id=cycle_id, is_active=True).values(
+        'id', 'name', 'group_id', 'start_date', 'end_date', 'reviews_per_reviewer', 'assignment_seed'
+    ).first()
+    if cycle is None:
+        return None
+
+    return _versioned({
+        "cycle": cycle,
+        "metrics": list(_snapshot_metrics(cycle_id)),
+        "participants": list(_snapshot_participants(cycle['group_id'])),
+        "assignments": _assignment_map(_snapshot_assignments(cycle)),
+    })
+
+
+def _snapshot_metrics(cycle_id):
+    return Metric.objects.filter(review_cycles=cycle_id).order_by('id').values('id', 'name')
+
+
+def _snapshot_participants(group_id):
+    return User.objects.filter(groups=group_id).order_by('id').values('id', 'username')
+
+
+def _snapshot_assignments(cycle):
+    if not cycle['reviews_per_reviewer']:
+        return ReviewAssignment.objects.none()
+    return ReviewAssignment.objects.filter(review_cycle_id=cycle['id']).order_by(
+        'reviewer_id', 'target_user_id').values_list('reviewer_id', 'target_user_id')
+
+
+def _assignment_map(pairs):
+    assigned = {}
+    for reviewer_id, target_user_id in pairs:
+        assigned.setdefault(reviewer_id, []).append(target_user_id)
+    return assigned
+
+
+def _versioned(snapshot):
+    snapshot["version"] = hashlib.sha1(
+        json.dumps(snapshot, default=str, sort_keys=True).encode()
+    ).hexdigest()[:16]
+    return snapshot
+
+
+async def abuild_cycle_snapshot(cycle_id):
+    """Async ORM counterpart of ``build_cycle_snapshot``."""
+    cycle = await ReviewCycle.objects.filter(id=cycle_id, is_active=True).values(
+        'id', 'name', 'group_id', 'start_date', 'end_date', 'reviews_per_reviewer', 'assignment_seed'
+    ).afirst()
+    if cycle is None:
+        return None
+
+    return _versioned({
+        "cycle": cycle,
+        "metrics": [row async for row in _snapshot_metrics(cycle_id)],
+        "participants": [row async for row in _snapshot_participants(cycle['group_id'])],
+        "assignments": _assignment_map([pair async for pair in _snapshot_assignments(cycle)]),
+    })
+
+
+def get_cycle_snapshot(cycle_id):
+    snapshot = cache.get(snapshot_key(cycle_id))
+    if snapshot is None:
+        # a lagging replica would put stale members in the shared cache
+        with primary_reads():
+            snapshot = build_cycle_snapshot(cycle_id)
+        if snapshot is not None:
+            cache.set(snapshot_key(cycle_id), snapshot, SNAPSHOT_TIMEOUT)
+    return snapshot
+
+
+async def aget_cycle_snapshot(cycle_id):
+    snapshot = await cache.aget(snapshot_key(cycle_id))
+    if snapshot is None:
+        with primary_reads():
+            snapshot = await abuild_cycle_snapshot(cycle_id)
+        if snapshot is not None:
+            await cache.aset(snapshot_key(cycle_id), snapshot, SNAPSHOT_TIMEOUT)
+    return snapshot
+
+
+def invalidate_cycle_snapshots(cycle_ids):
+    keys = [snapshot_key(cycle_id) for cycle_id in cycle_ids]
+    if keys:
+        cache.delete_many(keys)
+
+
+def invalidate_group_snapshots(group_ids):
+    if group_ids:
+        invalidate_cycle_snapshots(
+            ReviewCycle.objects.filter(group_id__in=group_ids).values_list('id', flat=True)
+        )
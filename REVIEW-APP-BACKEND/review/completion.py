@@ -0,0 +1,107 @@
+# review/completion.py
+from django.contrib.auth.models import User
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import CycleCompletion, ReviewCycle, SubmissionStatus
+
+Membership = User.groups.through
+
+
+def _member_count(group_id):
+    return Coalesce(Subquery(
+        Membership.objects.filter(group_id=group_id).values('group_id').annotate(n=Count('id')).values('n')
+    ), Value(0))
+
+
+def _finalized_count(review_cycle_id):
+    return Coalesce(Subquery(
+        SubmissionStatus.objects.filter(review_cycle_id=review_cycle_id, finalized=True)
+        .values('review_cycle_id').annotate(n=Count('id')).values('n')
+    ), Value(0))
+
+
+def percentage(finalized, participants):
+    return round(finalized / participants * 100, 1) if participants else 0.0
+
+
+def create_completion(review_cycle):
+    CycleCompletion.objects.get_or_create(review_cycle=review_cycle, defaults={
+        'group_id': review_cycle.group_id,
+        'participant_count': Membership.objects.filter(group_id=review_cycle.group_id).count(),
+    })
+
+
+def record_finalized(review_cycle_id, delta=1):
+    """
+    Move the cycle's finalized counter by ``delta`` with an in-place
+    ``UPDATE``, so concurrent submissions never lose an increment.
+    """
+    updated = CycleCompletion.objects.filter(review_cycle_id=review_cycle_id).update(
+        finalized_count=Greatest(F('finalized_count') + delta, 0)
+    )
+    if not updated and delta > 0:
+        # cycles created before counters existed
+        rebuild_completion([review_cycle_id])
+
+
+def refresh_participant_counts(group_ids):
+    """Recount members for every cycle of the given groups in one ``UPDATE``."""
+    return CycleCompletion.objects.filter(group_id__in=list(group_ids)).update(
+        participant_count=_member_count(OuterRef('group_id'))
+    )
+
+
+def rebuild_completion(review_cycle_ids=None):
+    """Recompute both counters from memberships and ``SubmissionStatus``."""
+    cycles = ReviewCycle.objects.all()
+    if review_cycle_ids:
+        cycles = cycles.filter(id__in=review_cycle_ids)
+    CycleCompletion.objects.bulk_create([
+        CycleCompletion(review_cycle_id=cycle_id, group_id=group_id)
+        for cycle_id, group_id in cycles.filter(completion__isnull=True).values_list('id', 'group_id')
+    ], ignore_conflicts=True)
+    return CycleCompletion.objects.filter(review_cycle__in=cycles).update(
+        participant_count=_member_count(OuterRef('group_id')),
+        finalized_count=_finalized_count(OuterRef('review_cycle_id')),
+    )
+
+
+def completion_dashboard(group_id=None):
+    """Completion of every active cycle plus totals per group, from one query."""
+    rows = CycleCompletion.objects.filter(review_cycle__is_active=True)
+    if group_id:
+        rows = rows.filter(group_id=group_id)
+    rows = rows.order_by('group_id', 'review_cycle_id').values(
+        'review_cycle_id', 'group_id', 'participant_count', 'finalized_count',
+        cycle_name=F('review_cycle__name'), group_name=F('group__name'),
+    )
+
+    cycles = []
+    groups = {}
+    for row in rows:
+        cycles.append({
+            "cycle_id": row['review_cycle_id'],
+            "cycle_name": row['cycle_name'],
+            "group_id": row['group_id'],
+            "participants": row['participant_count'],
+            "finalized": row['finalized_count'],
+            "percentage": percentage(row['finalized_count'], row['participant_count']),
+        })
+        group = groups.setdefault(row['group_id'], {
+            "group_id": row['group_id'], "group_name": row['group_name'],
+            "cycles": 0, "participants": 0, "finalized": 0,
+        })
+        group["cycles"] += 1
+        group["participants"] += row['participant_count']
+        group["finalized"] += row['finalized_count']
+    for group in groups.values():
+        group["percentage"] = percentage(group["finalized"], group["participants"])
+    return {"cycles": cycles, "groups": list(groups.values())}
+
+
+def pending_users(review_cycle):
+    """Members of the cycle's group who have not finalized yet."""
+    finalized = SubmissionStatus.objects.filter(review_cycle=review_cycle, finalized=True).values('user_id')
+    return list(User.objects.filter(groups=review_cycle.group_id).exclude(id__in=finalized)
+                .order_by('username').values('id', 'username'))
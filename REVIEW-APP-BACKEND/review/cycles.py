@@ -0,0 +1,97 @@
+# review/cycles.py
+import logging
+
+from django.db import transaction
+from django.utils import timezone
+
+from .aggregates import build_results, cycle_results_queryset
+from .analytics import build_report, load_cycle_matrix
+from .caching import invalidate_cycle_snapshots
+from .models import FrozenCycleResults, ReviewCycle
+from .trends import rollup_cycle
+
+logger = logging.getLogger(__name__)
+
+
+def freeze_results(review_cycle):
+    """Store the cycle's results and report so reads after closing are one row."""
+    frozen, _ = FrozenCycleResults.objects.update_or_create(review_cycle=review_cycle, defaults={
+        'results': build_results(cycle_results_queryset(review_cycle.id)),
+        'report': build_report(load_cycle_matrix(review_cycle)),
+    })
+    return frozen
+
+
+def frozen_payload(review_cycle, field):
+    """``results`` or ``report`` frozen for a closed cycle, else ``None``.
+
+    Load the cycle with ``select_related('frozen_results')`` to avoid a query.
+    """
+    try:
+        return getattr(review_cycle.frozen_results, field)
+    except FrozenCycleResults.DoesNotExist:
+        return None
+
+
+def finish_closing(review_cycle):
+    """Roll up trends and freeze results of a cycle already marked closed."""
+    with transaction.atomic():
+        points = rollup_cycle(review_cycle)
+        freeze_results(review_cycle)
+    return points
+
+
+def close_review_cycle(review_cycle):
+    """Deactivate a cycle, append it to the trend rollup and freeze its results."""
+    with transaction.atomic():
+        review_cycle.is_active = False
+        review_cycle.closed_at = timezone.now()
+        review_cycle.save(update_fields=['is_active', 'closed_at'])
+        return finish_closing(review_cycle)
+
+
+def sync_review_cycles(today=None):
+    """
+    Bring ``is_active`` in line with the cycles' dates.
+
+    Open cycles whose ``start_date`` has come are activated unless they
+    were active before (an admin deactivating a running cycle is not
+    overridden), ones that have not started yet are deactivated, and ones
+    whose ``end_date`` has passed are closed.  Activation and deferral are
+    one ``UPDATE`` each.  Each close commits together with its rollup and
+    frozen results, so a cycle whose rollup fails stays open and the next
+    run retries it; closed cycles without frozen results (e.g. from before
+    this was atomic) are finished too.  Returns the ids touched.
+    """
+    today = today or timezone.localdate()
+    now = timezone.now()
+    open_cycles = ReviewCycle.objects.filter(closed_at__isnull=True)
+
+    with transaction.atomic():
+        to_activate = list(open_cycles.filter(is_active=False, activated_at__isnull=True, start_date__lte=today,
+                                              end_date__gte=today).values_list('id', flat=True))
+        to_defer = list(open_cycles.filter(is_active=True, start_date__gt=today).values_list('id', flat=True))
+        ReviewCycle.objects.filter(id__in=to_activate).update(is_active=True, activated_at=now)
+        # started again later, they are activated again
+        ReviewCycle.objects.filter(id__in=to_defer).update(is_active=False, activated_at=None)
+        # update() skips the post_save receivers that drop participant snapshots
+        transaction.on_commit(lambda: invalidate_cycle_snapshots(to_activate + to_defer))
+
+    closed = []
+    unfinished = ReviewCycle.objects.filter(closed_at__isnull=False, frozen_results__isnull=True)
+    for review_cycle in (open_cycles.filter(end_date__lt=today) | unfinished).only('id', 'group_id', 'end_date',
+                                                                                   'closed_at'):
+        closing = review_cycle.closed_at is None
+        try:
+            with transaction.atomic():
+                if closing:
+                    ReviewCycle.objects.filter(id=review_cycle.id).update(is_active=False, closed_at=now)
+                finish_closing(review_cycle)
+                transaction.on_commit(lambda cycle_id=review_cycle.id: invalidate_cycle_snapshots([cycle_id]))
+        except Exception:
+            logger.exception("Closing review cycle %s failed; the next sync retries it", review_cycle.id)
+            continue
+        if closing:
+            closed.append(review_cycle.id)
+
+    return {"activated": to_activate, "deferred": to_defer, "closed": closed}
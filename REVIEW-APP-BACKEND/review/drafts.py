@@ -0,0 +1,78 @@
+# review/drafts.py
+from django.db import transaction
+from django.db.models import Q
+
+from .models import RatingDraft
+from .submissions import check_complete, submit_ratings
+
+IDEMPOTENCY_TIMEOUT = 24 * 60 * 60
+
+
+def idempotency_cache_key(reviewer_id, review_cycle_id, key):
+    return f"review:draft-idempotency:{reviewer_id}:{review_cycle_id}:{key}"
+
+
+def save_draft_changes(review_cycle_id, reviewer, changes):
+    """
+    Apply autosaved cell changes; a ``None`` value clears the cell.
+
+    Values are written with a single ``INSERT ... ON CONFLICT DO UPDATE``
+    and cleared cells with a single ``DELETE``; when a cell appears more
+    than once the last change wins.  Returns ``(saved, cleared)``.
+    """
+    cells = {(change['target_user'], change['metric']): change['value'] for change in changes}
+    saved = [(cell, value) for cell, value in cells.items() if value is not None]
+    cleared = [cell for cell, value in cells.items() if value is None]
+
+    if saved:
+        RatingDraft.objects.bulk_create(
+            [
+                RatingDraft(review_cycle_id=review_cycle_id, reviewer=reviewer, target_user_id=target_user_id,
+                            metric_id=metric_id, value=value)
+                for (target_user_id, metric_id), value in saved
+            ],
+            update_conflicts=True,
+            unique_fields=['review_cycle', 'reviewer', 'target_user', 'metric'],
+            update_fields=['value', 'updated_at'],
+        )
+    if cleared:
+        cells_filter = Q()
+        for target_user_id, metric_id in cleared:
+            cells_filter |= Q(target_user_id=target_user_id, metric_id=metric_id)
+        RatingDraft.objects.filter(cells_filter, review_cycle_id=review_cycle_id, reviewer=reviewer).delete()
+    return len(saved), len(cleared)
+
+
+def draft_cells(review_cycle_id, reviewer):
+    """``(metric_id, target_user_id, value, updated_at)`` rows of the reviewer's draft."""
+    return RatingDraft.objects.filter(review_cycle_id=review_cycle_id, reviewer=reviewer).order_by(
+        'metric_id', 'target_user_id').values_list('metric_id', 'target_user_id', 'value', 'updated_at')
+
+
+def group_cells(cells):
+    """Draft rows in the ``ratings`` shape of a bulk submission."""
+    blocks = {}
+    for metric_id, target_user_id, value, _ in cells:
+        blocks.setdefault(metric_id, []).append({"target_user": target_user_id, "value": value})
+    return [{"metric": metric_id, "values": values} for metric_id, values in blocks.items()]
+
+
+def draft_ratings(review_cycle_id, reviewer):
+    """The reviewer's draft in the ``ratings`` shape of a bulk submission."""
+    return group_cells(draft_cells(review_cycle_id, reviewer))
+
+
+def finalize_draft(review_cycle, reviewer):
+    """
+    Promote a complete draft to ratings in one transaction.
+
+    The draft goes through the same completeness check and bulk write as
+    ``BulkRatingSubmitView``, then is deleted so only the anonymous
+    ``Rating`` rows remain.  Raises ``SubmissionError`` for incomplete drafts.
+    """
+    ratings = draft_ratings(review_cycle.id, reviewer)
+    usernames, metric_names = check_complete(review_cycle, ratings, reviewer)
+    with transaction.atomic():
+        submitted = submit_ratings(review_cycle, reviewer, ratings, usernames, metric_names)
+        RatingDraft.objects.filter(review_cycle=review_cycle, reviewer=reviewer).delete()
+    return submitted
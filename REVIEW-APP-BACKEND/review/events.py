@@ -0,0 +1,147 @@
+# review/events.py
+"""
+Publish/subscribe for live review cycle events.
+
+The submit path publishes after its transaction commits; the SSE view in
+``review/async_views.py`` subscribes per connection.  The broker is chosen
+with ``REVIEW_EVENTS['BACKEND']``.  The default ``InProcessBroker`` needs
+no external service but only reaches subscribers in the same process, so
+serve the API and the event stream from one ASGI process (or plug in a
+broker with the same interface backed by a shared service).
+"""
+import asyncio
+import itertools
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .completion import percentage
+from .models import CycleCompletion
+
+EVENT_DEFAULTS = {
+    'BACKEND': 'review.events.InProcessBroker',
+    'HEARTBEAT': 15,        # seconds between keep-alive comments
+    'QUEUE_SIZE': 100,      # events buffered per subscriber before the oldest is dropped
+}
+
+
+def event_settings():
+    return {**EVENT_DEFAULTS, **getattr(settings, 'REVIEW_EVENTS', {})}
+
+
+def cycle_channel(review_cycle_id):
+    return f"cycle:{review_cycle_id}"
+
+
+class Subscription:
+    """One subscriber's bounded queue, fed from any thread."""
+
+    def __init__(self, broker, channel, size):
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=size)
+
+    def deliver(self, event):
+        # runs on the subscriber's loop
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout):
+        """Next event, or ``None`` if nothing arrived within ``timeout`` seconds."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker:
+    """Fan events out to subscribers of this process."""
+
+    def __init__(self, queue_size=EVENT_DEFAULTS['QUEUE_SIZE']):
+        self.queue_size = queue_size
+        self.lock = threading.Lock()
+        self.channels = {}
+        self.ids = itertools.count(1)
+
+    def subscribe(self, channel):
+        """Must be called from the event loop that will read the subscription."""
+        subscription = Subscription(self, channel, self.queue_size)
+        with self.lock:
+            self.channels.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            subscribers = self.channels.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self.channels[subscription.channel]
+
+    def has_subscribers(self, channel):
+        return bool(self.channels.get(channel))
+
+    def publish(self, channel, name, data):
+        """Send ``data`` as event ``name``; safe to call from any thread."""
+        event = {"id": next(self.ids), "event": name, "data": data}
+        with self.lock:
+            subscribers = list(self.channels.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:
+                # the subscriber's loop has shut down
+                self.unsubscribe(subscription)
+        return len(subscribers)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            config = event_settings()
+            _broker = import_string(config['BACKEND'])(queue_size=config['QUEUE_SIZE'])
+        return _broker
+
+
+def reset_broker():
+    global _broker
+    with _broker_lock:
+        _broker = None
+
+
+def publish_submission(review_cycle_id, newly_finalized, metric_ids, target_count):
+    """
+    Announce a committed submission to the cycle's subscribers.
+
+    Events carry counts, never reviewer identities, so ratings stay
+    anonymous to whoever watches the stream.
+    """
+    broker = get_broker()
+    channel = cycle_channel(review_cycle_id)
+    if not broker.has_subscribers(channel):
+        return
+    if newly_finalized:
+        counts = CycleCompletion.objects.filter(review_cycle_id=review_cycle_id).values(
+            'participant_count', 'finalized_count').first() or {'participant_count': 0, 'finalized_count': 0}
+        broker.publish(channel, 'submission_finalized', {
+            "cycle_id": review_cycle_id,
+            "participants": counts['participant_count'],
+            "finalized": counts['finalized_count'],
+            "percentage": percentage(counts['finalized_count'], counts['participant_count']),
+        })
+    broker.publish(channel, 'aggregates_changed', {
+        "cycle_id": review_cycle_id,
+        "metric_ids": sorted(metric_ids),
+        "target_count": target_count,
+    })
@@ -0,0 +1,111 @@
+# review/export.py
+import csv
+import itertools
+import json
+import zlib
+
+from .archive import archived_rating_rows, purged_archive
+from .models import Rating, WeaknessNote
+from .packing import packed_rating_rows
+
+EXPORT_CHUNK_SIZE = 2000
+# Encoded output is handed to the response in blocks of roughly this size
+# so large exports don't turn into one tiny write per row.
+BLOCK_SIZE = 64 * 1024
+
+RATING_COLUMNS = ['id', 'target_user_id', 'target_user', 'metric_id', 'metric', 'value', 'is_self_review']
+NOTE_COLUMNS = ['id', 'target_user_id', 'target_user', 'note', 'created_at']
+
+
+class Echo:
+    """File-like object whose ``write`` hands the value back to csv.writer's caller."""
+
+    def write(self, value):
+        return value
+
+
+def rating_rows(review_cycle, chunk_size=EXPORT_CHUNK_SIZE):
+    archive = purged_archive(review_cycle.id)
+    if archive is not None:
+        return archived_rating_rows(archive, chunk_size)
+    rows = Rating.objects.filter(review_cycle=review_cycle).order_by('id').values_list(
+        'id', 'target_user_id', 'target_user__username', 'metric_id', 'metric__name',
+        'value', 'is_self_review'
+    ).iterator(chunk_size=chunk_size)
+    if review_cycle.packed_ratings:
+        # packed ratings have no id of their own and are exported with none
+        return itertools.chain(rows, packed_rating_rows(review_cycle.id, chunk_size))
+    return rows
+
+
+def note_rows(review_cycle, chunk_size=EXPORT_CHUNK_SIZE):
+    return WeaknessNote.objects.filter(review_cycle=review_cycle).order_by('id').values_list(
+        'id', 'target_user_id', 'target_user__username', 'note', 'created_at'
+    ).iterator(chunk_size=chunk_size)
+
+
+EXPORTS = {
+    'ratings': (RATING_COLUMNS, rating_rows),
+    'notes': (NOTE_COLUMNS, note_rows),
+}
+
+
+def csv_lines(columns, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def ndjson_lines(columns, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(columns, row)), default=str) + "\n"
+
+
+ENCODERS = {
+    'csv': ('text/csv', csv_lines),
+    'ndjson': ('application/x-ndjson', ndjson_lines),
+}
+
+
+def blocks(lines, block_size=BLOCK_SIZE):
+    """
+    Group encoded lines into byte blocks.
+
+    The first line goes out on its own so the client sees the first byte
+    before the database has produced the first chunk of rows.
+    """
+    buffer = []
+    size = 0
+    for index, line in enumerate(lines):
+        data = line.encode('utf-8')
+        if index == 0:
+            yield data
+            continue
+        buffer.append(data)
+        size += len(data)
+        if size >= block_size:
+            yield b''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def gzip_blocks(chunks):
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_stream(review_cycle, kind='ratings', output='csv', compress=False, chunk_size=EXPORT_CHUNK_SIZE):
+    """Return ``(content_type, iterator of bytes)`` for a cycle export."""
+    columns, fetch = EXPORTS[kind]
+    content_type, encode = ENCODERS[output]
+    stream = blocks(encode(columns, fetch(review_cycle, chunk_size)))
+    if compress:
+        return 'application/gzip', gzip_blocks(stream)
+    return content_type, stream
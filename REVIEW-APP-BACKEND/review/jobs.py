@@ -0,0 +1,237 @@
+# review/jobs.py
+import logging
+import os
+import socket
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import Group
+from django.db import connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .aggregates import rebuild_aggregates
+from .archive import archive_cycle, restore_cycle
+from .cycles import close_review_cycle
+from .models import Job, ReviewCycle
+from .user_import import import_users
+
+logger = logging.getLogger(__name__)
+
+JOB_DEFAULTS = {
+    'WORKERS': 4,
+    'POLL_INTERVAL': 1.0,
+    'RETRY_DELAY': 10,
+    'STALE_AFTER': 900,
+    'HEARTBEAT_INTERVAL': 60,
+}
+
+# kind -> (handler, sensitive)
+HANDLERS = {}
+
+
+def job_settings():
+    return {**JOB_DEFAULTS, **getattr(settings, 'REVIEW_JOBS', {})}
+
+
+def job_handler(kind, sensitive=False):
+    """
+    Register ``func(job)`` as the handler for ``kind``.
+
+    The return value must be JSON serialisable and is stored as the job's
+    result.  Payloads of ``sensitive`` kinds (e.g. passwords) are cleared
+    as soon as a worker picks the job up, so such jobs get one attempt.
+    """
+    def register(func):
+        HANDLERS[kind] = (func, sensitive)
+        return func
+    return register
+
+
+def enqueue(kind, payload=None, user=None, max_attempts=3):
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    return Job.objects.create(kind=kind, payload=payload or {}, created_by=user, max_attempts=max_attempts,
+                              run_after=timezone.now())
+
+
+def report_progress(job, done, total, message=''):
+    """Record how far a running job got; visible to pollers immediately."""
+    job.progress = round(done / total * 100, 1) if total else 100.0
+    job.progress_message = message[:200]
+    Job.objects.filter(id=job.id).update(progress=job.progress, progress_message=job.progress_message,
+                                         heartbeat_at=timezone.now())
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def sensitive_kinds():
+    return [kind for kind, (_, sensitive) in HANDLERS.items() if sensitive]
+
+
+def requeue_stale(stale_after):
+    """
+    Give running jobs whose heartbeat stopped another attempt, or fail them
+    if they are out of attempts or their sensitive payload is already gone.
+    """
+    now = timezone.now()
+    stale = Job.objects.filter(status=Job.RUNNING, heartbeat_at__lt=now - timedelta(seconds=stale_after))
+    failed = stale.filter(Q(attempts__gte=F('max_attempts')) | Q(kind__in=sensitive_kinds())).update(
+        status=Job.FAILED, finished_at=now, locked_by='', payload={}, error="Worker stopped responding."
+    )
+    return failed + stale.update(status=Job.QUEUED, run_after=now, locked_by='')
+
+
+def _heartbeat(job_id, interval, stopped):
+    try:
+        while not stopped.wait(interval):
+            Job.objects.filter(id=job_id, status=Job.RUNNING).update(heartbeat_at=timezone.now())
+    finally:
+        connections.close_all()
+
+
+def heartbeat(job):
+    """
+    Start renewing ``job``'s heartbeat from a background thread, so handlers
+    that never report progress are not taken for lost.  Returns the event
+    that stops it.
+    """
+    stopped = threading.Event()
+    threading.Thread(target=_heartbeat, args=(job.id, job_settings()['HEARTBEAT_INTERVAL'], stopped),
+                     name=f'review-job-{job.id}-heartbeat', daemon=True).start()
+    return stopped
+
+
+def claim_jobs(worker, limit=1, kinds=None):
+    """
+    Mark up to ``limit`` due jobs as running for ``worker``.
+
+    Each claim is a conditional ``UPDATE`` on the queued status, so
+    concurrent workers never run the same job without needing row locks.
+    """
+    now = timezone.now()
+    due = Job.objects.filter(status=Job.QUEUED, run_after__lte=now).order_by('run_after', 'id')
+    if kinds:
+        due = due.filter(kind__in=kinds)
+    claimed = []
+    for job_id in due.values_list('id', flat=True)[:limit * 2]:
+        if Job.objects.filter(id=job_id, status=Job.QUEUED).update(
+            status=Job.RUNNING, locked_by=worker, started_at=now, heartbeat_at=now, attempts=F('attempts') + 1
+        ):
+            claimed.append(job_id)
+            if len(claimed) == limit:
+                break
+    return list(Job.objects.filter(id__in=claimed).order_by('id'))
+
+
+def run_job(job):
+    """Run a claimed job and record success, a retry or the final failure."""
+    handler, sensitive = HANDLERS.get(job.kind, (None, False))
+    if sensitive:
+        # the handler reads the claimed copy; nothing stays behind in the table
+        Job.objects.filter(id=job.id).update(payload={})
+    stopped = heartbeat(job)
+    try:
+        if handler is None:
+            raise LookupError(f"No handler registered for job kind '{job.kind}'.")
+        result = handler(job)
+    except Exception:
+        logger.exception("Job %s (%s) failed on attempt %s", job.id, job.kind, job.attempts)
+        changes = {'error': traceback.format_exc()[-4000:], 'locked_by': ''}
+        finished = handler is None or sensitive or job.attempts >= job.max_attempts
+        if finished:
+            changes.update(status=Job.FAILED, finished_at=timezone.now())
+        else:
+            delay = job_settings()['RETRY_DELAY'] * 2 ** (job.attempts - 1)
+            changes.update(status=Job.QUEUED, run_after=timezone.now() + timedelta(seconds=delay))
+    else:
+        changes = {'status': Job.SUCCEEDED, 'result': result, 'progress': 100.0, 'finished_at': timezone.now(),
+                   'error': '', 'locked_by': ''}
+    finally:
+        stopped.set()
+    if sensitive:
+        changes['payload'] = {}
+
+    Job.objects.filter(id=job.id).update(**changes)
+    for field, value in changes.items():
+        setattr(job, field, value)
+    return job
+
+
+def _run_in_thread(job):
+    try:
+        return run_job(job)
+    finally:
+        # worker threads open their own connections
+        connections.close_all()
+
+
+def run_pending(worker, pool=None, batch=1, kinds=None):
+    """
+    Claim and run up to ``batch`` due jobs; returns how many ran.
+
+    Jobs run on ``pool`` when one is given, otherwise one at a time in the
+    calling thread.
+    """
+    jobs = claim_jobs(worker, batch, kinds)
+    if pool:
+        list(pool.map(_run_in_thread, jobs))
+    else:
+        for job in jobs:
+            run_job(job)
+    return len(jobs)
+
+
+@job_handler('close_review_cycle')
+def close_review_cycle_job(job):
+    review_cycle = ReviewCycle.objects.filter(id=job.payload['cycle_id']).first()
+    if review_cycle is None:
+        return {"detail": "Review cycle not found."}
+    if review_cycle.closed_at is not None:
+        return {"detail": "Review cycle is already closed."}
+    return {"detail": "Review cycle closed.", "trend_points": close_review_cycle(review_cycle)}
+
+
+@job_handler('delete_group')
+def delete_group_job(job):
+    group_id = job.payload['group_id']
+    cycle_ids = list(ReviewCycle.objects.filter(group_id=group_id).values_list('id', flat=True))
+    # one cycle (and its ratings) at a time keeps each transaction short
+    for done, cycle_id in enumerate(cycle_ids):
+        report_progress(job, done, len(cycle_ids) + 1, f"Deleting review cycle {cycle_id}")
+        ReviewCycle.objects.filter(id=cycle_id).delete()
+    Group.objects.filter(id=group_id).delete()
+    return {"detail": "Group deleted.", "deleted_cycles": len(cycle_ids)}
+
+
+@job_handler('rebuild_aggregates')
+def rebuild_aggregates_job(job):
+    with transaction.atomic():
+        written = rebuild_aggregates(job.payload.get('cycle_ids') or None)
+    return {"detail": "Aggregates rebuilt.", "written": written}
+
+
+@job_handler('archive_ratings')
+def archive_ratings_job(job):
+    review_cycle = ReviewCycle.objects.filter(id=job.payload['cycle_id']).first()
+    if review_cycle is None:
+        return {"detail": "Review cycle not found."}
+    archive = archive_cycle(review_cycle, purge=job.payload.get('purge'))
+    return {"detail": "Ratings archived.", "rows": archive.row_count, "size": archive.size, "purged": archive.purged}
+
+
+@job_handler('restore_ratings')
+def restore_ratings_job(job):
+    review_cycle = ReviewCycle.objects.filter(id=job.payload['cycle_id']).first()
+    if review_cycle is None:
+        return {"detail": "Review cycle not found."}
+    return {"detail": "Ratings restored.", "rows": restore_cycle(review_cycle)}
+
+
+@job_handler('import_users', sensitive=True)
+def import_users_job(job):
+    return import_users(job.payload['rows'])
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from review.archive import ArchiveError, archive_cycle
+from review.models import ReviewCycle
+
+
+class Command(BaseCommand):
+    help = ("Write closed review cycles' ratings to columnar archive files, optionally deleting the rows. "
+            "Results and exports keep working from the archive; see restore_ratings to bring rows back.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cycle', type=int, action='append', dest='cycles',
+                            help="Archive this review cycle id (repeatable).")
+        parser.add_argument('--all-closed', action='store_true',
+                            help="Archive every closed cycle whose ratings are not purged yet.")
+        purge = parser.add_mutually_exclusive_group()
+        purge.add_argument('--purge', action='store_true', default=None,
+                           help="Delete the archived rows from the ratings table.")
+        purge.add_argument('--keep', action='store_false', dest='purge',
+                           help="Keep the rows (overrides REVIEW_ARCHIVE['PURGE']).")
+
+    def handle(self, *args, **options):
+        if options['all_closed']:
+            cycles = ReviewCycle.objects.filter(is_active=False).exclude(rating_archive__purged=True)
+        elif options['cycles']:
+            cycles = ReviewCycle.objects.filter(id__in=options['cycles'])
+        else:
+            raise CommandError("Pass --cycle or --all-closed.")
+
+        for review_cycle in cycles.order_by('id'):
+            try:
+                archive = archive_cycle(review_cycle, purge=options['purge'])
+            except ArchiveError as e:
+                self.stderr.write(f"Cycle {review_cycle.id}: {e}")
+                continue
+            self.stdout.write(self.style.SUCCESS(
+                f"Cycle {review_cycle.id}: archived {archive.row_count} ratings in {archive.size} bytes"
+                + (" and purged the rows." if archive.purged else ".")
+            ))
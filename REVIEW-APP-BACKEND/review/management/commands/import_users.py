@@ -0,0 +1,32 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from review.user_import import import_users, parse_rows
+
+
+class Command(BaseCommand):
+    help = "Bulk import users from a CSV or JSON file (username, first_name, last_name, password, email, groups)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'json'],
+                            help="File format (defaults to the file extension).")
+        parser.add_argument('--workers', type=int, help="Password hashing processes (0 hashes inline).")
+        parser.add_argument('--chunk-size', type=int, help="Rows per INSERT batch.")
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        fmt = options['format'] or path.suffix.lstrip('.').lower()
+        try:
+            rows = parse_rows(path.read_text(encoding='utf-8-sig'), fmt)
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc))
+
+        report = import_users(rows, workers=options['workers'], chunk_size=options['chunk_size'])
+        for error in report['errors']:
+            self.stderr.write(f"row {error['row']} ({error['username']}): {json.dumps(error['errors'])}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {report['created']} users, {len(report['errors'])} rows rejected."
+        ))
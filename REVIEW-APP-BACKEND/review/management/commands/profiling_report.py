@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from review.profiling import SQLiteProfileStore, profiling_settings, summarize
+
+
+class Command(BaseCommand):
+    help = "Print a per-route latency and query summary from the profiling store, slowest p95 first."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--store', help="SQLite store to read (defaults to REVIEW_PROFILING['STORE']).")
+        parser.add_argument('--limit', type=int, default=20, help="Number of routes to show.")
+        parser.add_argument('--sort', choices=['p95_ms', 'p99_ms', 'p50_ms', 'count', 'avg_queries', 'avg_db_ms'],
+                            default='p95_ms')
+
+    def handle(self, *args, **options):
+        config = profiling_settings()
+        path = options['store'] or config['STORE']
+        if not path:
+            raise CommandError("No profiling store configured; set REVIEW_PROFILING['STORE'] or pass --store.")
+
+        store = SQLiteProfileStore(path, config['MAX_SAMPLES'], config['FLUSH_EVERY'])
+        rows = summarize(store.all())
+        if not rows:
+            self.stdout.write("No samples recorded yet.")
+            return
+        rows.sort(key=lambda row: row[options['sort']], reverse=True)
+
+        header = f"{'method':<7} {'route':<50} {'count':>7} {'p50':>9} {'p95':>9} {'p99':>9} {'queries':>8} {'db ms':>8} {'n+1':>5}"
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        for row in rows[:options['limit']]:
+            self.stdout.write(
+                f"{row['method']:<7} {row['route'][:50]:<50} {row['count']:>7} "
+                f"{row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} {row['p99_ms']:>9.2f} "
+                f"{row['avg_queries']:>8.1f} {row['avg_db_ms']:>8.2f} {row['duplicate_requests']:>5}"
+            )
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from review.completion import rebuild_completion
+
+
+class Command(BaseCommand):
+    help = "Recompute the CycleCompletion counters from group memberships and SubmissionStatus."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cycle', type=int, action='append', dest='cycles',
+                            help="Limit to this review cycle id (repeatable).")
+
+    def handle(self, *args, **options):
+        updated = rebuild_completion(options['cycles'])
+        self.stdout.write(self.style.SUCCESS(f"Recomputed completion of {updated} review cycle(s)."))
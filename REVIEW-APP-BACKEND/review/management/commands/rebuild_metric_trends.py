@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from review.trends import rebuild_trends
+
+
+class Command(BaseCommand):
+    help = "Rebuild the metric trend rollup of closed review cycles from their RatingAggregate rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cycle', type=int, action='append', dest='cycles',
+                            help="Limit to this review cycle id (repeatable).")
+
+    def handle(self, *args, **options):
+        written = rebuild_trends(options['cycles'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} trend points."))
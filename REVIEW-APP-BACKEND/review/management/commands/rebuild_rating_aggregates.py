@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from review.aggregates import find_drift, rebuild_aggregates
+
+
+class Command(BaseCommand):
+    help = "Rebuild RatingAggregate rows from Rating, or check them for drift with --check."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cycle', type=int, action='append', dest='cycles',
+                            help="Limit to this review cycle id (repeatable).")
+        parser.add_argument('--check', action='store_true',
+                            help="Only report drift; exit with an error if any is found.")
+
+    def handle(self, *args, **options):
+        cycles = options['cycles']
+        drift = find_drift(cycles)
+
+        for key, stored, expected in drift[:50]:
+            cycle_id, user_id, metric_id, is_self_review = key
+            kind = "self" if is_self_review else "peer"
+            self.stdout.write(
+                f"cycle={cycle_id} user={user_id} metric={metric_id} {kind}: "
+                f"stored={stored} expected={expected}"
+            )
+        if len(drift) > 50:
+            self.stdout.write(f"... and {len(drift) - 50} more")
+
+        if options['check']:
+            if drift:
+                raise CommandError(f"{len(drift)} aggregate rows have drifted.")
+            self.stdout.write(self.style.SUCCESS("Aggregates are consistent."))
+            return
+
+        with transaction.atomic():
+            written = rebuild_aggregates(cycles)
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {written} aggregate rows ({len(drift)} had drifted)."
+        ))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from review.archive import restore_cycle
+from review.models import ReviewCycle
+
+
+class Command(BaseCommand):
+    help = "Write purged ratings of archived review cycles back to the ratings table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cycle', type=int, action='append', dest='cycles', required=True,
+                            help="Restore this review cycle id (repeatable).")
+
+    def handle(self, *args, **options):
+        for review_cycle in ReviewCycle.objects.filter(id__in=options['cycles']).order_by('id'):
+            restored = restore_cycle(review_cycle)
+            self.stdout.write(self.style.SUCCESS(f"Cycle {review_cycle.id}: restored {restored} ratings."))
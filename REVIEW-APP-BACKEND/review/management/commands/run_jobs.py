@@ -0,0 +1,45 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from review.jobs import job_settings, requeue_stale, run_pending, worker_name
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs. Polls the job table until interrupted, or drains it with --once."
+
+    def add_arguments(self, parser):
+        config = job_settings()
+        parser.add_argument('--workers', type=int, default=config['WORKERS'],
+                            help="Jobs run concurrently on a thread pool of this size (1 runs them inline).")
+        parser.add_argument('--kind', action='append', dest='kinds',
+                            help="Only run jobs of this kind (repeatable).")
+        parser.add_argument('--once', action='store_true',
+                            help="Exit once no job is due instead of polling.")
+        parser.add_argument('--poll-interval', type=float, default=config['POLL_INTERVAL'])
+
+    def handle(self, *args, **options):
+        config = job_settings()
+        worker = worker_name()
+        workers = max(options['workers'], 1)
+        pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='review-job') if workers > 1 else None
+        self.stdout.write(f"Worker {worker} running jobs with {workers} thread(s).")
+
+        ran = 0
+        try:
+            while True:
+                requeue_stale(config['STALE_AFTER'])
+                count = run_pending(worker, pool, batch=workers, kinds=options['kinds'])
+                ran += count
+                if count:
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if pool:
+                pool.shutdown()
+        self.stdout.write(self.style.SUCCESS(f"Ran {ran} job(s)."))
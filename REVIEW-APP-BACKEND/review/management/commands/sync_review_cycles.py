@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils.dateparse import parse_date
+
+from review.cycles import sync_review_cycles
+
+
+class Command(BaseCommand):
+    help = ("Activate review cycles whose start date has come and close the ones past their end date. "
+            "Run it daily from cron, or keep it running with --every.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=parse_date, help="Treat this day (YYYY-MM-DD) as today.")
+        parser.add_argument('--every', type=float, metavar='SECONDS',
+                            help="Keep running and sync again after this many seconds.")
+
+    def handle(self, *args, **options):
+        while True:
+            changes = sync_review_cycles(options['date'])
+            self.stdout.write(self.style.SUCCESS(
+                f"Activated {len(changes['activated'])}, deferred {len(changes['deferred'])} "
+                f"and closed {len(changes['closed'])} review cycle(s)."
+            ))
+            if not options['every']:
+                return
+            try:
+                time.sleep(options['every'])
+            except KeyboardInterrupt:
+                return
@@ -0,0 +1,95 @@
+# review/memberships.py
+from django.contrib.auth.models import Group, User
+from django.db import transaction
+from django.db.models import Q
+from django.dispatch import Signal
+
+# Sent once per committed batch of membership changes made through the
+# through table, which bypasses m2m_changed.  Arguments: group_ids, user_ids.
+membership_changed = Signal()
+
+Membership = User.groups.through
+
+
+class UnknownGroups(Exception):
+    def __init__(self, group_ids):
+        super().__init__(f"Groups not found: {sorted(group_ids)}")
+        self.group_ids = sorted(group_ids)
+
+
+def send_membership_changed(group_ids, user_ids):
+    """Notify receivers after the surrounding transaction commits."""
+    group_ids = set(group_ids)
+    user_ids = set(user_ids)
+    if group_ids:
+        transaction.on_commit(lambda: membership_changed.send(
+            sender=Membership, group_ids=group_ids, user_ids=user_ids
+        ))
+
+
+def apply_membership_changes(changes):
+    """
+    Apply membership deltas to many groups with set operations on ids.
+
+    ``changes`` is a list of ``{"group_id", "add", "remove", "user_ids"}``
+    dicts; ``user_ids`` (when present) is the desired member set and is
+    turned into add/remove lists by diffing against the current members.
+    ``User`` rows are never instantiated: the work is one read of the
+    affected memberships, one existence check of the referenced users,
+    one ``DELETE`` and one bulk ``INSERT`` on the through table.  Changes
+    to the same group apply in order, so the last one wins for a user
+    several of them touch; only the net difference from the current
+    members is written, counted and signalled.
+
+    Returns ``(summary, unknown_user_ids)`` where ``summary`` lists the
+    number of added and removed members per group.
+    """
+    group_ids = {change['group_id'] for change in changes}
+    known_groups = set(Group.objects.filter(id__in=group_ids).values_list('id', flat=True))
+    if group_ids - known_groups:
+        raise UnknownGroups(group_ids - known_groups)
+
+    referenced = set()
+    for change in changes:
+        referenced.update(change.get('add', ()), change.get('user_ids') or ())
+    known_users = set(User.objects.filter(id__in=referenced).values_list('id', flat=True)) if referenced else set()
+    unknown_user_ids = sorted(referenced - known_users)
+
+    with transaction.atomic():
+        current = {group_id: set() for group_id in group_ids}
+        for group_id, user_id in Membership.objects.filter(group_id__in=group_ids).values_list('group_id', 'user_id'):
+            current[group_id].add(user_id)
+
+        original = {group_id: set(members) for group_id, members in current.items()}
+        for change in changes:
+            members = current[change['group_id']]
+            if change.get('user_ids') is not None:
+                members.intersection_update(change['user_ids'])
+                members.update(set(change['user_ids']) & known_users)
+            else:
+                members.update(set(change.get('add', ())) & known_users)
+                members.difference_update(change.get('remove', ()))
+        to_add = {group_id: current[group_id] - original[group_id] for group_id in group_ids}
+        to_remove = {group_id: original[group_id] - current[group_id] for group_id in group_ids}
+
+        deletions = Q()
+        for group_id, user_ids in to_remove.items():
+            if user_ids:
+                deletions |= Q(group_id=group_id, user_id__in=user_ids)
+        if deletions:
+            Membership.objects.filter(deletions).delete()
+
+        Membership.objects.bulk_create([
+            Membership(group_id=group_id, user_id=user_id)
+            for group_id, user_ids in to_add.items() for user_id in user_ids
+        ], ignore_conflicts=True, batch_size=1000)
+
+        changed_groups = [g for g in group_ids if to_add.get(g) or to_remove.get(g)]
+        changed_users = set().union(*to_add.values(), *to_remove.values())
+        send_membership_changed(changed_groups, changed_users)
+
+    summary = [
+        {"group_id": group_id, "added": len(to_add.get(group_id, ())), "removed": len(to_remove.get(group_id, ()))}
+        for group_id in sorted(group_ids)
+    ]
+    return summary, unknown_user_ids
@@ -0,0 +1,128 @@
+# review/middleware.py
+import logging
+import random
+from collections import Counter
+from contextlib import ExitStack
+from time import perf_counter
+
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from .profiling import get_store, profiling_settings
+
+logger = logging.getLogger(__name__)
+
+
+class QueryRecorder:
+    """``execute_wrapper`` callable that counts and times every SQL statement."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += perf_counter() - start
+            self.count += 1
+            # Parameters are kept separately, so the SQL text is the query's shape.
+            self.statements[sql] += 1
+
+
+class QueryProfilingMiddleware:
+    """
+    Record SQL count, DB time, view/render time and wall time per request.
+
+    Opt-in through ``REVIEW_PROFILING['ENABLED']``; when disabled Django
+    drops the middleware at startup so it costs nothing.  Timings are sent
+    back in a ``Server-Timing`` header, repeated SQL shapes (N+1
+    signatures) are logged and counted in ``X-Duplicate-Queries``, and
+    every sample goes to the rolling store read by ``profiling_report``.
+    """
+
+    def __init__(self, get_response):
+        config = profiling_settings()
+        if not config['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = config['SAMPLE_RATE']
+        self.duplicate_threshold = config['DUPLICATE_THRESHOLD']
+        self.store = get_store()
+
+    def __call__(self, request):
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        request._profile = {'view_start': None, 'view_end': None, 'render_end': None}
+        start = perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        end = perf_counter()
+
+        self.record(request, response, recorder, start, end)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if hasattr(request, '_profile'):
+            request._profile['view_start'] = perf_counter()
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after this hook, so the gap between here
+        # and the post-render callback is the time spent rendering the data.
+        profile = getattr(request, '_profile', None)
+        if profile is not None:
+            profile['view_end'] = perf_counter()
+
+            def mark_rendered(rendered):
+                profile['render_end'] = perf_counter()
+            response.add_post_render_callback(mark_rendered)
+        return response
+
+    def record(self, request, response, recorder, start, end):
+        profile = request._profile
+        wall_ms = (end - start) * 1000
+        db_ms = recorder.duration * 1000
+        view_ms = render_ms = 0.0
+        if profile['view_start'] is not None:
+            view_end = profile['view_end'] or end
+            view_ms = max((view_end - profile['view_start']) * 1000 - db_ms, 0.0)
+            if profile['view_end'] and profile['render_end']:
+                render_ms = (profile['render_end'] - profile['view_end']) * 1000
+
+        duplicates = {
+            sql: count for sql, count in recorder.statements.items()
+            if count >= self.duplicate_threshold
+        }
+        match = getattr(request, 'resolver_match', None)
+        route = match.route if match else 'unresolved'
+
+        if duplicates:
+            sql, count = max(duplicates.items(), key=lambda item: item[1])
+            logger.warning("%s %s ran %d queries; repeated %d times: %s",
+                           request.method, route, recorder.count, count, sql[:300])
+            response['X-Duplicate-Queries'] = str(len(duplicates))
+
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={db_ms:.2f};desc="{recorder.count} queries"',
+            f'app;dur={view_ms:.2f}',
+            f'render;dur={render_ms:.2f}',
+            f'total;dur={wall_ms:.2f}',
+        ])
+
+        self.store.add({
+            'route': route,
+            'method': request.method,
+            'status': response.status_code,
+            'wall_ms': wall_ms,
+            'db_ms': db_ms,
+            'view_ms': view_ms,
+            'render_ms': render_ms,
+            'queries': recorder.count,
+            'duplicates': len(duplicates),
+        })
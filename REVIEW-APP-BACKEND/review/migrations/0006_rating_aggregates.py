@@ -0,0 +1,34 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:21
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('review', '0005_alter_metric_review_cycles'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RatingAggregate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('is_self_review', models.BooleanField(default=False)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('total', models.BigIntegerField(default=0)),
+                ('total_squares', models.BigIntegerField(default=0)),
+                ('min_value', models.IntegerField(blank=True, null=True)),
+                ('max_value', models.IntegerField(blank=True, null=True)),
+                ('metric', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rating_aggregates', to='review.metric')),
+                ('review_cycle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rating_aggregates', to='review.reviewcycle')),
+                ('target_user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rating_aggregates', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('review_cycle', 'target_user', 'metric', 'is_self_review')},
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:39
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('review', '0006_rating_aggregates'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reviewcycle',
+            name='closed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='MetricTrendPoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cycle_end', models.DateField()),
+                ('peer_count', models.PositiveIntegerField(default=0)),
+                ('peer_total', models.BigIntegerField(default=0)),
+                ('self_count', models.PositiveIntegerField(default=0)),
+                ('self_total', models.BigIntegerField(default=0)),
+                ('group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trend_points', to='auth.group')),
+                ('metric', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trend_points', to='review.metric')),
+                ('review_cycle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trend_points', to='review.reviewcycle')),
+                ('target_user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='trend_points', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['target_user', 'metric', 'cycle_end'], name='review_metr_target__efe4c5_idx'), models.Index(fields=['group', 'metric', 'cycle_end'], name='review_metr_group_i_8d079c_idx')],
+                'constraints': [models.UniqueConstraint(fields=('review_cycle', 'metric', 'target_user'), name='unique_user_trend_point'), models.UniqueConstraint(condition=models.Q(('target_user__isnull', True)), fields=('review_cycle', 'metric'), name='unique_group_trend_point')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('review', '0008_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FrozenCycleResults',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('results', models.JSONField()),
+                ('report', models.JSONField()),
+                ('frozen_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='reviewcycle',
+            index=models.Index(fields=['is_active', 'group', 'start_date'], name='review_revi_is_acti_0502d2_idx'),
+        ),
+        migrations.AddField(
+            model_name='frozencycleresults',
+            name='review_cycle',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='frozen_results', to='review.reviewcycle'),
+        ),
+    ]
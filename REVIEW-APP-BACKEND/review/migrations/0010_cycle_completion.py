@@ -0,0 +1,44 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_completion(apps, schema_editor):
+    ReviewCycle = apps.get_model('review', 'ReviewCycle')
+    SubmissionStatus = apps.get_model('review', 'SubmissionStatus')
+    CycleCompletion = apps.get_model('review', 'CycleCompletion')
+    Membership = apps.get_model('auth', 'User').groups.through
+
+    members = dict(Membership.objects.values('group_id').annotate(n=Count('id')).values_list('group_id', 'n'))
+    finalized = dict(SubmissionStatus.objects.filter(finalized=True).values('review_cycle_id')
+                     .annotate(n=Count('id')).values_list('review_cycle_id', 'n'))
+    CycleCompletion.objects.bulk_create([
+        CycleCompletion(review_cycle_id=cycle_id, group_id=group_id, participant_count=members.get(group_id, 0),
+                        finalized_count=finalized.get(cycle_id, 0))
+        for cycle_id, group_id in ReviewCycle.objects.values_list('id', 'group_id')
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('review', '0009_cycle_scheduling'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CycleCompletion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('participant_count', models.PositiveIntegerField(default=0)),
+                ('finalized_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cycle_completions', to='auth.group')),
+                ('review_cycle', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='completion', to='review.reviewcycle')),
+            ],
+        ),
+        migrations.RunPython(backfill_completion, migrations.RunPython.noop),
+    ]
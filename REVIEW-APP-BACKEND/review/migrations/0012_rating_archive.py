@@ -0,0 +1,26 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('review', '0011_rating_drafts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RatingArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file_name', models.CharField(max_length=255)),
+                ('row_count', models.PositiveIntegerField()),
+                ('size', models.PositiveBigIntegerField()),
+                ('purged', models.BooleanField(default=False)),
+                ('archived_at', models.DateTimeField(auto_now=True)),
+                ('review_cycle', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='rating_archive', to='review.reviewcycle')),
+            ],
+        ),
+    ]
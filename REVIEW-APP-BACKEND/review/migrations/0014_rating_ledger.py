@@ -0,0 +1,32 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('review', '0013_review_assignments'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='rating',
+            name='review_rati_review__b28741_idx',
+        ),
+        migrations.AddField(
+            model_name='rating',
+            name='reviewer_token',
+            field=models.CharField(blank=True, max_length=32, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='rating',
+            index=models.Index(fields=['review_cycle', 'target_user', 'metric', 'is_self_review', 'value'], name='review_rati_review__77cd62_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='rating',
+            constraint=models.UniqueConstraint(fields=('review_cycle', 'reviewer_token', 'target_user', 'metric'), name='unique_rating_per_reviewer'),
+        ),
+    ]
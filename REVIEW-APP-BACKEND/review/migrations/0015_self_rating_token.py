@@ -0,0 +1,25 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:59
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def clear_self_tokens(apps, schema_editor):
+    Rating = apps.get_model('review', 'Rating')
+    Rating.objects.filter(is_self_review=True).exclude(reviewer_token=None).update(reviewer_token=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('review', '0014_rating_ledger'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_self_tokens, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='rating',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_self_review', True)), fields=('review_cycle', 'target_user', 'metric'), name='unique_self_rating'),
+        ),
+    ]
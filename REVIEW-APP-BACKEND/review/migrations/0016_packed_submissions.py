@@ -0,0 +1,35 @@
+# Generated by Django 5.2.1 on 2026-10-18 13:03
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('review', '0015_self_rating_token'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reviewcycle',
+            name='packed_ratings',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='PackedSubmission',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reviewer_token', models.CharField(blank=True, max_length=32, null=True)),
+                ('rating_count', models.PositiveIntegerField()),
+                ('data', models.BinaryField()),
+                ('review_cycle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='packed_submissions', to='review.reviewcycle')),
+                ('self_user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('review_cycle', 'reviewer_token'), name='unique_packed_per_reviewer'), models.UniqueConstraint(fields=('review_cycle', 'self_user'), name='unique_packed_self_ratings')],
+            },
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Full-text index over WeaknessNote.note, see review/notes.py.  The index
+# lives outside Django's model state: an external-content FTS5 table kept
+# in sync by triggers on SQLite, a generated tsvector column with a GIN
+# index on PostgreSQL.  Other backends get no index and search with
+# icontains.
+
+from django.db import migrations
+
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE review_weaknessnote_fts USING fts5("
+    "note, content='review_weaknessnote', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER review_weaknessnote_fts_insert AFTER INSERT ON review_weaknessnote BEGIN "
+    "INSERT INTO review_weaknessnote_fts(rowid, note) VALUES (new.id, new.note); END",
+    "CREATE TRIGGER review_weaknessnote_fts_delete AFTER DELETE ON review_weaknessnote BEGIN "
+    "INSERT INTO review_weaknessnote_fts(review_weaknessnote_fts, rowid, note) VALUES ('delete', old.id, old.note); "
+    "END",
+    "CREATE TRIGGER review_weaknessnote_fts_update AFTER UPDATE OF note ON review_weaknessnote BEGIN "
+    "INSERT INTO review_weaknessnote_fts(review_weaknessnote_fts, rowid, note) VALUES ('delete', old.id, old.note); "
+    "INSERT INTO review_weaknessnote_fts(rowid, note) VALUES (new.id, new.note); END",
+    "INSERT INTO review_weaknessnote_fts(review_weaknessnote_fts) VALUES ('rebuild')",
+]
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS review_weaknessnote_fts_insert",
+    "DROP TRIGGER IF EXISTS review_weaknessnote_fts_delete",
+    "DROP TRIGGER IF EXISTS review_weaknessnote_fts_update",
+    "DROP TABLE IF EXISTS review_weaknessnote_fts",
+]
+
+POSTGRES_FORWARD = [
+    "ALTER TABLE review_weaknessnote ADD COLUMN search_vector tsvector "
+    "GENERATED ALWAYS AS (to_tsvector('english'::regconfig, note)) STORED",
+    "CREATE INDEX review_weaknessnote_search_idx ON review_weaknessnote USING gin (search_vector)",
+]
+
+POSTGRES_BACKWARD = [
+    "ALTER TABLE review_weaknessnote DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def run_for_vendor(statements):
+    def run(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, ()):
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('review', '0016_packed_submissions'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_for_vendor({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD}),
+            run_for_vendor({'sqlite': SQLITE_BACKWARD, 'postgresql': POSTGRES_BACKWARD}),
+        ),
+    ]
@@ -0,0 +1,43 @@
+import random
+
+from django.db import migrations
+from django.utils.crypto import salted_hmac
+
+
+def _token(*parts):
+    # same derivation as submissions.reviewer_token, frozen here
+    return salted_hmac('review.rating.reviewer-token', ':'.join(str(part) for part in parts),
+                       algorithm='sha256').hexdigest()[:32]
+
+
+def rekey_ratings(apps, schema_editor):
+    """
+    Move ratings from per-reviewer to per-target tokens and give the rows
+    random ids.  The old token is recomputed for each finalized reviewer,
+    which is the only time the reviewer behind a token is looked up.
+    """
+    Rating = apps.get_model('review', 'Rating')
+    SubmissionStatus = apps.get_model('review', 'SubmissionStatus')
+
+    for cycle_id, user_id in SubmissionStatus.objects.filter(finalized=True).values_list('review_cycle_id',
+                                                                                        'user_id'):
+        ratings = Rating.objects.filter(review_cycle_id=cycle_id, reviewer_token=_token(cycle_id, user_id))
+        for target_user_id in set(ratings.values_list('target_user_id', flat=True)):
+            ratings.filter(target_user_id=target_user_id).update(
+                reviewer_token=_token(cycle_id, user_id, target_user_id))
+
+    generator = random.SystemRandom()
+    legacy = list(Rating.objects.filter(id__lt=2 ** 32).values_list('id', flat=True))
+    for rating_id, new_id in zip(legacy, generator.sample(range(2 ** 32, 2 ** 62), len(legacy))):
+        Rating.objects.filter(id=rating_id).update(id=new_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('review', '0017_weakness_note_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(rekey_ratings, migrations.RunPython.noop),
+    ]
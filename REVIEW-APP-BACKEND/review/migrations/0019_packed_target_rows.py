@@ -0,0 +1,103 @@
+import random
+import struct
+
+import django.db.models.deletion
+import numpy as np
+from django.conf import settings
+from django.db import migrations, models
+from django.utils.crypto import salted_hmac
+
+V1_HEADER = struct.Struct('<4sBBBBI')
+V2_HEADER = struct.Struct('<4sBBBxI')
+
+
+def _token(*parts):
+    # same derivation as submissions.reviewer_token, frozen here
+    return salted_hmac('review.rating.reviewer-token', ':'.join(str(part) for part in parts),
+                       algorithm='sha256').hexdigest()[:32]
+
+
+def _unpack_v1(data):
+    _, _, *sizes, count = V1_HEADER.unpack_from(data)
+    arrays, offset = [], V1_HEADER.size
+    for size in sizes:
+        arrays.append(np.frombuffer(data, dtype=f'<i{size}', count=count, offset=offset).tolist())
+        offset += size * count
+    return list(zip(*arrays))
+
+
+def _pack_v2(entries):
+    sizes = []
+    arrays = []
+    for column in zip(*entries):
+        array = np.array(column, dtype=np.int64)
+        dtype = next(t for t in (np.int8, np.int16, np.int32, np.int64)
+                     if np.iinfo(t).min <= array.min() and array.max() <= np.iinfo(t).max)
+        arrays.append(array.astype(np.dtype(dtype).newbyteorder('<')))
+        sizes.append(np.dtype(dtype).itemsize)
+    return V2_HEADER.pack(b'PRPK', 2, *sizes, len(entries)) + b''.join(array.tobytes() for array in arrays)
+
+
+def split_packed_rows(apps, schema_editor):
+    """
+    Split per-reviewer packed rows into per-target rows under per-target
+    tokens, and move packed self ratings to ``Rating``.
+    """
+    PackedSubmission = apps.get_model('review', 'PackedSubmission')
+    Rating = apps.get_model('review', 'Rating')
+    SubmissionStatus = apps.get_model('review', 'SubmissionStatus')
+    generator = random.SystemRandom()
+
+    reviewers = {}
+    for cycle_id, user_id in SubmissionStatus.objects.filter(finalized=True).values_list('review_cycle_id',
+                                                                                        'user_id'):
+        reviewers[(cycle_id, _token(cycle_id, user_id))] = user_id
+        reviewers[(cycle_id, _token(cycle_id, user_id, None))] = user_id
+
+    packed, ratings = [], []
+    for old in PackedSubmission.objects.all():
+        entries = _unpack_v1(bytes(old.data))
+        if old.self_user_id is not None:
+            ratings += [Rating(review_cycle_id=old.review_cycle_id, target_user_id=target, metric_id=metric,
+                               value=value, is_self_review=True) for target, metric, value in entries]
+            continue
+        reviewer_id = reviewers.get((old.review_cycle_id, old.reviewer_token))
+        by_target = {}
+        for target, metric, value in entries:
+            by_target.setdefault(target, []).append((metric, value))
+        for target, values in by_target.items():
+            token = (_token(old.review_cycle_id, reviewer_id, target) if reviewer_id is not None
+                     else _token(old.reviewer_token, target))
+            packed.append(PackedSubmission(review_cycle_id=old.review_cycle_id, target_user_id=target,
+                                           reviewer_token=token, rating_count=len(values), data=_pack_v2(values)))
+    PackedSubmission.objects.all().delete()
+    for row, row_id in zip(packed + ratings, generator.sample(range(2 ** 32, 2 ** 62), len(packed) + len(ratings))):
+        row.id = row_id
+    PackedSubmission.objects.bulk_create(packed, batch_size=500)
+    Rating.objects.bulk_create(ratings, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('review', '0018_rating_target_tokens'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='packedsubmission',
+            name='unique_packed_per_reviewer',
+        ),
+        migrations.RemoveConstraint(
+            model_name='packedsubmission',
+            name='unique_packed_self_ratings',
+        ),
+        migrations.AddField(
+            model_name='packedsubmission',
+            name='target_user',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+',
+                                    to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(split_packed_rows, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('review', '0019_packed_target_rows'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='packedsubmission',
+            name='self_user',
+        ),
+        migrations.AlterField(
+            model_name='packedsubmission',
+            name='target_user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+',
+                                    to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='packedsubmission',
+            name='reviewer_token',
+            field=models.CharField(max_length=32),
+        ),
+        migrations.AddIndex(
+            model_name='packedsubmission',
+            index=models.Index(fields=['review_cycle', 'target_user'], name='review_pack_review__4a9ae0_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='packedsubmission',
+            constraint=models.UniqueConstraint(fields=('review_cycle', 'reviewer_token'),
+                                               name='unique_packed_per_token'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.1 on 2026-10-18 13:20
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_heartbeats(apps, schema_editor):
+    # jobs running across the upgrade count from when they started
+    Job = apps.get_model('review', 'Job')
+    Job.objects.filter(started_at__isnull=False).update(heartbeat_at=F('started_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('review', '0020_packed_target_rows_schema'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_heartbeats, migrations.RunPython.noop),
+    ]
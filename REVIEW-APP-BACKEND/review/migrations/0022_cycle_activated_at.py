@@ -0,0 +1,26 @@
+# Generated by Django 5.2.1 on 2026-10-18 13:29
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_activated(apps, schema_editor):
+    # inactive open cycles are left to sync_review_cycles, as before
+    ReviewCycle = apps.get_model('review', 'ReviewCycle')
+    ReviewCycle.objects.filter(is_active=True).update(activated_at=timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('review', '0021_job_heartbeat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reviewcycle',
+            name='activated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_activated, migrations.RunPython.noop),
+    ]
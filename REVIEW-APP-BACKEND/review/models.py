@@ -11,6 +11,23 @@ class ReviewCycle(models.Model):
     start_date = models.DateField()
     end_date = models.DateField()
     is_active = models.BooleanField(default=True)
+    # Set the first time the cycle is active; sync_review_cycles only
+    # activates cycles without it, so a manual deactivation sticks.
+    activated_at = models.DateTimeField(null=True, blank=True)
+    closed_at = models.DateTimeField(null=True, blank=True)
+    # When set, each member reviews this many assigned peers (see
+    # review/assignments.py) instead of the whole group.
+    reviews_per_reviewer = models.PositiveIntegerField(null=True, blank=True)
+    assignment_seed = models.BigIntegerField(null=True, blank=True)
+    # Store each submission as one PackedSubmission instead of Rating rows,
+    # see review/packing.py.  Only chosen when the cycle is created.
+    packed_ratings = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            # active cycles of a group by start date, see ReviewCycleListView
+            models.Index(fields=['is_active', 'group', 'start_date']),
+        ]
 
     def __str__(self):
         return f"{self.name} - {self.group.name}"
@@ -33,11 +50,27 @@ class Rating(models.Model):
     metric = models.ForeignKey(Metric, on_delete=models.CASCADE)
     value = models.IntegerField()
     is_self_review = models.BooleanField(default=False)  # New field to mark self-review
-    # No reviewer field here, to keep anonymous
+    # No reviewer field here, to keep anonymous.  The token is an HMAC of the
+    # cycle, reviewer and target (see submissions.reviewer_token): it can't be
+    # traced back to a user or linked to the reviewer's other ratings, but
+    # lets the database allow one rating per reviewer.  Self ratings never
+    # carry it, since their target would name the reviewer behind the token.
+    # Ids are random for the same reason.  Rows written before the token
+    # existed have none.
+    reviewer_token = models.CharField(max_length=32, null=True, blank=True)
 
     class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['review_cycle', 'reviewer_token', 'target_user', 'metric'],
+                                    name='unique_rating_per_reviewer'),
+            models.UniqueConstraint(fields=['review_cycle', 'target_user', 'metric'],
+                                    condition=models.Q(is_self_review=True),
+                                    name='unique_self_rating'),
+        ]
         indexes = [
-            models.Index(fields=['review_cycle', 'target_user', 'metric']),
+            # value and is_self_review are included so aggregating a cycle's
+            # ratings is answered from the index alone
+            models.Index(fields=['review_cycle', 'target_user', 'metric', 'is_self_review', 'value']),
         ]
 
     def __str__(self):
@@ -45,12 +78,79 @@ class Rating(models.Model):
         return f"{kind} rating {self.value} for {self.target_user.username} in {self.review_cycle.name}"
 
 
+class PackedSubmission(models.Model):
+    """
+    One reviewer's finalized ratings of one peer in a cycle with
+    ``packed_ratings``, every metric's value packed into ``data`` (see
+    review/packing.py).
+
+    Keyed by the same per-target token as ``Rating``, so a reviewer's rows
+    for different peers can't be linked.  Self ratings are stored as
+    plain ``Rating`` rows.
+    """
+    review_cycle = models.ForeignKey(ReviewCycle, on_delete=models.CASCADE, related_name='packed_submissions')
+    target_user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    reviewer_token = models.CharField(max_length=32)
+    rating_count = models.PositiveIntegerField()
+    data = models.BinaryField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['review_cycle', 'reviewer_token'], name='unique_packed_per_token'),
+        ]
+        indexes = [
+            # a target's packed ratings in a cycle
+            models.Index(fields=['review_cycle', 'target_user']),
+        ]
+
+    def __str__(self):
+        return f"{self.rating_count} ratings of user {self.target_user_id} packed in cycle {self.review_cycle_id}"
+
+
+class ReviewAssignment(models.Model):
+    """A peer a reviewer has to rate in a cycle with ``reviews_per_reviewer`` set."""
+    review_cycle = models.ForeignKey(ReviewCycle, on_delete=models.CASCADE, related_name='assignments')
+    reviewer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='review_assignments')
+    target_user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+
+    class Meta:
+        unique_together = ('review_cycle', 'reviewer', 'target_user')
+
+    def __str__(self):
+        return f"{self.reviewer_id} reviews {self.target_user_id} in cycle {self.review_cycle_id}"
+
+
+class RatingDraft(models.Model):
+    """
+    One autosaved, not yet finalized rating cell of a reviewer.
+
+    Unlike ``Rating`` this knows the reviewer; drafts are deleted when they
+    are finalized into anonymous ``Rating`` rows.
+    """
+    review_cycle = models.ForeignKey(ReviewCycle, on_delete=models.CASCADE, related_name='rating_drafts')
+    reviewer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='rating_drafts')
+    target_user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    metric = models.ForeignKey(Metric, on_delete=models.CASCADE, related_name='+')
+    value = models.IntegerField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('review_cycle', 'reviewer', 'target_user', 'metric')
+
+    def __str__(self):
+        return f"Draft rating {self.value} by user {self.reviewer_id} in cycle {self.review_cycle_id}"
+
+
 class WeaknessNote(models.Model):
     review_cycle = models.ForeignKey(ReviewCycle, on_delete=models.CASCADE)
     target_user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='weakness_notes')
     note = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     # No reviewer field here either, anonymous
+    # ``note`` has a full-text index outside the model state, see
+    # review/notes.py.  On SQLite it hangs off triggers on this table, which a
+    # migration that rebuilds the table drops: recreate them after any such
+    # migration, as 0017 does.
 
     def __str__(self):
         return f"Weakness note for {self.target_user.username} in {self.review_cycle.name}"
@@ -69,8 +169,158 @@ class SubmissionStatus(models.Model):
         return f"{self.user.username} finalized {self.finalized} in {self.review_cycle.name}"
 
 
+class RatingAggregate(models.Model):
+    """Running totals of the ratings one user received for one metric in a cycle."""
+    review_cycle = models.ForeignKey(ReviewCycle, on_delete=models.CASCADE, related_name='rating_aggregates')
+    target_user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='rating_aggregates')
+    metric = models.ForeignKey(Metric, on_delete=models.CASCADE, related_name='rating_aggregates')
+    is_self_review = models.BooleanField(default=False)
+    count = models.PositiveIntegerField(default=0)
+    total = models.BigIntegerField(default=0)
+    total_squares = models.BigIntegerField(default=0)
+    min_value = models.IntegerField(null=True, blank=True)
+    max_value = models.IntegerField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ('review_cycle', 'target_user', 'metric', 'is_self_review')
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    @property
+    def stddev(self):
+        if not self.count:
+            return None
+        variance = self.total_squares / self.count - self.mean ** 2
+        return max(variance, 0) ** 0.5
+
+    def __str__(self):
+        kind = "Self" if self.is_self_review else "Peer"
+        return f"{kind} aggregate of {self.count} ratings for user {self.target_user_id} in cycle {self.review_cycle_id}"
+
+
+class MetricTrendPoint(models.Model):
+    """
+    One closed cycle's ratings for a metric, appended when the cycle closes.
+
+    Rows with a ``target_user`` roll up what that user received; the row
+    without one rolls up the whole group, so trends read one row per cycle.
+    """
+    review_cycle = models.ForeignKey(ReviewCycle, on_delete=models.CASCADE, related_name='trend_points')
+    group = models.ForeignKey(Group, on_delete=models.CASCADE, related_name='trend_points')
+    metric = models.ForeignKey(Metric, on_delete=models.CASCADE, related_name='trend_points')
+    target_user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True,
+                                    related_name='trend_points')
+    cycle_end = models.DateField()
+    peer_count = models.PositiveIntegerField(default=0)
+    peer_total = models.BigIntegerField(default=0)
+    self_count = models.PositiveIntegerField(default=0)
+    self_total = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['review_cycle', 'metric', 'target_user'], name='unique_user_trend_point'),
+            models.UniqueConstraint(fields=['review_cycle', 'metric'], condition=models.Q(target_user__isnull=True),
+                                    name='unique_group_trend_point'),
+        ]
+        indexes = [
+            models.Index(fields=['target_user', 'metric', 'cycle_end']),
+            models.Index(fields=['group', 'metric', 'cycle_end']),
+        ]
+
+    def __str__(self):
+        owner = f"user {self.target_user_id}" if self.target_user_id else f"group {self.group_id}"
+        return f"Trend point for {owner}, metric {self.metric_id} in cycle {self.review_cycle_id}"
+
+
+class CycleCompletion(models.Model):
+    """Counters behind the completion dashboard, one row per cycle."""
+    review_cycle = models.OneToOneField(ReviewCycle, on_delete=models.CASCADE, related_name='completion')
+    group = models.ForeignKey(Group, on_delete=models.CASCADE, related_name='cycle_completions')
+    participant_count = models.PositiveIntegerField(default=0)
+    finalized_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.finalized_count}/{self.participant_count} finalized in cycle {self.review_cycle_id}"
+
+
+class FrozenCycleResults(models.Model):
+    """Results and report of a closed cycle, written once when it closes."""
+    review_cycle = models.OneToOneField(ReviewCycle, on_delete=models.CASCADE, related_name='frozen_results')
+    results = models.JSONField()
+    report = models.JSONField()
+    frozen_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Frozen results of cycle {self.review_cycle_id}"
+
+
+class RatingArchive(models.Model):
+    """
+    A closed cycle's ratings written to a columnar file, see review/archive.py.
+
+    While ``purged`` is set the file is the only copy of the ratings and
+    readers take them from there instead of ``Rating``.
+    """
+    review_cycle = models.OneToOneField(ReviewCycle, on_delete=models.CASCADE, related_name='rating_archive')
+    file_name = models.CharField(max_length=255)  # relative to REVIEW_ARCHIVE['ROOT']
+    row_count = models.PositiveIntegerField()
+    size = models.PositiveBigIntegerField()  # bytes
+    purged = models.BooleanField(default=False)
+    archived_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Rating archive of cycle {self.review_cycle_id}"
+
+
+class Job(models.Model):
+    """A unit of background work picked up by ``manage.py run_jobs``."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(QUEUED, 'Queued'), (RUNNING, 'Running'), (SUCCEEDED, 'Succeeded'), (FAILED, 'Failed')]
+
+    kind = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    progress = models.FloatField(default=0)
+    progress_message = models.CharField(max_length=200, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    run_after = models.DateTimeField()
+    started_at = models.DateTimeField(null=True, blank=True)
+    # renewed by the worker while the job runs, see jobs.requeue_stale
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after']),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} job {self.id} ({self.status})"
+
+
 admin.site.register(ReviewCycle)
 admin.site.register(Metric)
 admin.site.register(SubmissionStatus)
 admin.site.register(WeaknessNote)
 admin.site.register(Rating)
+admin.site.register(RatingAggregate)
+admin.site.register(MetricTrendPoint)
+admin.site.register(Job)
+admin.site.register(FrozenCycleResults)
+admin.site.register(CycleCompletion)
+admin.site.register(RatingDraft)
+admin.site.register(RatingArchive)
+admin.site.register(ReviewAssignment)
+admin.site.register(PackedSubmission)
@@ -0,0 +1,214 @@
+# review/notes.py
+"""
+Weakness notes: anonymous submission and full-text search.
+
+The index is created by migration 0017: on SQLite an FTS5 table with the
+porter stemmer, filled by triggers on ``review_weaknessnote``; on
+PostgreSQL a generated ``tsvector`` column with a GIN index.  Both are
+maintained by the database on every write, including bulk and cascading
+deletes, so nothing here has to keep them in sync.  Other backends fall
+back to an unranked ``icontains`` scan.
+
+Snippets are HTML: the note text is escaped and only the highlight
+markers are inserted as markup.  The database marks matches with control
+characters that notes cannot contain, which are swapped for the markers
+after escaping.
+"""
+import html
+import re
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connections, router
+
+from .anonymous import insert_anonymously
+from .models import ReviewAssignment, WeaknessNote
+from .submissions import SubmissionError
+
+NOTE_SEARCH_DEFAULTS = {
+    'LIMIT': 20,
+    'MAX_LIMIT': 100,
+    'SNIPPET_WORDS': 12,
+    'START_SEL': '<mark>',
+    'STOP_SEL': '</mark>',
+    'ELLIPSIS': '…',
+}
+
+# must match the configuration of the generated column in migration 0017
+TEXT_SEARCH_CONFIG = 'english'
+FTS_TABLE = 'review_weaknessnote_fts'
+TERM = re.compile(r'"([^"]+)"|(\w+)(\*?)')
+# what the database wraps matches in; stripped from notes when they are stored
+START_MARK, STOP_MARK = '\x02', '\x03'
+MARKS = str.maketrans('', '', START_MARK + STOP_MARK)
+
+
+def note_search_settings():
+    return {**NOTE_SEARCH_DEFAULTS, **getattr(settings, 'REVIEW_NOTE_SEARCH', {})}
+
+
+def submit_notes(review_cycle, reviewer, notes):
+    """
+    Store ``notes`` (dicts with ``target_user`` and ``note``) anonymously,
+    under random ids.
+
+    Targets must be peers the reviewer rates in the cycle: any other member
+    of its group, or in cycles with ``reviews_per_reviewer`` their assigned
+    peers.  Raises ``SubmissionError`` otherwise.
+    """
+    peers = User.objects.filter(groups=review_cycle.group_id).exclude(id=reviewer.id)
+    if review_cycle.reviews_per_reviewer:
+        peers = peers.filter(id__in=ReviewAssignment.objects.filter(
+            review_cycle=review_cycle, reviewer=reviewer).values('target_user_id'))
+    usernames = dict(peers.values_list('id', 'username'))
+    unexpected = {entry['target_user'] for entry in notes} - set(usernames)
+    if unexpected:
+        raise SubmissionError(f"Users {sorted(unexpected)} are not yours to write notes about.")
+
+    created = [
+        WeaknessNote(review_cycle=review_cycle, target_user_id=entry['target_user'],
+                     note=entry['note'].translate(MARKS))
+        for entry in notes
+    ]
+    # like ratings: random ids in random order, so a batch is not a run of ids
+    insert_anonymously(WeaknessNote, list(created))
+    return [{"target_user": usernames[note.target_user_id], "note": note.note} for note in created]
+
+
+def search_terms(query):
+    """
+    Split a search into ``(text, prefix)`` terms: words, ``"quoted phrases"``
+    and ``prefix*`` words.  Everything else is dropped, so user input never
+    reaches the index's own query syntax.
+    """
+    terms = []
+    for phrase, word, star in TERM.findall(query):
+        text = ' '.join(re.findall(r'\w+', phrase)) if phrase else word
+        if text:
+            terms.append((text, bool(star)))
+    return terms
+
+
+def highlight(snippet, config):
+    """Escape ``snippet`` and turn the database's match marks into ``START_SEL``/``STOP_SEL``."""
+    return html.escape(snippet).replace(START_MARK, config['START_SEL']).replace(STOP_MARK, config['STOP_SEL'])
+
+
+def _fts5_query(terms):
+    return ' '.join(f'"{text}"' + ('*' if prefix else '') for text, prefix in terms)
+
+
+def _filters(review_cycle_id, group_id, target_user_id):
+    clauses, params = [], []
+    for column, value in (('n.review_cycle_id', review_cycle_id), ('c.group_id', group_id),
+                          ('n.target_user_id', target_user_id)):
+        if value is not None:
+            clauses.append(f"AND {column} = %s")
+            params.append(value)
+    return ' '.join(clauses), params
+
+
+def _sqlite_search(terms, filters, filter_params, limit, config):
+    # bm25() is lower for better matches; it is negated so rank grows with relevance
+    sql = f"""
+        SELECT n.id, n.review_cycle_id, n.target_user_id, c.name AS cycle_name,
+               u.username AS username,
+               snippet({FTS_TABLE}, 0, %s, %s, %s, %s) AS snippet,
+               -bm25({FTS_TABLE}) AS rank
+        FROM {FTS_TABLE}
+        JOIN review_weaknessnote n ON n.id = {FTS_TABLE}.rowid
+        JOIN review_reviewcycle c ON c.id = n.review_cycle_id
+        JOIN auth_user u ON u.id = n.target_user_id
+        WHERE {FTS_TABLE} MATCH %s {filters}
+        ORDER BY bm25({FTS_TABLE}), n.id DESC
+        LIMIT %s
+    """
+    params = [START_MARK, STOP_MARK, config['ELLIPSIS'], min(config['SNIPPET_WORDS'], 64),
+              _fts5_query(terms), *filter_params, limit]
+    return sql, params
+
+
+def _postgres_search(terms, filters, filter_params, limit, config):
+    query = ' '.join(f'"{text}"' if ' ' in text else text for text, _ in terms)
+    options = (f'StartSel="{START_MARK}", StopSel="{STOP_MARK}", '
+               f'FragmentDelimiter="{config["ELLIPSIS"]}", MaxFragments=2, '
+               f'MaxWords={config["SNIPPET_WORDS"]}, MinWords={max(config["SNIPPET_WORDS"] // 3, 1)}')
+    sql = f"""
+        SELECT n.id, n.review_cycle_id, n.target_user_id, c.name AS cycle_name,
+               u.username AS username,
+               ts_headline(%s::regconfig, n.note, q, %s) AS snippet,
+               ts_rank_cd(n.search_vector, q) AS rank
+        FROM review_weaknessnote n
+        CROSS JOIN websearch_to_tsquery(%s::regconfig, %s) AS q
+        JOIN review_reviewcycle c ON c.id = n.review_cycle_id
+        JOIN auth_user u ON u.id = n.target_user_id
+        WHERE n.search_vector @@ q {filters}
+        ORDER BY rank DESC, n.id DESC
+        LIMIT %s
+    """
+    params = [TEXT_SEARCH_CONFIG, options, TEXT_SEARCH_CONFIG, query, *filter_params, limit]
+    return sql, params
+
+
+SEARCH_BACKENDS = {
+    'sqlite': _sqlite_search,
+    'postgresql': _postgres_search,
+}
+
+
+def _scan(terms, review_cycle_id, group_id, target_user_id, limit):
+    """
+    Notes containing every term, ranked by how often the terms occur
+    relative to the note's length.  Reads every match, so it is only fit
+    for the small databases of backends without an index.
+    """
+    notes = WeaknessNote.objects.select_related('review_cycle', 'target_user')
+    for text, _ in terms:
+        notes = notes.filter(note__icontains=text)
+    filters = {'review_cycle_id': review_cycle_id, 'review_cycle__group_id': group_id,
+               'target_user_id': target_user_id}
+    notes = list(notes.filter(**{key: value for key, value in filters.items() if value is not None}))
+    for note in notes:
+        text = note.note.lower()
+        hits = sum(text.count(term.lower()) for term, _ in terms)
+        note.rank = hits / (1 + len(re.findall(r'\w+', text)))
+    notes.sort(key=lambda note: (note.rank, note.id), reverse=True)
+    for note in notes[:limit]:
+        note.cycle_name = note.review_cycle.name
+        note.username = note.target_user.username
+        note.snippet = note.note.translate(MARKS)
+        yield note
+
+
+def search_notes(query, review_cycle_id=None, group_id=None, target_user_id=None, limit=None):
+    """
+    Notes matching ``query``, best first, as dicts with a highlighted,
+    HTML-escaped ``snippet`` and a ``rank`` that grows with relevance.
+    There is no timestamp: a batch of notes shares one, which would tie
+    them to a single reviewer.
+    """
+    config = note_search_settings()
+    limit = min(limit or config['LIMIT'], config['MAX_LIMIT'])
+    terms = search_terms(query)
+    if not terms:
+        return []
+
+    alias = router.db_for_read(WeaknessNote)
+    search = SEARCH_BACKENDS.get(connections[alias].vendor)
+    if search is None:
+        notes = _scan(terms, review_cycle_id, group_id, target_user_id, limit)
+    else:
+        filters, filter_params = _filters(review_cycle_id, group_id, target_user_id)
+        notes = WeaknessNote.objects.raw(*search(terms, filters, filter_params, limit, config))
+    return [
+        {
+            "id": note.id,
+            "review_cycle": note.review_cycle_id,
+            "cycle_name": note.cycle_name,
+            "target_user": note.target_user_id,
+            "username": note.username,
+            "snippet": highlight(note.snippet, config),
+            "rank": note.rank,
+        }
+        for note in notes
+    ]
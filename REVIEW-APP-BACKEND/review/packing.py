@@ -0,0 +1,178 @@
+# review/packing.py
+"""
+Packed rating storage and the column helpers shared with archives.
+
+In cycles with ``packed_ratings`` set, a reviewer's ratings of a peer
+are stored as one ``PackedSubmission`` row instead of one ``Rating`` row
+per metric.  The row's ``data`` is a 12-byte header followed by the
+metric and value arrays, sorted by metric and each in the narrowest
+integer type that holds it.  Readers decode a cycle's rows with
+``np.frombuffer`` and work on the concatenated arrays.
+
+Rows are per target and keyed by the per-target reviewer token, never
+per submission: a row holding all of a reviewer's peers would name the
+reviewer as the one group member missing from it.  Self ratings go to
+``Rating`` for the same reason.
+"""
+import struct
+
+import numpy as np
+from django.contrib.auth.models import User
+
+from .models import Metric, PackedSubmission, RatingAggregate
+
+FORMAT_VERSION = 2
+MAGIC = b'PRPK'
+# magic, version, item sizes of the metric and value arrays, padding, entry count
+HEADER = struct.Struct('<4sBBBxI')
+INTEGER_TYPES = [np.int8, np.int16, np.int32, np.int64]
+TOKEN_LENGTH = PackedSubmission._meta.get_field('reviewer_token').max_length
+
+
+class PackingError(Exception):
+    pass
+
+
+def narrow(values):
+    """The smallest signed integer type that holds every value."""
+    if not len(values):
+        return np.int8
+    low, high = int(values.min()), int(values.max())
+    for dtype in INTEGER_TYPES:
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return dtype
+    return np.int64
+
+
+def pack_ratings(entries):
+    """Pack ``(metric_id, value)`` tuples into a blob."""
+    rows = np.array(sorted(entries), dtype=np.int64).reshape(-1, 2)
+    arrays = [rows[:, index].astype(np.dtype(narrow(rows[:, index])).newbyteorder('<')) for index in range(2)]
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, *(array.itemsize for array in arrays), len(rows))
+    return header + b''.join(array.tobytes() for array in arrays)
+
+
+def unpack_ratings(data):
+    """The ``(metrics, values)`` arrays of a packed blob, as read-only views of ``data``."""
+    magic, version, *sizes, count = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise PackingError("Not a packed rating submission.")
+    if version != FORMAT_VERSION:
+        raise PackingError(f"Unsupported packed submission version {version}.")
+    arrays = []
+    offset = HEADER.size
+    for size in sizes:
+        arrays.append(np.frombuffer(data, dtype=f'<i{size}', count=count, offset=offset))
+        offset += size * count
+    return arrays
+
+
+def pack_submission(review_cycle, tokens, ratings):
+    """
+    Unsaved ``PackedSubmission`` rows for the peer ratings in ``ratings``,
+    a mapping of ``(target_user_id, metric_id, is_self_review)`` to value:
+    one per target, under the token ``tokens`` maps the target to.
+    """
+    by_target = {}
+    for (target_user_id, metric_id, is_self_review), value in ratings.items():
+        if not is_self_review:
+            by_target.setdefault(target_user_id, []).append((metric_id, value))
+    return [
+        PackedSubmission(review_cycle=review_cycle, target_user_id=target_user_id,
+                         reviewer_token=tokens[target_user_id], rating_count=len(entries),
+                         data=pack_ratings(entries))
+        for target_user_id, entries in by_target.items()
+    ]
+
+
+def packed_columns(review_cycle_id):
+    """
+    A cycle's packed ratings as column arrays in the layout of
+    ``archive.cycle_columns``.  Packed ratings have no id, so ``id`` is 0.
+    """
+    rows = list(PackedSubmission.objects.filter(review_cycle_id=review_cycle_id).order_by('id').values_list(
+        'target_user_id', 'reviewer_token', 'data'))
+    decoded = [unpack_ratings(data) for _, _, data in rows]
+    sizes = [len(metrics) for metrics, _ in decoded]
+    columns = {
+        'id': np.zeros(sum(sizes), dtype=np.int8),
+        'target_user_id': np.repeat(np.array([target for target, _, _ in rows], dtype=np.int64), sizes),
+    }
+    for index, name in enumerate(['metric_id', 'value']):
+        arrays = [arrays[index] for arrays in decoded]
+        columns[name] = np.concatenate(arrays) if arrays else np.empty(0, dtype=np.int8)
+    columns['is_self_review'] = np.zeros(sum(sizes), dtype=bool)
+    columns['reviewer_token'] = np.repeat(np.array([token.encode() for _, token, _ in rows],
+                                                   dtype=f'S{TOKEN_LENGTH}'), sizes)
+    return columns
+
+
+def drop_deleted(columns):
+    """
+    ``columns`` without ratings of users or metrics deleted since they were
+    written (``Rating`` would have cascaded them away), plus id -> username
+    and id -> metric name lookups.
+    """
+    usernames = dict(User.objects.filter(id__in=np.unique(columns['target_user_id']).tolist())
+                     .values_list('id', 'username'))
+    metric_names = dict(Metric.objects.filter(id__in=np.unique(columns['metric_id']).tolist())
+                        .values_list('id', 'name'))
+    keep = (np.isin(columns['target_user_id'], list(usernames))
+            & np.isin(columns['metric_id'], list(metric_names)))
+    if not keep.all():
+        columns = {name: column[keep] for name, column in columns.items()}
+    return columns, usernames, metric_names
+
+
+def column_rating_rows(columns, usernames, metric_names, chunk_size):
+    """Export rows in the column order of ``export.RATING_COLUMNS``; ratings without an id get ``None``."""
+    names = ['id', 'target_user_id', 'metric_id', 'value', 'is_self_review']
+    for start in range(0, len(columns['id']), chunk_size):
+        chunk = [columns[name][start:start + chunk_size].tolist() for name in names]
+        for rating_id, target_user_id, metric_id, value, is_self_review in zip(*chunk):
+            yield (rating_id or None, target_user_id, usernames[target_user_id], metric_id,
+                   metric_names[metric_id], value, is_self_review)
+
+
+def column_aggregates(review_cycle_id, columns):
+    """Unsaved ``RatingAggregate`` rows for one cycle's rating columns."""
+    if not len(columns['value']):
+        return []
+    values = columns['value'].astype(np.int64)
+    keys = np.column_stack([columns['target_user_id'], columns['metric_id'], columns['is_self_review']]
+                           ).astype(np.int64)
+    groups, inverse = np.unique(keys, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    counts = np.bincount(inverse, minlength=len(groups))
+    totals = np.bincount(inverse, weights=values, minlength=len(groups))
+    squares = np.bincount(inverse, weights=values * values, minlength=len(groups))
+    lows = np.full(len(groups), np.iinfo(np.int64).max)
+    highs = np.full(len(groups), np.iinfo(np.int64).min)
+    np.minimum.at(lows, inverse, values)
+    np.maximum.at(highs, inverse, values)
+    return [
+        RatingAggregate(
+            review_cycle_id=review_cycle_id, target_user_id=target_user_id, metric_id=metric_id,
+            is_self_review=bool(is_self), count=count, total=int(total), total_squares=int(total_squares),
+            min_value=low, max_value=high,
+        )
+        for (target_user_id, metric_id, is_self), count, total, total_squares, low, high in zip(
+            groups.tolist(), counts.tolist(), totals.tolist(), squares.tolist(), lows.tolist(), highs.tolist())
+    ]
+
+
+def packed_rating_rows(review_cycle_id, chunk_size):
+    return column_rating_rows(*drop_deleted(packed_columns(review_cycle_id)), chunk_size)
+
+
+def packed_aggregates(review_cycle_ids=None):
+    """Unsaved ``RatingAggregate`` rows computed from packed submissions."""
+    submissions = PackedSubmission.objects.all()
+    if review_cycle_ids is not None:
+        submissions = submissions.filter(review_cycle_id__in=review_cycle_ids)
+    aggregates = []
+    for review_cycle_id in submissions.values_list('review_cycle_id', flat=True).distinct().order_by():
+        columns, _, _ = drop_deleted(packed_columns(review_cycle_id))
+        aggregates += column_aggregates(review_cycle_id, columns)
+    return aggregates
@@ -0,0 +1,139 @@
+# review/pagination.py
+import base64
+import json
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from drf_yasg import openapi
+from rest_framework.exceptions import ValidationError
+from rest_framework.utils.urls import replace_query_param
+
+MAX_PAGE_SIZE = 500
+
+LIST_QUERY_PARAMETERS = [
+    openapi.Parameter('limit', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, required=False,
+                      description=f"Page size (max {MAX_PAGE_SIZE}); the next page is linked in the Link header"),
+    openapi.Parameter('cursor', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=False,
+                      description="Opaque cursor taken from a previous Link header"),
+    openapi.Parameter('fields', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=False,
+                      description="Comma separated list of fields to return"),
+]
+
+
+def encode_cursor(values):
+    raw = json.dumps(values, default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor, fields):
+    """
+    The ordering values in ``cursor``, converted by the model ``fields``
+    they belong to.  Cursors come back from clients, so anything that was
+    not produced by ``encode_cursor`` for these fields is a 400, never a
+    database error.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(fields) or None in values:
+            raise ValueError(cursor)
+        converted = []
+        for field, value in zip(fields, values):
+            value = field.to_python(value)
+            field.run_validators(value)
+            converted.append(value)
+    except (DjangoValidationError, ValueError, TypeError):
+        raise ValidationError({"cursor": "Invalid cursor."})
+    return converted
+
+
+def keyset_filter(ordering, values):
+    """
+    Build the ``WHERE`` clause selecting rows strictly after ``values``.
+
+    For ``ordering=('start_date', 'id')`` this is
+    ``start_date > d OR (start_date = d AND id > i)``, which the database can
+    answer from an index instead of counting past an offset.
+    """
+    condition = Q()
+    for index, field in enumerate(ordering):
+        clause = Q(**{f"{field}__gt": values[index]})
+        for previous, value in zip(ordering[:index], values):
+            clause &= Q(**{previous: value})
+        condition |= clause
+    return condition
+
+
+def keyset_page(request, queryset, ordering):
+    """
+    The ordered queryset starting after the request's ``cursor`` and the
+    page size, or ``None`` when neither ``limit`` nor ``cursor`` is given.
+    Reads ``request.GET``, so it serves DRF and plain Django requests alike.
+    """
+    queryset = queryset.order_by(*ordering)
+    limit = request.GET.get('limit')
+    cursor = request.GET.get('cursor')
+    if limit is None and cursor is None:
+        return queryset, None
+
+    try:
+        limit = min(int(limit or MAX_PAGE_SIZE), MAX_PAGE_SIZE)
+    except ValueError:
+        raise ValidationError({"limit": "Must be an integer."})
+    if limit < 1:
+        raise ValidationError({"limit": "Must be positive."})
+
+    if cursor:
+        values = decode_cursor(cursor, [queryset.model._meta.get_field(field) for field in ordering])
+        queryset = queryset.filter(keyset_filter(ordering, values))
+    return queryset[:limit + 1], limit
+
+
+def keyset_result(request, rows, ordering, limit, key=None):
+    """``(rows, next_url)`` for the rows fetched from a ``keyset_page`` queryset."""
+    if limit is None or len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    key = key or (lambda row: [row[field] for field in ordering])
+    url = request.build_absolute_uri()
+    url = replace_query_param(url, 'cursor', encode_cursor(key(rows[-1])))
+    url = replace_query_param(url, 'limit', limit)
+    return rows, url
+
+
+def paginate_keyset(request, queryset, ordering, key=None):
+    """
+    Apply cursor pagination to ``queryset`` when ``limit`` or ``cursor`` is given.
+
+    Without either parameter the full result is returned, so existing
+    clients that expect a plain list keep working.  Returns
+    ``(rows, next_url)``; ``key`` extracts the ordering values from a row
+    (defaults to dictionary lookup on the ordering fields).
+    """
+    queryset, limit = keyset_page(request, queryset, ordering)
+    return keyset_result(request, list(queryset), ordering, limit, key)
+
+
+async def apaginate_keyset(request, queryset, ordering, key=None):
+    """``paginate_keyset`` on the async ORM."""
+    queryset, limit = keyset_page(request, queryset, ordering)
+    return keyset_result(request, [row async for row in queryset.aiterator()], ordering, limit, key)
+
+
+def project_fields(request, rows, allowed):
+    """Restrict each row to the comma separated ``fields`` query parameter."""
+    fields = request.GET.get('fields')
+    if not fields:
+        return rows
+    selected = [field.strip() for field in fields.split(',') if field.strip()]
+    unknown = [field for field in selected if field not in allowed]
+    if unknown:
+        raise ValidationError({"fields": f"Unknown fields: {unknown}. Allowed: {list(allowed)}"})
+    return [{field: row[field] for field in selected} for row in rows]
+
+
+def link_header(response, next_url):
+    if next_url:
+        response['Link'] = f'<{next_url}>; rel="next"'
+    return response
@@ -0,0 +1,202 @@
+# review/profiling.py
+import atexit
+import math
+import sqlite3
+import threading
+import time
+from collections import defaultdict, deque
+
+from django.conf import settings
+
+DEFAULTS = {
+    'ENABLED': False,
+    # Path of the SQLite file samples are flushed to; empty keeps them in memory only.
+    'STORE': '',
+    'MAX_SAMPLES': 50000,
+    'FLUSH_EVERY': 50,
+    # Seconds between flushes of a partial batch by the background writer.
+    'FLUSH_INTERVAL': 5.0,
+    'DUPLICATE_THRESHOLD': 3,
+    'SAMPLE_RATE': 1.0,
+}
+
+SAMPLE_COLUMNS = ('route', 'method', 'status', 'wall_ms', 'db_ms', 'view_ms', 'render_ms', 'queries', 'duplicates')
+
+
+def profiling_settings():
+    return {**DEFAULTS, **getattr(settings, 'REVIEW_PROFILING', {})}
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(fraction * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def summarize(samples):
+    """
+    Group samples by ``(method, route)`` and compute latency percentiles.
+
+    Returns rows sorted by p95 wall time, slowest first.
+    """
+    grouped = defaultdict(list)
+    for sample in samples:
+        grouped[(sample['method'], sample['route'])].append(sample)
+
+    rows = []
+    for (method, route), items in grouped.items():
+        wall = sorted(item['wall_ms'] for item in items)
+        rows.append({
+            'method': method,
+            'route': route,
+            'count': len(items),
+            'p50_ms': percentile(wall, 0.50),
+            'p95_ms': percentile(wall, 0.95),
+            'p99_ms': percentile(wall, 0.99),
+            'avg_queries': sum(item['queries'] for item in items) / len(items),
+            'avg_db_ms': sum(item['db_ms'] for item in items) / len(items),
+            'duplicate_requests': sum(1 for item in items if item['duplicates']),
+        })
+    rows.sort(key=lambda row: row['p95_ms'], reverse=True)
+    return rows
+
+
+class MemoryProfileStore:
+    """Rolling window of the most recent samples, kept per route."""
+
+    def __init__(self, max_samples):
+        self.max_samples = max_samples
+        self.lock = threading.Lock()
+        self.samples = defaultdict(lambda: deque(maxlen=max_samples))
+
+    def add(self, sample):
+        with self.lock:
+            self.samples[(sample['method'], sample['route'])].append(sample)
+
+    def all(self):
+        with self.lock:
+            return [sample for window in self.samples.values() for sample in window]
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class SQLiteProfileStore:
+    """
+    Samples appended to a SQLite file in batches.
+
+    The request path only appends to a bounded buffer; a background thread
+    writes it out once ``flush_every`` samples are waiting, at least every
+    ``flush_interval`` seconds, and once more at exit.  The file keeps the
+    newest ``max_samples`` rows so other processes (the
+    ``profiling_report`` command) can read a rolling history.  Reads go to
+    the file, so no in-memory window is kept.
+    """
+
+    def __init__(self, path, max_samples, flush_every, flush_interval=DEFAULTS['FLUSH_INTERVAL']):
+        self.max_samples = max_samples
+        self.lock = threading.Lock()
+        self.path = str(path)
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        # if the writer falls behind, the oldest unwritten samples are dropped
+        self.pending = deque(maxlen=max_samples)
+        self.wake = threading.Event()
+        self.stopped = False
+        self.writer = None
+        with self.connect() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS samples ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, created REAL, "
+                "route TEXT, method TEXT, status INTEGER, wall_ms REAL, db_ms REAL, "
+                "view_ms REAL, render_ms REAL, queries INTEGER, duplicates INTEGER)"
+            )
+
+    def connect(self):
+        return sqlite3.connect(self.path, timeout=1)
+
+    def add(self, sample):
+        with self.lock:
+            if self.writer is None and not self.stopped:
+                # started on first use, so readers such as profiling_report never run one
+                self.writer = threading.Thread(target=self.run, name='profiling-writer', daemon=True)
+                self.writer.start()
+            self.pending.append(sample)
+            full = len(self.pending) >= self.flush_every
+        if full:
+            self.wake.set()
+
+    def run(self):
+        while not self.stopped:
+            self.wake.wait(self.flush_interval)
+            self.wake.clear()
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            pending = list(self.pending)
+            self.pending.clear()
+        if pending:
+            self.write(pending)
+
+    def close(self):
+        """Stop the background writer and write out what is still buffered."""
+        self.stopped = True
+        self.wake.set()
+        if self.writer is not None:
+            self.writer.join()
+        self.flush()
+
+    def write(self, samples):
+        now = time.time()
+        try:
+            with self.connect() as db:
+                db.executemany(
+                    f"INSERT INTO samples (created, {', '.join(SAMPLE_COLUMNS)}) "
+                    f"VALUES (?, {', '.join('?' for _ in SAMPLE_COLUMNS)})",
+                    [(now, *(sample[column] for column in SAMPLE_COLUMNS)) for sample in samples],
+                )
+                db.execute(
+                    "DELETE FROM samples WHERE id <= (SELECT MAX(id) FROM samples) - ?",
+                    (self.max_samples,),
+                )
+        except sqlite3.Error:
+            # Profiling must never break a request; drop the batch instead.
+            pass
+
+    def all(self):
+        self.flush()
+        with self.connect() as db:
+            db.row_factory = sqlite3.Row
+            return [dict(row) for row in db.execute(f"SELECT {', '.join(SAMPLE_COLUMNS)} FROM samples")]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            config = profiling_settings()
+            if config['STORE']:
+                _store = SQLiteProfileStore(config['STORE'], config['MAX_SAMPLES'], config['FLUSH_EVERY'],
+                                            config['FLUSH_INTERVAL'])
+                atexit.register(_store.close)
+            else:
+                _store = MemoryProfileStore(config['MAX_SAMPLES'])
+        return _store
+
+
+def reset_store():
+    global _store
+    with _store_lock:
+        if _store is not None:
+            _store.close()
+        _store = None
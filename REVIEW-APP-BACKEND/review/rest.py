@@ -1,3 +1,5 @@
+import hashlib
+
 import django_filters
 from django.contrib.auth.models import Group, User
 from rest_framework.views import APIView
@@ -5,12 +7,33 @@ from rest_framework.response import Response
 from rest_framework import status, permissions
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
-from .serializers import GroupSerializer, GroupUserSerializer, \
+from .serializers import GroupSerializer, GroupUserSerializer, GroupMembershipBulkSerializer, \
                          UserCreateSerializer, GroupListSerializer, \
-                         ReviewCycleCreateSerializer, MetricSerializer, UserSerializer, BulkReviewSubmitSerializer
+                         ReviewCycleCreateSerializer, MetricSerializer, UserSerializer, BulkReviewSubmitSerializer, \
+                         TrendQuerySerializer, JobSerializer, JobCreateSerializer, RatingDraftSerializer, \
+    ReviewAssignmentSerializer, WeaknessNoteSubmitSerializer, NoteSearchQuerySerializer
 from rest_framework.authtoken.models import Token
 from django.contrib.auth import authenticate
-from .models import ReviewCycle, Metric, Rating, SubmissionStatus
+from .models import ReviewCycle, Metric, Rating, SubmissionStatus, RatingAggregate, Job, CycleCompletion
+from .submissions import SubmissionError, check_complete, submit_ratings
+from .drafts import IDEMPOTENCY_TIMEOUT, draft_cells, draft_ratings, finalize_draft, group_cells, \
+    idempotency_cache_key, save_draft_changes
+from .aggregates import build_results, cycle_results_queryset
+from .analytics import build_report, build_user_report, load_cycle_matrix
+from .trends import build_trends, trend_points
+from .cycles import close_review_cycle, frozen_payload
+from .archive import ArchiveError, archive_cycle, restore_cycle
+from .completion import completion_dashboard, pending_users, percentage
+from .jobs import HANDLERS, enqueue
+from .export import EXPORTS, ENCODERS, export_stream
+from .authentication import ReviewRefreshToken
+from .caching import get_cycle_snapshot
+from .routers import ReplicaReadMixin
+from .assignments import assign_reviewers, review_targets
+from .notes import note_search_settings, search_notes, submit_notes
+from .user_import import import_settings, import_users, parse_rows
+from .memberships import UnknownGroups, apply_membership_changes
+from .pagination import LIST_QUERY_PARAMETERS, paginate_keyset, project_fields, link_header
 from rest_framework_simplejwt.tokens import RefreshToken, TokenError
 from rest_framework_simplejwt.views import TokenRefreshView
 from django_filters.rest_framework import DjangoFilterBackend, FilterSet
@@ -18,25 +41,48 @@ from rest_framework.filters import SearchFilter, OrderingFilter
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework import generics
 from django.utils import timezone
+from django.http import StreamingHttpResponse
+from django.utils.http import parse_etags
+from django.db import transaction
+from django.db.models import Count, F
+from django.core.cache import cache
+
+
+ASYNC_PARAMETER = openapi.Parameter(
+    'async', openapi.IN_QUERY, type=openapi.TYPE_BOOLEAN,
+    description="Queue the work as a background job and answer 202 with the job to poll",
+)
+
+
+def wants_background(request):
+    return request.query_params.get('async', '').lower() in ('1', 'true', 'yes')
 
 
-class GroupListView(APIView):
+def job_accepted(job):
+    response = Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+    response['Location'] = f"/api/jobs/{job.id}/"
+    return response
+
+
+class GroupListView(ReplicaReadMixin, APIView):
     # permission_classes = [permissions.IsAdminUser]
 
-    @swagger_auto_schema(operation_summary="List all groups with users")
+    @swagger_auto_schema(operation_summary="List all groups with users", manual_parameters=LIST_QUERY_PARAMETERS)
     def get(self, request):
-        groups = Group.objects.all()
+        groups = Group.objects.annotate(membersCount=Count('user'))
+        groups, next_url = paginate_keyset(request, groups, ('id',), key=lambda group: [group.id])
         serializer = GroupListSerializer(groups, many=True)
-        return Response(serializer.data)
+        data = project_fields(request, serializer.data, GroupListSerializer.Meta.fields)
+        return link_header(Response(data), next_url)
 
 
-class GroupDetailView(APIView):
+class GroupDetailView(ReplicaReadMixin, APIView):
     # permission_classes = [permissions.IsAdminUser]
 
     @swagger_auto_schema(operation_summary="Get group details with users by ID")
     def get(self, request, pk):
         try:
-            group = Group.objects.get(pk=pk)
+            group = Group.objects.annotate(membersCount=Count('user')).get(pk=pk)
         except Group.DoesNotExist:
             return Response({"detail": "Group not found"}, status=404)
         serializer = GroupListSerializer(group)
@@ -62,12 +108,15 @@ class GroupCreateView(APIView):
 class GroupDeleteView(APIView):
     permission_classes = [permissions.IsAdminUser]
 
-    @swagger_auto_schema(operation_summary="Delete group by ID", responses={204: 'No Content'})
+    @swagger_auto_schema(operation_summary="Delete group by ID", manual_parameters=[ASYNC_PARAMETER],
+                         responses={204: 'No Content', 202: JobSerializer})
     def delete(self, request, pk):
         try:
             group = Group.objects.get(pk=pk)
         except Group.DoesNotExist:
             return Response({"detail": "Group not found"}, status=404)
+        if wants_background(request):
+            return job_accepted(enqueue('delete_group', {"group_id": group.id}, request.user))
         group.delete()
         return Response(status=204)
 
@@ -77,22 +126,39 @@ class GroupUserUpdateView(APIView):
 
     @swagger_auto_schema(
         operation_summary="Update users in a group",
+        operation_description="`user_ids` replaces the member set; `add`/`remove` change only the listed users.",
         request_body=GroupUserSerializer,
         responses={200: openapi.Response('Users updated successfully')}
     )
     def patch(self, request, pk):
+        serializer = GroupUserSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=400)
         try:
-            group = Group.objects.get(pk=pk)
-        except Group.DoesNotExist:
+            summary, unknown = apply_membership_changes([{"group_id": pk, **serializer.validated_data}])
+        except UnknownGroups:
             return Response({"detail": "Group not found"}, status=404)
+        return Response({"detail": "Users updated successfully", **summary[0], "unknown_user_ids": unknown})
 
-        serializer = GroupUserSerializer(data=request.data)
-        if serializer.is_valid():
-            user_ids = serializer.validated_data['user_ids']
-            users = User.objects.filter(id__in=user_ids)
-            group.user_set.set(users)
-            return Response({"detail": "Users updated successfully"})
-        return Response(serializer.errors, status=400)
+
+class GroupMembershipBulkUpdateView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_summary="Update memberships of several groups at once",
+        request_body=GroupMembershipBulkSerializer,
+        responses={200: openapi.Response('Memberships updated successfully')}
+    )
+    def patch(self, request):
+        serializer = GroupMembershipBulkSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=400)
+        try:
+            summary, unknown = apply_membership_changes(serializer.validated_data['changes'])
+        except UnknownGroups as exc:
+            return Response({"detail": str(exc)}, status=404)
+        return Response({"detail": "Memberships updated successfully", "groups": summary,
+                         "unknown_user_ids": unknown})
 
 
 class UserCreate(APIView):
@@ -119,6 +185,40 @@ class UserCreate(APIView):
                             status=status.HTTP_400_BAD_REQUEST)
 
 
+class BulkUserImportView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_summary="Bulk import users from CSV or JSON",
+        operation_description="Send a JSON list of users (or {\"users\": [...]}), or upload a CSV/JSON "
+                              "file as multipart field 'file'. Columns: username, first_name, last_name, "
+                              "password, email, groups (';' separated group names). Imports of more than "
+                              f"{import_settings()['SYNC_MAX_ROWS']} rows always run as a background job.",
+        manual_parameters=[ASYNC_PARAMETER],
+        responses={200: openapi.Response("Import report with per-row errors"), 202: JobSerializer}
+    )
+    def post(self, request):
+        upload = request.FILES.get('file')
+        try:
+            if upload is not None:
+                fmt = 'json' if upload.name.lower().endswith('.json') else 'csv'
+                rows = parse_rows(upload.read().decode('utf-8-sig'), fmt)
+            else:
+                rows = request.data
+                if isinstance(rows, dict):
+                    rows = rows.get('users', [])
+                if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+                    raise ValueError("Expected a list of user objects.")
+        except (ValueError, UnicodeDecodeError) as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # large imports go to the job queue's bounded hashing pool, never a pool per request
+        if wants_background(request) or len(rows) > import_settings()['SYNC_MAX_ROWS']:
+            return job_accepted(enqueue('import_users', {"rows": rows}, request.user, max_attempts=1))
+        report = import_users(rows, workers=0)
+        return Response(report, status=status.HTTP_200_OK)
+
+
 class ReviewCycleCreateView(APIView):
     # permission_classes = [permissions.IsAdminUser]
 
@@ -154,7 +254,46 @@ class ReviewCycleCreateView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class ReviewCycleListView(APIView):
+class ReviewCycleAssignmentView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_summary="(Re)assign reviewers of a review cycle",
+        operation_description="Each member gets reviews_per_reviewer peers to rate and is rated by as many. "
+                              "The same seed and members always give the same assignment.",
+        request_body=ReviewAssignmentSerializer,
+        responses={200: openapi.Response('Assignments written'), 409: openapi.Response('Cycle is closed')}
+    )
+    def post(self, request, cycle_id):
+        try:
+            review_cycle = ReviewCycle.objects.get(id=cycle_id)
+        except ReviewCycle.DoesNotExist:
+            return Response({"detail": "Review cycle not found."}, status=status.HTTP_404_NOT_FOUND)
+        if review_cycle.closed_at is not None:
+            return Response({"detail": "Review cycle is closed."}, status=status.HTTP_409_CONFLICT)
+
+        serializer = ReviewAssignmentSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        reviews_per_reviewer = serializer.validated_data.get('reviews_per_reviewer', review_cycle.reviews_per_reviewer)
+        if not reviews_per_reviewer:
+            return Response({"detail": "reviews_per_reviewer is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            review_cycle.reviews_per_reviewer = reviews_per_reviewer
+            review_cycle.save(update_fields=['reviews_per_reviewer'])
+            assigned = assign_reviewers(review_cycle, serializer.validated_data.get('seed'))
+        return Response({
+            "assignments": assigned,
+            "reviews_per_reviewer": review_cycle.reviews_per_reviewer,
+            "seed": review_cycle.assignment_seed,
+        }, status=status.HTTP_200_OK)
+
+
+REVIEW_CYCLE_LIST_FIELDS = ('id', 'name', 'group_id', 'group', 'start_date', 'end_date')
+
+
+class ReviewCycleListView(ReplicaReadMixin, APIView):
     # permission_classes = [permissions.IsAuthenticated]
 
     @swagger_auto_schema(manual_parameters=[
@@ -164,35 +303,32 @@ class ReviewCycleListView(APIView):
             in_='query',
             required=False
         ),
+        *LIST_QUERY_PARAMETERS,
     ])
     def get(self, request):
         group_id = request.query_params.get('group_id')
-        user_groups = None
+        cycles = ReviewCycle.objects.filter(is_active=True)
         if group_id:
-            user_group = Group.objects.get(id=group_id)
-            cycles = ReviewCycle.objects.filter(
-                is_active=True,
-                group=user_group,
-            ).order_by('start_date')
-        else:
-            cycles = ReviewCycle.objects.filter(
-                is_active=True
-            ).order_by('start_date')
+            cycles = cycles.filter(group_id=group_id)
+
+        cycles = cycles.values('id', 'name', 'group_id', 'start_date', 'end_date', group_name=F('group__name'))
+        cycles, next_url = paginate_keyset(request, cycles, ('start_date', 'id'))
 
         data = [
             {
-                "id": cycle.id,
-                "name": cycle.name,
-                "group_id": cycle.group.id,
-                "group": cycle.group.name,
-                "start_date": cycle.start_date,
-                "end_date": cycle.end_date
+                "id": cycle["id"],
+                "name": cycle["name"],
+                "group_id": cycle["group_id"],
+                "group": cycle["group_name"],
+                "start_date": cycle["start_date"],
+                "end_date": cycle["end_date"]
             } for cycle in cycles
         ]
-        return Response(data, status=status.HTTP_200_OK)
+        data = project_fields(request, data, REVIEW_CYCLE_LIST_FIELDS)
+        return link_header(Response(data, status=status.HTTP_200_OK), next_url)
 
 
-class ParticipantsAndMetricsView(APIView):
+class ParticipantsAndMetricsView(ReplicaReadMixin, APIView):
     # permission_classes = [permissions.IsAuthenticated]
 
     @swagger_auto_schema(
@@ -200,31 +336,85 @@ class ParticipantsAndMetricsView(APIView):
         responses={200: openapi.Response(description="Participants and metrics")}
     )
     def get(self, request, cycle_id):
-        try:
-            review_cycle = ReviewCycle.objects.get(id=cycle_id, is_active=True)
-        except ReviewCycle.DoesNotExist:
+        snapshot = get_cycle_snapshot(cycle_id)
+        if snapshot is None:
             return Response({"detail": "Review cycle not found."}, status=status.HTTP_404_NOT_FOUND)
 
-        if review_cycle.group not in request.user.groups.all():
+        # Participants are exactly the group members, so membership needs no query
+        if not any(p["id"] == request.user.id for p in snapshot["participants"]):
             return Response({"detail": "Not allowed to access this review cycle."}, status=status.HTTP_403_FORBIDDEN)
 
-        participants = User.objects.filter(groups=review_cycle.group).distinct()
-        metrics = Metric.objects.all()
+        # is_self differs per reviewer, so the validator covers both
+        etag = f'"{snapshot["version"]}-{request.user.id}"'
+        if etag in parse_etags(request.headers.get("If-None-Match", "")):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
 
+        cycle = snapshot["cycle"]
         return Response({
-            "cycle_id": review_cycle.id,
-            "cycle_name": review_cycle.name,
-            "start_date": review_cycle.start_date,
-            "end_date": review_cycle.end_date,
-            "metrics": [{"id": m.id, "name": m.name} for m in metrics],
+            "cycle_id": cycle["id"],
+            "cycle_name": cycle["name"],
+            "start_date": cycle["start_date"],
+            "end_date": cycle["end_date"],
+            "metrics": snapshot["metrics"],
             "participants": [
                 {
-                    "id": u.id,
-                    "username": u.username,
-                    "is_self": (u.id == request.user.id)
-                } for u in participants
+                    "id": u["id"],
+                    "username": u["username"],
+                    "is_self": (u["id"] == request.user.id)
+                } for u in review_targets(snapshot, request.user.id)
             ]
-        }, status=status.HTTP_200_OK)
+        }, status=status.HTTP_200_OK, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+
+
+class ReviewPageBootstrapView(ReplicaReadMixin, APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_summary="Everything the review form needs in one response",
+        operation_description="The cycle, its metrics, the participants and the reviewer's finalized/draft "
+                              "state. Answers 304 when If-None-Match matches the ETag.",
+        responses={200: openapi.Response(description="Review page data"), 304: "Not modified"}
+    )
+    def get(self, request, cycle_id):
+        snapshot = get_cycle_snapshot(cycle_id)
+        if snapshot is None:
+            return Response({"detail": "Review cycle not found."}, status=status.HTTP_404_NOT_FOUND)
+        if not any(p["id"] == request.user.id for p in snapshot["participants"]):
+            return Response({"detail": "Not allowed to access this review cycle."}, status=status.HTTP_403_FORBIDDEN)
+
+        # The snapshot is cached; the reviewer's own state is two small reads
+        finalized, finalized_at = SubmissionStatus.objects.filter(
+            user=request.user, review_cycle_id=cycle_id
+        ).values_list('finalized', 'finalized_at').first() or (False, None)
+        cells = list(draft_cells(cycle_id, request.user))
+        state = hashlib.sha1(repr((finalized, finalized_at, cells)).encode()).hexdigest()[:16]
+        etag = f'"{snapshot["version"]}-{request.user.id}-{state}"'
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if etag in parse_etags(request.headers.get("If-None-Match", "")):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        cycle = snapshot["cycle"]
+        return Response({
+            "cycle": {
+                "id": cycle["id"],
+                "name": cycle["name"],
+                "start_date": cycle["start_date"],
+                "end_date": cycle["end_date"],
+            },
+            "metrics": snapshot["metrics"],
+            "participants": [
+                {"id": u["id"], "username": u["username"], "is_self": u["id"] == request.user.id}
+                for u in review_targets(snapshot, request.user.id)
+            ],
+            "reviewer": {
+                "finalized": finalized,
+                "finalized_at": finalized_at,
+                "draft": {
+                    "updated_at": max((updated_at for *_, updated_at in cells), default=None),
+                    "ratings": group_cells(cells),
+                },
+            },
+        }, status=status.HTTP_200_OK, headers=headers)
 
 
 class BulkRatingSubmitView(APIView):
@@ -252,61 +442,494 @@ class BulkRatingSubmitView(APIView):
 
         data = serializer.validated_data['ratings']
 
-        # Get metrics linked to review cycle
-        linked_metrics = set(review_cycle.metrics.values_list('id', flat=True))
-        submitted_metrics = set(item['metric'] for item in data)
-
-        if submitted_metrics != linked_metrics:
-            missing = linked_metrics - submitted_metrics
-            return Response({"detail": f"Missing ratings for metrics: {list(missing)}"}, status=status.HTTP_400_BAD_REQUEST)
-
-        # Get users in group (excluding self-review if not required)
-        group_user_ids = set(User.objects.filter(groups=review_cycle.group).values_list('id', flat=True))
-
-        # Track submitted ratings
-        created_ratings = []
-
-        for metric_block in data:
-            metric_id = metric_block['metric']
-            values = metric_block['values']
-
-            # Validate metric existence
-            if metric_id not in linked_metrics:
-                return Response({"detail": f"Metric {metric_id} is not part of this review cycle."}, status=status.HTTP_400_BAD_REQUEST)
-
-            target_users_in_payload = set(entry['target_user'] for entry in values)
-
-            if target_users_in_payload != group_user_ids:
-                missing_users = group_user_ids - target_users_in_payload
-                return Response({"detail": f"Missing ratings for users: {list(missing_users)} for metric {metric_id}"}, status=status.HTTP_400_BAD_REQUEST)
-
-            for entry in values:
-                rating, _ = Rating.objects.update_or_create(
-                    review_cycle=review_cycle,
-                    target_user_id=entry['target_user'],
-                    metric_id=metric_id,
-                    is_self_review=(request.user.id == entry['target_user']),
-                    defaults={'value': entry['value']}
-                )
-                created_ratings.append({
-                    "target_user": rating.target_user.username,
-                    "metric": rating.metric.name,
-                    "value": rating.value,
-                    "is_self_review": rating.is_self_review
-                })
-
-        # Mark as finalized
-        SubmissionStatus.objects.update_or_create(
-            user=request.user,
-            review_cycle=review_cycle,
-            defaults={"finalized": True, "finalized_at": timezone.now()}
-        )
+        # Validate the whole payload before writing anything
+        try:
+            usernames, metric_names = check_complete(review_cycle, data, request.user)
+            # Write all ratings and mark as finalized in one transaction
+            created_ratings = submit_ratings(review_cycle, request.user, data, usernames, metric_names)
+        except SubmissionError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
         return Response({
             "message": "Ratings submitted successfully",
             "submitted": created_ratings
         }, status=status.HTTP_201_CREATED)
 
+class RatingDraftView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_summary="The reviewer's autosaved draft for a review cycle",
+        responses={200: openapi.Response(description="Draft cells grouped by metric")}
+    )
+    def get(self, request, review_cycle_id):
+        snapshot = get_cycle_snapshot(review_cycle_id)
+        if snapshot is None:
+            return Response({"detail": "Review cycle not found."}, status=status.HTTP_404_NOT_FOUND)
+        if not any(p["id"] == request.user.id for p in snapshot["participants"]):
+            return Response({"detail": "Not allowed to access this review cycle."}, status=status.HTTP_403_FORBIDDEN)
+        return Response({"cycle_id": review_cycle_id, "ratings": draft_ratings(review_cycle_id, request.user)})
+
+    @swagger_auto_schema(
+        operation_summary="Autosave draft rating cells",
+        operation_description="Send one cell ({metric, target_user, value}) or {\"changes\": [...]}; a null value "
+                              "clears the cell. Retries with the same Idempotency-Key header are answered without "
+                              "writing again.",
+        request_body=RatingDraftSerializer,
+        manual_parameters=[openapi.Parameter('Idempotency-Key', openapi.IN_HEADER, type=openapi.TYPE_STRING)],
+        responses={200: openapi.Response(description="Counts of saved and cleared cells")}
+    )
+    def patch(self, request, review_cycle_id):
+        key = request.headers.get('Idempotency-Key')
+        cache_key = idempotency_cache_key(request.user.id, review_cycle_id, key) if key else None
+        if cache_key:
+            replayed = cache.get(cache_key)
+            if replayed is not None:
+                return Response(replayed, headers={"Idempotent-Replayed": "true"})
+
+        snapshot = get_cycle_snapshot(review_cycle_id)
+        if snapshot is None:
+            return Response({"detail": "Review cycle not found."}, status=status.HTTP_404_NOT_FOUND)
+        participant_ids = {p["id"] for p in snapshot["participants"]}
+        if request.user.id not in participant_ids:
+            return Response({"detail": "Not allowed to access this review cycle."}, status=status.HTTP_403_FORBIDDEN)
+        if SubmissionStatus.objects.filter(user=request.user, review_cycle_id=review_cycle_id, finalized=True).exists():
+            return Response({"detail": "You have already finalized your submission."}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = RatingDraftSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        changes = serializer.validated_data['changes']
+
+        # Cells are checked against the cached snapshot (and the reviewer's assignments)
+        metric_ids = {m["id"] for m in snapshot["metrics"]}
+        target_ids = {p["id"] for p in review_targets(snapshot, request.user.id)}
+        invalid = [c for c in changes if c['metric'] not in metric_ids or c['target_user'] not in target_ids]
+        if invalid:
+            return Response({"detail": f"Cells are not part of this review cycle: {invalid}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        saved, cleared = save_draft_changes(review_cycle_id, request.user, changes)
+        body = {"saved": saved, "cleared": cleared}
+        if cache_key:
+            cache.set(cache_key, body, IDEMPOTENCY_TIMEOUT)
+        return Response(body, status=status.HTTP_200_OK)
+
+
+class RatingDraftFinalizeView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_summary="Finalize the autosaved draft",
+        responses={201: "Submitted successfully", 400: "Draft incomplete"}
+    )
+    def post(self, request, review_cycle_id):
+        try:
+            review_cycle = ReviewCycle.objects.get(id=review_cycle_id, is_active=True)
+        except ReviewCycle.DoesNotExist:
+            return Response({"detail": "Review cycle not found."}, status=status.HTTP_404_NOT_FOUND)
+        if SubmissionStatus.objects.filter(user=request.user, review_cycle=review_cycle, finalized=True).exists():
+            return Response({"detail": "You have already finalized your submission."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            submitted = finalize_draft(review_cycle, request.user)
+        except SubmissionError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            "message": "Ratings submitted successfully",
+            "submitted": submitted
+        }, status=status.HTTP_201_CREATED)
+
+
+class WeaknessNoteSubmitView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_summary="Leave anonymous weakness notes on peers in a review cycle",
+        request_body=WeaknessNoteSubmitSerializer,
+        responses={201: "Notes stored", 400: "Validation failed", 404: "Review cycle not found"}
+    )
+    def post(self, request, cycle_id):
+        try:
+            review_cycle = ReviewCycle.objects.get(id=cycle_id, is_active=True)
+        except ReviewCycle.DoesNotExist:
+            return Response({"detail": "Review cycle not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        serializer = WeaknessNoteSubmitSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            notes = submit_notes(review_cycle, request.user, serializer.validated_data['notes'])
+        except SubmissionError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"submitted": notes}, status=status.HTTP_201_CREATED)
+
+
+class WeaknessNoteSearchView(ReplicaReadMixin, APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_summary="Full-text search over weakness notes",
+        operation_description="Words are matched by stem, \"quoted phrases\" as phrases and word* by prefix "
+                              "(prefixes on SQLite only).  Results are ranked best first.  Matches in the "
+                              "snippet are wrapped in <mark> tags; the rest of the snippet is HTML-escaped.",
+        manual_parameters=[
+            openapi.Parameter('q', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=True),
+            openapi.Parameter('cycle', openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+            openapi.Parameter('group', openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+            openapi.Parameter('target_user', openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+            openapi.Parameter('limit', openapi.IN_QUERY, type=openapi.TYPE_INTEGER,
+                              description=f"At most this many results (max {note_search_settings()['MAX_LIMIT']})"),
+        ],
+    )
+    def get(self, request):
+        query = NoteSearchQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+        params = query.validated_data
+        results = search_notes(params['q'], review_cycle_id=params.get('cycle'), group_id=params.get('group'),
+                               target_user_id=params.get('target_user'), limit=params.get('limit'))
+        return Response({"query": params['q'], "results": results}, status=status.HTTP_200_OK)
+
+
+class ReviewCycleResultsView(ReplicaReadMixin, APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_summary="Aggregated results for a review cycle",
+        responses={200: openapi.Response(description="Per user and metric self/peer statistics")}
+    )
+    def get(self, request, cycle_id):
+        try:
+            review_cycle = ReviewCycle.objects.select_related('frozen_results').defer(
+                'frozen_results__report').get(id=cycle_id)
+        except ReviewCycle.DoesNotExist:
+            return Response({"detail": "Review cycle not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        results = frozen_payload(review_cycle, 'results')
+        if results is None:
+            results = build_results(cycle_results_queryset(review_cycle.id))
+
+        return Response({
+            "cycle_id": review_cycle.id,
+            "cycle_name": review_cycle.name,
+            "results": results
+        }, status=status.HTTP_200_OK)
+
+
+class ReviewCycleReportView(ReplicaReadMixin, APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_summary="Statistics report for a review cycle",
+        responses={200: openapi.Response(description="Per member and per metric self/peer statistics")}
+    )
+    def get(self, request, cycle_id):
+        try:
+            review_cycle = ReviewCycle.objects.select_related('group', 'frozen_results').defer(
+                'frozen_results__results').get(id=cycle_id)
+        except ReviewCycle.DoesNotExist:
+            return Response({"detail": "Review cycle not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        report = frozen_payload(review_cycle, 'report')
+        if report is None:
+            report = build_report(load_cycle_matrix(review_cycle))
+        return Response({
+            "cycle_id": review_cycle.id,
+            "cycle_name": review_cycle.name,
+            **report,
+        }, status=status.HTTP_200_OK)
+
+
+class ReviewCycleUserReportView(ReplicaReadMixin, APIView):
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_summary="One member's statistics in a review cycle",
+        operation_description="Available to staff and to the member themselves.",
+        responses={200: openapi.Response(description="The member's per metric scores against the group")}
+    )
+    def get(self, request, cycle_id, user_id):
+        if not request.user.is_staff and request.user.id != user_id:
+            return Response({"detail": "You can only view your own report."}, status=status.HTTP_403_FORBIDDEN)
+        try:
+            review_cycle = ReviewCycle.objects.select_related('group').get(id=cycle_id)
+        except ReviewCycle.DoesNotExist:
+            return Response({"detail": "Review cycle not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        matrix = load_cycle_matrix(review_cycle)
+        index = matrix.user_index(user_id)
+        if index is None:
+            return Response({"detail": "User is not a participant of this review cycle."},
+                            status=status.HTTP_404_NOT_FOUND)
+
+        return Response({
+            "cycle_id": review_cycle.id,
+            "cycle_name": review_cycle.name,
+            **build_user_report(matrix, index),
+        }, status=status.HTTP_200_OK)
+
+
+class ReviewCycleCloseView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_summary="Close a review cycle",
+        operation_description="Stops submissions and appends the cycle's ratings to the trend rollup.",
+        manual_parameters=[ASYNC_PARAMETER],
+        responses={200: openapi.Response('Review cycle closed'), 202: JobSerializer,
+                   409: openapi.Response('Already closed')}
+    )
+    def post(self, request, cycle_id):
+        try:
+            review_cycle = ReviewCycle.objects.get(id=cycle_id)
+        except ReviewCycle.DoesNotExist:
+            return Response({"detail": "Review cycle not found."}, status=status.HTTP_404_NOT_FOUND)
+        if review_cycle.closed_at is not None:
+            return Response({"detail": "Review cycle is already closed."}, status=status.HTTP_409_CONFLICT)
+        if wants_background(request):
+            return job_accepted(enqueue('close_review_cycle', {"cycle_id": review_cycle.id}, request.user))
+
+        points = close_review_cycle(review_cycle)
+        return Response({"detail": "Review cycle closed.", "closed_at": review_cycle.closed_at,
+                         "trend_points": points}, status=status.HTTP_200_OK)
+
+
+class ReviewCycleArchiveView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    def get_cycle(self, cycle_id):
+        return ReviewCycle.objects.filter(id=cycle_id).first()
+
+    @swagger_auto_schema(
+        operation_summary="Archive a closed cycle's ratings to a columnar file",
+        operation_description="With purge=true the cycle's Rating rows are deleted afterwards; results and "
+                              "exports then read the archive.",
+        manual_parameters=[
+            openapi.Parameter('purge', openapi.IN_QUERY, type=openapi.TYPE_BOOLEAN,
+                              description="Delete the archived rows from the ratings table"),
+            ASYNC_PARAMETER,
+        ],
+        responses={200: openapi.Response('Ratings archived'), 202: JobSerializer,
+                   409: openapi.Response('Cycle still active or already purged')}
+    )
+    def post(self, request, cycle_id):
+        review_cycle = self.get_cycle(cycle_id)
+        if review_cycle is None:
+            return Response({"detail": "Review cycle not found."}, status=status.HTTP_404_NOT_FOUND)
+        purge = request.query_params.get('purge')
+        purge = purge.lower() in ('1', 'true', 'yes') if purge is not None else None
+        if wants_background(request):
+            return job_accepted(enqueue('archive_ratings', {"cycle_id": review_cycle.id, "purge": purge},
+                                        request.user))
+
+        try:
+            archive = archive_cycle(review_cycle, purge=purge)
+        except ArchiveError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_409_CONFLICT)
+        return Response({"detail": "Ratings archived.", "rows": archive.row_count, "size": archive.size,
+                         "purged": archive.purged}, status=status.HTTP_200_OK)
+
+    @swagger_auto_schema(
+        operation_summary="Restore a cycle's purged ratings from its archive",
+        manual_parameters=[ASYNC_PARAMETER],
+        responses={200: openapi.Response('Ratings restored'), 202: JobSerializer}
+    )
+    def delete(self, request, cycle_id):
+        review_cycle = self.get_cycle(cycle_id)
+        if review_cycle is None:
+            return Response({"detail": "Review cycle not found."}, status=status.HTTP_404_NOT_FOUND)
+        if wants_background(request):
+            return job_accepted(enqueue('restore_ratings', {"cycle_id": review_cycle.id}, request.user))
+        return Response({"detail": "Ratings restored.", "rows": restore_cycle(review_cycle)},
+                        status=status.HTTP_200_OK)
+
+
+TREND_QUERY_PARAMETERS = [
+    openapi.Parameter('metric', openapi.IN_QUERY, type=openapi.TYPE_ARRAY, items=openapi.Items(type=openapi.TYPE_INTEGER),
+                      collectionFormat='multi', description="Only these metric ids (repeatable)"),
+    openapi.Parameter('start', openapi.IN_QUERY, type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE,
+                      description="Cycles ending on or after this date"),
+    openapi.Parameter('end', openapi.IN_QUERY, type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE,
+                      description="Cycles ending on or before this date"),
+    openapi.Parameter('last', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description="Only the most recent N cycles"),
+    openapi.Parameter('window', openapi.IN_QUERY, type=openapi.TYPE_INTEGER,
+                      description="Cycles in the moving average (default 3)"),
+]
+
+
+def trend_response(request, **owner):
+    query = TrendQuerySerializer(data=request.query_params)
+    if not query.is_valid():
+        return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+    params = query.validated_data
+    window = params.pop('window')
+    rows = trend_points(metric_ids=params.pop('metric', None), **params, **owner)
+    return Response({"window": window, "metrics": build_trends(rows, window)}, status=status.HTTP_200_OK)
+
+
+class UserTrendView(ReplicaReadMixin, APIView):
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_summary="A user's metric trends across closed review cycles",
+        operation_description="Available to staff and to the user themselves.",
+        manual_parameters=TREND_QUERY_PARAMETERS,
+    )
+    def get(self, request, user_id):
+        if not request.user.is_staff and request.user.id != user_id:
+            return Response({"detail": "You can only view your own trends."}, status=status.HTTP_403_FORBIDDEN)
+        response = trend_response(request, target_user_id=user_id)
+        if response.status_code == 200:
+            response.data["user_id"] = user_id
+        return response
+
+
+class GroupTrendView(ReplicaReadMixin, APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_summary="A group's metric trends across closed review cycles",
+        manual_parameters=TREND_QUERY_PARAMETERS,
+    )
+    def get(self, request, group_id):
+        if not Group.objects.filter(id=group_id).exists():
+            return Response({"detail": "Group not found"}, status=status.HTTP_404_NOT_FOUND)
+        response = trend_response(request, group_id=group_id, target_user__isnull=True)
+        if response.status_code == 200:
+            response.data["group_id"] = group_id
+        return response
+
+
+class JobListView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_summary="List recent background jobs",
+        manual_parameters=[
+            openapi.Parameter('status', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                              enum=[choice for choice, _ in Job.STATUS_CHOICES]),
+            openapi.Parameter('kind', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=sorted(HANDLERS)),
+        ],
+        responses={200: JobSerializer(many=True)}
+    )
+    def get(self, request):
+        jobs = Job.objects.order_by('-id')
+        if request.query_params.get('status'):
+            jobs = jobs.filter(status=request.query_params['status'])
+        if request.query_params.get('kind'):
+            jobs = jobs.filter(kind=request.query_params['kind'])
+        return Response(JobSerializer(jobs[:100], many=True).data)
+
+
+class JobCreateView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_summary="Queue a background job",
+        operation_description="Kinds: " + ", ".join(sorted(HANDLERS)),
+        request_body=JobCreateSerializer,
+        responses={202: JobSerializer}
+    )
+    def post(self, request):
+        serializer = JobCreateSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        data = serializer.validated_data
+        if data['kind'] not in HANDLERS:
+            return Response({"kind": [f"Unknown job kind. Choose from {sorted(HANDLERS)}."]},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return job_accepted(enqueue(data['kind'], data['payload'], request.user, data['max_attempts']))
+
+
+class JobDetailView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(operation_summary="Poll a background job", responses={200: JobSerializer})
+    def get(self, request, job_id):
+        try:
+            job = Job.objects.get(id=job_id)
+        except Job.DoesNotExist:
+            return Response({"detail": "Job not found."}, status=status.HTTP_404_NOT_FOUND)
+        if not request.user.is_staff and job.created_by_id != request.user.id:
+            return Response({"detail": "Job not found."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(JobSerializer(job).data)
+
+
+class CompletionDashboardView(ReplicaReadMixin, APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_summary="Submission completion of all active review cycles",
+        manual_parameters=[openapi.Parameter('group_id', openapi.IN_QUERY, type=openapi.TYPE_INTEGER)],
+        responses={200: openapi.Response(description="Per cycle counts and totals per group")}
+    )
+    def get(self, request):
+        return Response(completion_dashboard(request.query_params.get('group_id')), status=status.HTTP_200_OK)
+
+
+class ReviewCycleCompletionView(ReplicaReadMixin, APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_summary="Submission completion of a review cycle",
+        responses={200: openapi.Response(description="Counts, percentage and the members still pending")}
+    )
+    def get(self, request, cycle_id):
+        try:
+            completion = CycleCompletion.objects.select_related('review_cycle').get(review_cycle_id=cycle_id)
+        except CycleCompletion.DoesNotExist:
+            return Response({"detail": "Review cycle not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response({
+            "cycle_id": cycle_id,
+            "cycle_name": completion.review_cycle.name,
+            "group_id": completion.group_id,
+            "participants": completion.participant_count,
+            "finalized": completion.finalized_count,
+            "percentage": percentage(completion.finalized_count, completion.participant_count),
+            "pending_users": pending_users(completion.review_cycle),
+        }, status=status.HTTP_200_OK)
+
+
+class ReviewCycleExportView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_summary="Stream a review cycle's ratings or weakness notes",
+        manual_parameters=[
+            openapi.Parameter('kind', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                              enum=list(EXPORTS), description="What to export (default: ratings)"),
+            openapi.Parameter('output', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                              enum=list(ENCODERS), description="Output format (default: csv)"),
+            openapi.Parameter('gzip', openapi.IN_QUERY, type=openapi.TYPE_BOOLEAN,
+                              description="Compress the stream on the fly"),
+        ],
+        responses={200: "File stream", 400: "Invalid export options"}
+    )
+    def get(self, request, cycle_id):
+        kind = request.query_params.get('kind', 'ratings')
+        output = request.query_params.get('output', 'csv')
+        compress = request.query_params.get('gzip', '').lower() in ('1', 'true', 'yes')
+
+        if kind not in EXPORTS or output not in ENCODERS:
+            return Response({"detail": f"kind must be one of {list(EXPORTS)} and output one of {list(ENCODERS)}."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            review_cycle = ReviewCycle.objects.get(id=cycle_id)
+        except ReviewCycle.DoesNotExist:
+            return Response({"detail": "Review cycle not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        content_type, stream = export_stream(review_cycle, kind=kind, output=output, compress=compress)
+        filename = f"cycle-{review_cycle.id}-{kind}.{output}" + (".gz" if compress else "")
+        response = StreamingHttpResponse(stream, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
 class MetricCreateView(APIView):
     permission_classes = [permissions.IsAdminUser]
 
@@ -319,7 +942,7 @@ class MetricCreateView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class MetricListView(APIView):
+class MetricListView(ReplicaReadMixin, APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     @swagger_auto_schema(
@@ -377,7 +1000,7 @@ class SimpleAuthTokenView(APIView):
         if user is None:
             return Response({"detail": "Invalid credentials"}, status=status.HTTP_401_UNAUTHORIZED)
 
-        refresh = RefreshToken.for_user(user)
+        refresh = ReviewRefreshToken.for_user(user)
         return Response({
             'access': str(refresh.access_token),
             'refresh': str(refresh)
@@ -416,7 +1039,7 @@ class CustomTokenRefreshView(TokenRefreshView):
 #         fields = []
 
 
-class UserList(APIView):
+class UserList(ReplicaReadMixin, APIView):
     # permission_classes = [IsAuthenticated, IsAdminUser]
 
     @swagger_auto_schema(
@@ -437,6 +1060,7 @@ class UserList(APIView):
             users = User.objects.filter(groups__id=group_id).order_by("id")
         else:
             users = User.objects.all().order_by("id")
+        users = users.prefetch_related("groups")
 
         serializer = UserSerializer(users, many=True)
         return Response(serializer.data)
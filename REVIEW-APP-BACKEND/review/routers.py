@@ -0,0 +1,140 @@
+# review/routers.py
+"""
+Read-replica routing.
+
+Nothing goes to the replica by default: only code running inside
+``replica_reads()`` does, i.e. the read-only views marked with
+``ReplicaReadMixin`` and the async views.  Everything else, including the
+validation reads of write endpoints, stays on ``default``.
+
+Two rules keep users from reading their own writes from a lagging
+replica: a request that writes switches its remaining reads to the
+primary, and ``PrimaryPinMiddleware`` pins a user who just wrote to the
+primary for ``REVIEW_REPLICA['PIN_SECONDS']``.  Pins are kept in the
+default cache, which must be shared by all workers for the next request
+to see them wherever it lands; ``caching.check_shared_cache`` refuses to
+start otherwise.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS
+
+REPLICA_DEFAULTS = {
+    'ALIAS': 'replica',
+    'PIN_SECONDS': 5,   # should exceed the replication lag
+}
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def replica_settings():
+    return {**REPLICA_DEFAULTS, **getattr(settings, 'REVIEW_REPLICA', {})}
+
+
+def replica_alias():
+    """The configured replica alias, or ``None`` when there is no replica."""
+    alias = replica_settings()['ALIAS']
+    return alias if alias in settings.DATABASES else None
+
+
+class _Reads:
+    def __init__(self, use_replica):
+        self.use_replica = use_replica
+
+
+_reads = ContextVar('review_replica_reads', default=None)
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    """Send reads in this block to the replica until something is written."""
+    token = _reads.set(_Reads(enabled))
+    try:
+        yield
+    finally:
+        _reads.reset(token)
+
+
+@contextmanager
+def primary_reads():
+    """Read from the primary in this block, e.g. to fill a shared cache."""
+    with replica_reads(False):
+        yield
+
+
+def pin_key(user_id):
+    return f"review:primary-pin:{user_id}"
+
+
+def pin_to_primary(user_id):
+    cache.set(pin_key(user_id), True, replica_settings()['PIN_SECONDS'])
+
+
+def is_pinned(user_id):
+    return user_id is not None and cache.get(pin_key(user_id)) is not None
+
+
+async def ais_pinned(user_id):
+    return user_id is not None and await cache.aget(pin_key(user_id)) is not None
+
+
+class ReplicaRouter:
+    """Routes reads inside ``replica_reads()`` to the replica, everything else to the primary."""
+
+    def db_for_read(self, model, **hints):
+        reads = _reads.get()
+        if reads is not None and reads.use_replica:
+            return replica_alias()
+        return None
+
+    def db_for_write(self, model, **hints):
+        reads = _reads.get()
+        if reads is not None:
+            # read your own writes for the rest of the request
+            reads.use_replica = False
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, replica_alias()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+class ReplicaReadMixin:
+    """Serve a read-only ``APIView`` from the replica unless the user is pinned to the primary."""
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        # authentication above has already run against the primary
+        if replica_alias() is not None:
+            self._replica_reads = replica_reads(not is_pinned(request.user.id))
+            self._replica_reads.__enter__()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        replica = getattr(self, '_replica_reads', None)
+        if replica is not None:
+            self._replica_reads = None
+            replica.__exit__(None, None, None)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class PrimaryPinMiddleware:
+    """Pin users to the primary for a few seconds after a successful write."""
+
+    def __init__(self, get_response):
+        if replica_alias() is None:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        user = getattr(request, 'user', None)
+        if request.method not in SAFE_METHODS and response.status_code < 400 and user is not None \
+                and user.is_authenticated:
+            pin_to_primary(user.id)
+        return response
@@ -2,8 +2,11 @@
 from django.contrib.auth.models import Group, User
 from rest_framework import serializers
 from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
 from rest_framework.exceptions import ValidationError
-from review.models import ReviewCycle, Metric
+from review.models import ReviewCycle, Metric, Job
+from review.assignments import assign_reviewers
 
 
 class GroupSerializer(serializers.ModelSerializer):
@@ -13,7 +16,28 @@ class GroupSerializer(serializers.ModelSerializer):
 
 
 class GroupUserSerializer(serializers.Serializer):
-    user_ids = serializers.ListField(child=serializers.IntegerField())
+    # user_ids replaces the member set; add/remove apply a delta
+    user_ids = serializers.ListField(child=serializers.IntegerField(), required=False)
+    add = serializers.ListField(child=serializers.IntegerField(), required=False)
+    remove = serializers.ListField(child=serializers.IntegerField(), required=False)
+
+    def validate(self, data):
+        if 'user_ids' in data and ('add' in data or 'remove' in data):
+            raise serializers.ValidationError("Send either user_ids or add/remove, not both.")
+        if not any(field in data for field in ('user_ids', 'add', 'remove')):
+            raise serializers.ValidationError("Send user_ids or add/remove.")
+        conflicting = set(data.get('add', ())) & set(data.get('remove', ()))
+        if conflicting:
+            raise serializers.ValidationError(f"Users both added and removed: {sorted(conflicting)}.")
+        return data
+
+
+class GroupMembershipChangeSerializer(GroupUserSerializer):
+    group_id = serializers.IntegerField()
+
+
+class GroupMembershipBulkSerializer(serializers.Serializer):
+    changes = GroupMembershipChangeSerializer(many=True, allow_empty=False)
 
 
 class UserCreateSerializer(serializers.ModelSerializer):
@@ -42,7 +66,8 @@ class UserInfoSerializer(serializers.ModelSerializer):
 
 
 class GroupListSerializer(serializers.ModelSerializer):
-    membersCount = serializers.IntegerField(source='user_set.count', read_only=True)
+    # Expects querysets annotated with Count('user') to avoid one COUNT per group
+    membersCount = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Group
@@ -57,23 +82,36 @@ class ReviewCycleCreateSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = ReviewCycle
-        fields = ['name', 'group_id', 'start_date', 'end_date', 'metric_ids']
+        fields = ['name', 'group_id', 'start_date', 'end_date', 'metric_ids', 'reviews_per_reviewer',
+                  'assignment_seed', 'packed_ratings']
+        extra_kwargs = {'reviews_per_reviewer': {'min_value': 1}}
 
     def create(self, validated_data):
         group_id = validated_data.pop('group_id')
         metric_ids = validated_data.pop('metric_ids', [])
 
         group = Group.objects.get(id=group_id)
-        review_cycle = ReviewCycle.objects.create(group=group, **validated_data)
+        # cycles that haven't started yet are activated by sync_review_cycles
+        validated_data.setdefault('is_active', validated_data['start_date'] <= timezone.localdate())
+        with transaction.atomic():
+            review_cycle = ReviewCycle.objects.create(group=group, **validated_data)
+
+            if metric_ids:
+                review_cycle_metrics = Metric.objects.filter(id__in=metric_ids)
+                for metric in review_cycle_metrics:
+                    metric.review_cycles.add(review_cycle)
 
-        if metric_ids:
-            review_cycle_metrics = Metric.objects.filter(id__in=metric_ids)
-            for metric in review_cycle_metrics:
-                metric.review_cycles.add(review_cycle)
+            if review_cycle.reviews_per_reviewer:
+                assign_reviewers(review_cycle)
 
         return review_cycle
 
 
+class ReviewAssignmentSerializer(serializers.Serializer):
+    reviews_per_reviewer = serializers.IntegerField(min_value=1, required=False)
+    seed = serializers.IntegerField(min_value=-2 ** 63, max_value=2 ** 63 - 1, required=False)
+
+
 class MetricSerializer(serializers.ModelSerializer):
     review_cycles = serializers.PrimaryKeyRelatedField(
         queryset=ReviewCycle.objects.all(), many=True, required=False
@@ -103,4 +141,64 @@ class MetricRatingsSerializer(serializers.Serializer):
 
 
 class BulkReviewSubmitSerializer(serializers.Serializer):
-    ratings = MetricRatingsSerializer(many=True)
\ No newline at end of file
+    ratings = MetricRatingsSerializer(many=True)
+
+
+class RatingDraftChangeSerializer(serializers.Serializer):
+    metric = serializers.IntegerField()
+    target_user = serializers.IntegerField()
+    value = serializers.IntegerField(allow_null=True)  # null clears the cell
+
+
+class RatingDraftSerializer(serializers.Serializer):
+    changes = RatingDraftChangeSerializer(many=True, allow_empty=False, max_length=1000)
+
+    def to_internal_value(self, data):
+        # a single cell may be sent on its own
+        if isinstance(data, dict) and 'changes' not in data:
+            data = {'changes': [data]}
+        return super().to_internal_value(data)
+
+class WeaknessNoteEntrySerializer(serializers.Serializer):
+    target_user = serializers.IntegerField()
+    note = serializers.CharField(max_length=2000)
+
+
+class WeaknessNoteSubmitSerializer(serializers.Serializer):
+    notes = WeaknessNoteEntrySerializer(many=True, allow_empty=False, max_length=200)
+
+
+class NoteSearchQuerySerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=200)
+    cycle = serializers.IntegerField(required=False)
+    group = serializers.IntegerField(required=False)
+    target_user = serializers.IntegerField(required=False)
+    limit = serializers.IntegerField(required=False, min_value=1)
+
+
+class TrendQuerySerializer(serializers.Serializer):
+    metric = serializers.ListField(child=serializers.IntegerField(), required=False)
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    last = serializers.IntegerField(required=False, min_value=1)
+    window = serializers.IntegerField(required=False, min_value=1, max_value=20, default=3)
+
+    def to_internal_value(self, data):
+        # metric may be repeated in the query string
+        if hasattr(data, 'getlist'):
+            data = {**data.dict(), 'metric': data.getlist('metric')}
+        return super().to_internal_value(data)
+
+
+class JobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Job
+        # payload is left out: it may hold passwords for imports
+        fields = ['id', 'kind', 'status', 'attempts', 'max_attempts', 'progress', 'progress_message', 'result',
+                  'error', 'created_by', 'created_at', 'run_after', 'started_at', 'heartbeat_at', 'finished_at']
+
+
+class JobCreateSerializer(serializers.Serializer):
+    kind = serializers.CharField()
+    payload = serializers.DictField(required=False, default=dict)
+    max_attempts = serializers.IntegerField(required=False, default=3, min_value=1, max_value=10)
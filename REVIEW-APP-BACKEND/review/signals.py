@@ -0,0 +1,163 @@
+# review/signals.py
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+from .assignments import sync_group_assignments
+from .authentication import user_cache
+from .caching import invalidate_cycle_snapshots, invalidate_group_snapshots
+from .completion import create_completion, record_finalized, refresh_participant_counts
+from .memberships import membership_changed
+from .archive import delete_archive_file
+from .models import Metric, RatingArchive, ReviewCycle, SubmissionStatus
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def group_membership_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear', 'post_clear'):
+        return
+    if reverse:
+        # group.user_set.add/remove/clear(): instance is the Group
+        if action != 'pre_clear':
+            invalidate_group_snapshots([instance.pk])
+    elif action == 'pre_clear':
+        # user.groups.clear(): the affected groups are only known before clearing
+        invalidate_group_snapshots(list(instance.groups.values_list('id', flat=True)))
+    elif pk_set:
+        invalidate_group_snapshots(pk_set)
+
+
+@receiver(m2m_changed, sender=Metric.review_cycles.through)
+def cycle_metrics_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear', 'post_clear'):
+        return
+    if reverse:
+        # review_cycle.metrics.add/remove/clear(): instance is the ReviewCycle
+        if action != 'pre_clear':
+            invalidate_cycle_snapshots([instance.pk])
+    elif action == 'pre_clear':
+        invalidate_cycle_snapshots(list(instance.review_cycles.values_list('id', flat=True)))
+    elif pk_set:
+        invalidate_cycle_snapshots(pk_set)
+
+
+@receiver(pre_save, sender=ReviewCycle)
+def review_cycle_activated(sender, instance, **kwargs):
+    if instance.is_active and instance.activated_at is None:
+        instance.activated_at = timezone.now()
+
+
+@receiver(post_save, sender=ReviewCycle)
+@receiver(post_delete, sender=ReviewCycle)
+def review_cycle_changed(sender, instance, **kwargs):
+    invalidate_cycle_snapshots([instance.pk])
+
+
+@receiver(post_delete, sender=RatingArchive)
+def rating_archive_deleted(sender, instance, **kwargs):
+    file_name = instance.file_name
+    transaction.on_commit(lambda: delete_archive_file(file_name))
+
+
+@receiver(post_save, sender=Metric)
+@receiver(pre_delete, sender=Metric)
+def metric_changed(sender, instance, created=False, **kwargs):
+    if not created:
+        invalidate_cycle_snapshots(list(instance.review_cycles.values_list('id', flat=True)))
+
+
+@receiver(post_save, sender=User)
+def user_renamed(sender, instance, created, update_fields=None, **kwargs):
+    # Snapshots only carry usernames; skip e.g. last_login updates.
+    if created or (update_fields is not None and 'username' not in update_fields):
+        return
+    invalidate_group_snapshots(list(instance.groups.values_list('id', flat=True)))
+
+
+@receiver(pre_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    group_ids = list(instance.groups.values_list('id', flat=True))
+    invalidate_group_snapshots(group_ids)
+    # memberships and assignments go with the user, recount and refill once they are gone
+    transaction.on_commit(lambda: refresh_participant_counts(group_ids))
+    transaction.on_commit(lambda: sync_group_assignments(group_ids))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def evict_cached_user(sender, instance, **kwargs):
+    user_cache.invalidate([instance.pk])
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def evict_cached_members(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        user_cache.invalidate([instance.pk])
+    elif action == 'pre_clear':
+        user_cache.invalidate(list(instance.user_set.values_list('id', flat=True)))
+    elif pk_set:
+        user_cache.invalidate(pk_set)
+
+
+@receiver(membership_changed)
+def bulk_membership_changed(sender, group_ids, user_ids, **kwargs):
+    invalidate_group_snapshots(group_ids)
+    user_cache.invalidate(user_ids)
+    refresh_participant_counts(group_ids)
+    sync_group_assignments(group_ids)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def recount_participants(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear', 'post_clear'):
+        return
+    if reverse:
+        if action != 'pre_clear':
+            refresh_participant_counts([instance.pk])
+    elif action == 'pre_clear':
+        # remember the groups; they are recounted on post_clear
+        instance._cleared_group_ids = list(instance.groups.values_list('id', flat=True))
+    elif action == 'post_clear':
+        refresh_participant_counts(getattr(instance, '_cleared_group_ids', []))
+    elif pk_set:
+        refresh_participant_counts(pk_set)
+
+
+@receiver(post_save, sender=ReviewCycle)
+def track_completion(sender, instance, created, **kwargs):
+    if created:
+        create_completion(instance)
+
+
+@receiver(post_delete, sender=SubmissionStatus)
+def submission_removed(sender, instance, **kwargs):
+    if instance.finalized:
+        record_finalized(instance.review_cycle_id, -1)
+
+
+@receiver(post_save, sender=BlacklistedToken)
+def evict_logged_out_user(sender, instance, **kwargs):
+    # LogoutView blacklists the refresh token; drop the user so the next
+    # request re-reads them.
+    user_cache.invalidate([instance.token.user_id])
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def rebalance_assignments(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear', 'post_clear'):
+        return
+    if reverse:
+        if action != 'pre_clear':
+            sync_group_assignments([instance.pk])
+    elif action == 'pre_clear':
+        instance._cleared_group_ids = list(instance.groups.values_list('id', flat=True))
+    elif action == 'post_clear':
+        sync_group_assignments(getattr(instance, '_cleared_group_ids', []))
+    elif pk_set:
+        sync_group_assignments(pk_set)
@@ -0,0 +1,161 @@
+# review/submissions.py
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.crypto import salted_hmac
+
+from .aggregates import apply_rating_changes
+from .anonymous import insert_anonymously
+from .completion import record_finalized
+from .events import publish_submission
+from .models import PackedSubmission, Rating, ReviewAssignment, SubmissionStatus
+from .packing import pack_submission
+
+
+class SubmissionError(Exception):
+    """A submission that can't be accepted; the message is shown to the client."""
+
+
+def check_complete(review_cycle, ratings, reviewer):
+    """
+    Check that ``ratings`` cover every metric of the cycle for every member
+    of its group, before anything is written.  In cycles with
+    ``reviews_per_reviewer`` the members to rate are the reviewer and their
+    assigned peers instead.
+
+    Returns ``(usernames, metric_names)`` for ``submit_ratings``; raises
+    ``SubmissionError`` otherwise.
+    """
+    metric_names = dict(review_cycle.metrics.values_list('id', 'name'))
+    linked_metrics = set(metric_names)
+    submitted_metrics = set(item['metric'] for item in ratings)
+
+    if submitted_metrics != linked_metrics:
+        missing = linked_metrics - submitted_metrics
+        raise SubmissionError(f"Missing ratings for metrics: {list(missing)}")
+
+    members = User.objects.filter(groups=review_cycle.group)
+    if review_cycle.reviews_per_reviewer:
+        members = members.filter(Q(id=reviewer.id) | Q(id__in=ReviewAssignment.objects.filter(
+            review_cycle=review_cycle, reviewer=reviewer).values('target_user_id')))
+    usernames = dict(members.values_list('id', 'username'))
+    group_user_ids = set(usernames)
+
+    for metric_block in ratings:
+        metric_id = metric_block['metric']
+        if metric_id not in linked_metrics:
+            raise SubmissionError(f"Metric {metric_id} is not part of this review cycle.")
+
+        target_users_in_payload = set(entry['target_user'] for entry in metric_block['values'])
+        if target_users_in_payload - group_user_ids:
+            unexpected = target_users_in_payload - group_user_ids
+            raise SubmissionError(f"Users {sorted(unexpected)} are not yours to rate for metric {metric_id}")
+        if target_users_in_payload != group_user_ids:
+            missing_users = group_user_ids - target_users_in_payload
+            raise SubmissionError(f"Missing ratings for users: {list(missing_users)} for metric {metric_id}")
+
+    return usernames, metric_names
+
+
+def reviewer_token(review_cycle_id, reviewer_id, target_user_id):
+    """
+    Opaque token for a reviewer's ratings of one target in one cycle.
+
+    Keyed with ``SECRET_KEY``, so it can't be recomputed from the ids
+    alone, and different for every target, so a reviewer's ratings of
+    different peers can't be linked to each other (the one peer missing
+    from a linked set would be the reviewer).  Rotating ``SECRET_KEY``
+    only changes the tokens of later submissions.  Self ratings don't
+    carry a token at all.
+    """
+    return salted_hmac('review.rating.reviewer-token', f"{review_cycle_id}:{reviewer_id}:{target_user_id}",
+                       algorithm='sha256').hexdigest()[:32]
+
+
+def submit_ratings(review_cycle, reviewer, ratings, usernames, metric_names):
+    """
+    Persist an already validated bulk submission and finalize it.
+
+    ``usernames`` and ``metric_names`` map ids to display names for the
+    cycle's group members and linked metrics; the response rows are built
+    from them so nothing is lazily re-read per rating.  Ratings are only
+    ever appended: one ``bulk_create`` whose peer rows carry the
+    reviewer's per-target token and whose self rows are unique per
+    target, so the constraints reject a second submission by the same
+    reviewer without reading anything first.  The rows are shuffled and
+    given random ids, so neither ids nor insertion order tie them to one
+    submission.  In cycles with ``packed_ratings`` the peer ratings go
+    into one packed row per target instead, under the same tokens, and
+    the self ratings into ``Rating`` by a separate INSERT.  That reduces
+    write amplification rather than removing it: a submission still
+    writes one ``PackedSubmission`` row per target plus the self rows,
+    only no longer one row per metric.  Then come the
+    ``RatingAggregate`` maintenance, the ``SubmissionStatus`` upsert and
+    the ``CycleCompletion`` counter bump, all inside a single transaction.
+    Raises ``SubmissionError`` if the reviewer's ratings already exist.
+    """
+    incoming = {}
+    for metric_block in ratings:
+        metric_id = metric_block['metric']
+        for entry in metric_block['values']:
+            target_user_id = entry['target_user']
+            key = (target_user_id, metric_id, target_user_id == reviewer.id)
+            incoming[key] = int(entry['value'])
+
+    with transaction.atomic():
+        try:
+            if review_cycle.packed_ratings:
+                tokens = {target_user_id: reviewer_token(review_cycle.id, reviewer.id, target_user_id)
+                          for target_user_id, _, is_self_review in incoming if not is_self_review}
+                insert_anonymously(PackedSubmission, pack_submission(review_cycle, tokens, incoming))
+                insert_anonymously(Rating, [
+                    Rating(review_cycle=review_cycle, target_user_id=target_user_id, metric_id=metric_id,
+                           value=value, is_self_review=True)
+                    for (target_user_id, metric_id, is_self_review), value in incoming.items() if is_self_review
+                ])
+            else:
+                insert_anonymously(Rating, [
+                    Rating(
+                        review_cycle=review_cycle,
+                        reviewer_token=None if is_self_review else reviewer_token(
+                            review_cycle.id, reviewer.id, target_user_id),
+                        target_user_id=target_user_id,
+                        metric_id=metric_id,
+                        value=value,
+                        is_self_review=is_self_review,
+                    )
+                    for (target_user_id, metric_id, is_self_review), value in incoming.items()
+                ])
+        except IntegrityError:
+            # leaves the transaction, rolling it back
+            raise SubmissionError("You have already submitted ratings for this review cycle.")
+        apply_rating_changes(review_cycle, [(*key, value) for key, value in incoming.items()])
+
+        now = timezone.now()
+        newly_finalized = SubmissionStatus.objects.filter(
+            user=reviewer, review_cycle=review_cycle, finalized=False
+        ).update(finalized=True, finalized_at=now)
+        if not newly_finalized:
+            _, newly_finalized = SubmissionStatus.objects.get_or_create(
+                user=reviewer, review_cycle=review_cycle, defaults={"finalized": True, "finalized_at": now}
+            )
+        if newly_finalized:
+            record_finalized(review_cycle.id)
+
+        metric_ids = {metric_id for _, metric_id, _ in incoming}
+        target_count = len({target_user_id for target_user_id, _, _ in incoming})
+        transaction.on_commit(lambda: publish_submission(
+            review_cycle.id, bool(newly_finalized), metric_ids, target_count
+        ))
+
+    return [
+        {
+            "target_user": usernames[entry['target_user']],
+            "metric": metric_names[metric_block['metric']],
+            "value": entry['value'],
+            "is_self_review": entry['target_user'] == reviewer.id
+        }
+        for metric_block in ratings
+        for entry in metric_block['values']
+    ]
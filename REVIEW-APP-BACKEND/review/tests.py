@@ -1,3 +1,1553 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import json
+import os
+import tempfile
+import threading
+from datetime import date, timedelta
 
-# Create your tests here.
+from io import StringIO
+from unittest.mock import patch
+
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.hashers import check_password
+from django.contrib.auth.models import Group, User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import CommandError
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import path
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .authentication import ReviewRefreshToken, user_cache
+from .caching import check_shared_cache
+
+from .aggregates import apply_rating_changes, find_drift, rebuild_aggregates
+from .archive import ArchiveError, archive_cycle, load_archive, restore_cycle
+from .user_import import hash_passwords
+from .memberships import apply_membership_changes, membership_changed
+from .notes import SEARCH_BACKENDS, note_search_settings
+from .jobs import HANDLERS, enqueue, job_handler, report_progress, requeue_stale, run_pending
+from .events import reset_broker
+from .assignments import assign_reviewers, balanced_pairs
+from .cycles import close_review_cycle, sync_review_cycles
+from .trends import rebuild_trends
+from .packing import pack_ratings, unpack_ratings
+from .pagination import encode_cursor
+from .submissions import SubmissionError, check_complete, reviewer_token, submit_ratings
+from .routers import PrimaryPinMiddleware, ReplicaRouter, is_pinned, primary_reads, replica_reads
+from .profiling import SAMPLE_COLUMNS, SQLiteProfileStore, get_store, reset_store, summarize
+from .models import ReviewCycle, Metric, Rating, SubmissionStatus, RatingAggregate, WeaknessNote, MetricTrendPoint, Job, \
+    FrozenCycleResults, CycleCompletion, RatingDraft, RatingArchive, ReviewAssignment, PackedSubmission
+
+
+def make_cycle(group_size, metric_count=2, name="Sprint 1"):
+    group = Group.objects.create(name=f"{name} team")
+    users = [User.objects.create(username=f"{name}-user{i}") for i in range(group_size)]
+    group.user_set.set(users)
+    cycle = ReviewCycle.objects.create(
+        name=name, group=group, start_date=date(2025, 6, 1), end_date=date(2025, 6, 15)
+    )
+    metrics = [Metric.objects.create(name=f"{name} metric {i}") for i in range(metric_count)]
+    cycle.metrics.set(metrics)
+    return cycle, users, metrics
+
+
+def full_payload(users, metrics, value=4):
+    return {
+        "ratings": [
+            {"metric": m.id, "values": [{"target_user": u.id, "value": value} for u in users]}
+            for m in metrics
+        ]
+    }
+
+
+def submit(cycle, reviewer, payload):
+    client = APIClient()
+    client.force_authenticate(reviewer)
+    return client.post(f"/api/ratings/bulk-submit/{cycle.id}/", payload, format="json")
+
+
+class BulkRatingSubmitTests(TestCase):
+    def submit(self, cycle, reviewer, payload):
+        return submit(cycle, reviewer, payload)
+
+    def test_submit_creates_ratings_and_finalizes(self):
+        cycle, users, metrics = make_cycle(3)
+        response = self.submit(cycle, users[0], full_payload(users, metrics))
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data["submitted"]), 6)
+        self.assertEqual(Rating.objects.filter(review_cycle=cycle).count(), 6)
+        self.assertEqual(Rating.objects.filter(review_cycle=cycle, is_self_review=True).count(), 2)
+        row = response.data["submitted"][0]
+        self.assertEqual(row["target_user"], users[0].username)
+        self.assertEqual(row["metric"], metrics[0].name)
+        self.assertTrue(SubmissionStatus.objects.get(user=users[0], review_cycle=cycle).finalized)
+
+    def test_each_reviewer_contributes_once(self):
+        cycle, users, metrics = make_cycle(3)
+        self.submit(cycle, users[0], full_payload(users, metrics, value=2))
+        self.submit(cycle, users[1], full_payload(users, metrics, value=5))
+
+        peers = Rating.objects.filter(review_cycle=cycle, target_user=users[2], metric=metrics[0])
+        self.assertEqual(sorted(peers.values_list("value", flat=True)), [2, 5])
+        self.assertEqual(len({rating.reviewer_token for rating in peers}), 2)
+        self.assertNotEqual(reviewer_token(cycle.id, users[0].id, users[2].id),
+                            reviewer_token(cycle.id + 1, users[0].id, users[2].id))
+        # a self rating's target is its reviewer, so it must not carry the token
+        self.assertFalse(Rating.objects.filter(is_self_review=True).exclude(reviewer_token=None).exists())
+
+        # the constraint, not a pre-read, rejects a second contribution
+        ratings = full_payload(users, metrics, value=1)["ratings"]
+        with self.assertRaises(SubmissionError):
+            submit_ratings(cycle, users[0], ratings, *check_complete(cycle, ratings, users[0]))
+        self.assertEqual(Rating.objects.filter(review_cycle=cycle).count(), 12)
+
+    def test_reviewer_cannot_be_recovered_from_ratings(self):
+        cycle, users, metrics = make_cycle(4)
+        for reviewer in users:
+            self.submit(cycle, reviewer, full_payload(users, metrics))
+
+        rows = list(Rating.objects.filter(review_cycle=cycle).order_by("id").values_list(
+            "id", "reviewer_token", "target_user_id"))
+        # a token never spans targets, so no set of peer ratings leaves out its author
+        targets_by_token = {}
+        for _, token, target_user_id in rows:
+            if token is not None:
+                targets_by_token.setdefault(token, set()).add(target_user_id)
+        self.assertEqual(len(targets_by_token), 4 * 3)
+        self.assertTrue(all(len(targets) == 1 for targets in targets_by_token.values()))
+        # ids are not handed out in runs per submission
+        ids = [rating_id for rating_id, _, _ in rows]
+        self.assertGreater(max(b - a for a, b in zip(ids, ids[1:])), len(ids))
+        self.assertTrue(all(rating_id >= 2 ** 32 for rating_id in ids))
+
+    def test_incomplete_payload_writes_nothing(self):
+        cycle, users, metrics = make_cycle(3)
+        payload = full_payload(users, metrics)
+        payload["ratings"][1]["values"].pop()
+
+        response = self.submit(cycle, users[0], payload)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Rating.objects.exists())
+        self.assertFalse(SubmissionStatus.objects.exists())
+
+    def test_query_count_does_not_grow_with_group_size(self):
+        counts = []
+        for size, name in ((2, "Small"), (12, "Large")):
+            cycle, users, metrics = make_cycle(size, metric_count=4, name=name)
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.submit(cycle, users[0], full_payload(users, metrics))
+            self.assertEqual(response.status_code, 201)
+            counts.append(len(ctx.captured_queries))
+
+        self.assertEqual(counts[0], counts[1])
+
+
+class ReviewAssignmentTests(TestCase):
+    def test_pairs_are_balanced_and_deterministic(self):
+        pairs = balanced_pairs(range(1, 11), 3, seed=7)
+
+        self.assertEqual(pairs, balanced_pairs(range(1, 11), 3, seed=7))
+        self.assertNotEqual(pairs, balanced_pairs(range(1, 11), 3, seed=8))
+        self.assertEqual(len(set(pairs)), 30)
+        self.assertFalse(any(reviewer == target for reviewer, target in pairs))
+        for user_id in range(1, 11):
+            self.assertEqual(sum(reviewer == user_id for reviewer, _ in pairs), 3)
+            self.assertEqual(sum(target == user_id for _, target in pairs), 3)
+        self.assertEqual(len(balanced_pairs([1, 2, 3], 5, seed=1)), 6)
+
+    def test_submit_checks_assigned_targets(self):
+        group = Group.objects.create(name="Assigned team")
+        users = [User.objects.create(username=f"assigned{i}") for i in range(6)]
+        group.user_set.set(users)
+        metric = Metric.objects.create(name="Assigned metric")
+        admin = User.objects.create(username="admin", is_staff=True)
+        client = APIClient()
+        client.force_authenticate(admin)
+        response = client.post("/api/review-cycle/create/", {
+            "name": "Assigned", "group_id": group.id, "start_date": "2025-06-01", "end_date": "2025-06-15",
+            "metric_ids": [metric.id], "reviews_per_reviewer": 2, "assignment_seed": 42,
+        }, format="json")
+        cycle = ReviewCycle.objects.get(id=response.data["id"])
+        self.assertEqual(ReviewAssignment.objects.filter(review_cycle=cycle).count(), 12)
+
+        reviewer = users[0]
+        targets = [reviewer.id, *ReviewAssignment.objects.filter(review_cycle=cycle, reviewer=reviewer)
+                   .values_list("target_user_id", flat=True)]
+        everyone = {"ratings": [{"metric": metric.id, "values": [{"target_user": u.id, "value": 3} for u in users]}]}
+        self.assertEqual(submit(cycle, reviewer, everyone).status_code, 400)
+        assigned = {"ratings": [{"metric": metric.id, "values": [{"target_user": t, "value": 3} for t in targets]}]}
+        self.assertEqual(submit(cycle, reviewer, assigned).status_code, 201)
+        self.assertEqual(Rating.objects.filter(review_cycle=cycle).count(), 3)
+
+        client.force_authenticate(users[1])
+        response = client.get(f"/api/review-cycle/participants/{cycle.id}/")
+        self.assertEqual(len(response.data["participants"]), 3)
+
+    def test_membership_changes_after_creation_refill_assignments(self):
+        cycle, users, metrics = make_cycle(6, metric_count=1)
+        cycle.reviews_per_reviewer = 2
+        cycle.save()
+        assign_reviewers(cycle, seed=3)
+        pairs = lambda: set(ReviewAssignment.objects.filter(review_cycle=cycle).values_list(  # noqa: E731
+            "reviewer_id", "target_user_id"))
+        finalized = {(r, t) for r, t in pairs() if r == users[0].id}
+        targets = [users[0].id, *(t for _, t in finalized)]
+        submit(cycle, users[0], {"ratings": [{"metric": metrics[0].id, "values": [
+            {"target_user": t, "value": 3} for t in targets]}]})
+        leaver = users[5] if users[5].id not in targets else users[4]
+        newcomers = [User.objects.create(username=f"newcomer{i}") for i in range(2)]
+
+        cycle.group.user_set.add(newcomers[0])
+        with self.captureOnCommitCallbacks(execute=True):
+            apply_membership_changes([{"group_id": cycle.group.id, "add": [newcomers[1].id],
+                                       "remove": [leaver.id]}])
+
+        after = pairs()
+        members = [u.id for u in users + newcomers if u != leaver]
+        self.assertFalse(any(leaver.id in pair for pair in after))
+        self.assertEqual({(r, t) for r, t in after if r == users[0].id}, finalized)
+        for member in members:
+            self.assertGreaterEqual(sum(t == member for _, t in after), 2)
+            if member != users[0].id:
+                # newcomers' missing reviewers can push a few members to one extra target
+                self.assertIn(sum(r == member for r, _ in after), (2, 3))
+
+        client = APIClient()
+        client.force_authenticate(newcomers[1])
+        response = client.get(f"/api/review-cycle/participants/{cycle.id}/")
+        self.assertEqual(len(response.data["participants"]), 3)
+        reviewer = next(User.objects.get(id=r) for r, t in after if t == newcomers[1].id)
+        own = [reviewer.id, *(t for r, t in after if r == reviewer.id)]
+        response = submit(cycle, reviewer, {"ratings": [{"metric": metrics[0].id, "values": [
+            {"target_user": t, "value": 4} for t in own]}]})
+        self.assertEqual(response.status_code, 201)
+
+
+class RatingDraftTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.cycle, self.users, self.metrics = make_cycle(3)
+        self.client = APIClient()
+        self.client.force_authenticate(self.users[0])
+        self.url = f"/api/ratings/draft/{self.cycle.id}/"
+
+    def cell(self, user, metric, value):
+        return {"target_user": user.id, "metric": metric.id, "value": value}
+
+    def test_single_cell_autosave_is_one_upsert(self):
+        self.client.get(self.url)  # warms the cycle snapshot
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.patch(self.url, self.cell(self.users[1], self.metrics[0], 3), format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {"saved": 1, "cleared": 0})
+        writes = [q for q in ctx.captured_queries if not q["sql"].startswith(("SELECT", "SAVEPOINT", "RELEASE"))]
+        self.assertEqual(len(writes), 1)
+
+        self.client.patch(self.url, self.cell(self.users[1], self.metrics[0], 5), format="json")
+        self.assertEqual(RatingDraft.objects.get().value, 5)
+
+    def test_retry_with_idempotency_key_is_replayed(self):
+        changes = {"changes": [self.cell(self.users[1], self.metrics[0], 3)]}
+        first = self.client.patch(self.url, changes, format="json", HTTP_IDEMPOTENCY_KEY="abc")
+        RatingDraft.objects.all().delete()
+        retry = self.client.patch(self.url, changes, format="json", HTTP_IDEMPOTENCY_KEY="abc")
+
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertFalse(RatingDraft.objects.exists())
+
+    def test_null_value_clears_cell_and_foreign_cells_are_rejected(self):
+        self.client.patch(self.url, {"changes": [self.cell(u, self.metrics[0], 4) for u in self.users]}, format="json")
+        response = self.client.patch(self.url, self.cell(self.users[2], self.metrics[0], None), format="json")
+        self.assertEqual(response.data, {"saved": 0, "cleared": 1})
+        self.assertEqual(RatingDraft.objects.count(), 2)
+
+        _, outsiders, other_metrics = make_cycle(1, metric_count=1, name="Other")
+        response = self.client.patch(self.url, self.cell(outsiders[0], other_metrics[0], 4), format="json")
+        self.assertEqual(response.status_code, 400)
+
+    def test_finalize_promotes_complete_draft(self):
+        changes = [self.cell(u, m, 4) for m in self.metrics for u in self.users]
+        self.client.patch(self.url, {"changes": changes[:-1]}, format="json")
+        response = self.client.post(self.url + "finalize/")
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Rating.objects.exists())
+
+        self.client.patch(self.url, changes[-1], format="json")
+        response = self.client.post(self.url + "finalize/")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Rating.objects.filter(review_cycle=self.cycle).count(), 6)
+        self.assertFalse(RatingDraft.objects.exists())
+        self.assertTrue(SubmissionStatus.objects.get(user=self.users[0], review_cycle=self.cycle).finalized)
+        self.assertEqual(self.client.patch(self.url, changes[0], format="json").status_code, 400)
+
+
+class RatingAggregateTests(TestCase):
+    def test_submit_maintains_aggregates(self):
+        cycle, users, metrics = make_cycle(3)
+        submit(cycle, users[0], full_payload(users, metrics, value=2))
+        submit(cycle, users[1], full_payload(users, metrics, value=5))
+
+        peer = RatingAggregate.objects.get(
+            review_cycle=cycle, target_user=users[2], metric=metrics[0], is_self_review=False
+        )
+        self.assertEqual((peer.count, peer.total, peer.min_value, peer.max_value), (2, 7, 2, 5))
+        self.assertEqual(RatingAggregate.objects.filter(review_cycle=cycle).count(), 10)
+        call_command("rebuild_rating_aggregates", "--check", stdout=StringIO())
+
+    def test_rows_created_concurrently_are_folded_into(self):
+        cycle, users, metrics = make_cycle(3)
+        # the empty row another submission creates before writing its totals
+        RatingAggregate.objects.create(review_cycle=cycle, target_user=users[2], metric=metrics[0])
+        apply_rating_changes(cycle, [(users[2].id, metrics[0].id, False, 4)])
+        apply_rating_changes(cycle, [(users[2].id, metrics[0].id, False, 1), (users[2].id, metrics[1].id, False, 3)])
+
+        peer = RatingAggregate.objects.get(review_cycle=cycle, target_user=users[2], metric=metrics[0])
+        self.assertEqual((peer.count, peer.total, peer.total_squares, peer.min_value, peer.max_value),
+                         (2, 5, 17, 1, 4))
+        self.assertEqual(RatingAggregate.objects.filter(review_cycle=cycle).count(), 2)
+
+    def test_results_endpoint_reads_aggregates(self):
+        cycle, users, metrics = make_cycle(2)
+        submit(cycle, users[0], full_payload(users, metrics, value=3))
+        admin = User.objects.create(username="admin", is_staff=True)
+        client = APIClient()
+        client.force_authenticate(admin)
+
+        with self.assertNumQueries(2):
+            response = client.get(f"/api/review-cycle/{cycle.id}/results/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), 4)
+        own = next(r for r in response.data["results"] if r["target_user"] == users[0].id)
+        self.assertEqual(own["self"]["mean"], 3)
+        self.assertIsNone(own["peer"])
+
+    def test_rebuild_command_repairs_drift(self):
+        cycle, users, metrics = make_cycle(2)
+        submit(cycle, users[0], full_payload(users, metrics, value=3))
+        RatingAggregate.objects.filter(review_cycle=cycle).update(total=99)
+
+        with self.assertRaises(CommandError):
+            call_command("rebuild_rating_aggregates", "--check", stdout=StringIO())
+        call_command("rebuild_rating_aggregates", stdout=StringIO())
+        call_command("rebuild_rating_aggregates", "--check", stdout=StringIO())
+
+
+class CycleReportTests(TestCase):
+    def setUp(self):
+        self.cycle, self.users, self.metrics = make_cycle(3)
+        u0, u1, _ = self.users
+        m0, m1 = self.metrics
+        Rating.objects.bulk_create([
+            Rating(review_cycle=self.cycle, target_user=target, metric=metric, value=value, is_self_review=is_self)
+            for target, metric, value, is_self in [
+                (u0, m0, 2, False), (u0, m0, 4, False), (u0, m1, 5, False), (u0, m0, 5, True),
+                (u1, m0, 4, False), (u1, m1, 4, False),
+            ]
+        ])
+        rebuild_aggregates([self.cycle.id])
+        self.client = APIClient()
+
+    def test_report_statistics(self):
+        self.client.force_authenticate(User.objects.create(username="admin", is_staff=True))
+        with self.assertNumQueries(4):
+            response = self.client.get(f"/api/review-cycle/{self.cycle.id}/report/")
+
+        u0, u1, u2 = response.data["users"]
+        self.assertEqual((u0["peer_mean"], u0["peer_median"], u0["peer_stddev"]), (4.0, 4.0, 1.0))
+        self.assertEqual((u0["self_mean"], u0["gap"], u0["percentile"]), (5.0, 2.0, 50.0))
+        self.assertEqual((u1["peer_stddev"], u1["self_mean"], u1["percentile"]), (0.0, None, 50.0))
+        self.assertEqual((u2["peer_mean"], u2["percentile"], u2["metrics_rated"]), (None, None, 0))
+        metric = response.data["metrics"][0]
+        self.assertEqual((metric["peer_mean"], metric["min"], metric["max"], metric["rated_users"]),
+                         (3.5, 3.0, 4.0, 2))
+
+    def test_user_report_is_limited_to_self_and_staff(self):
+        self.client.force_authenticate(self.users[0])
+        response = self.client.get(f"/api/review-cycle/{self.cycle.id}/report/{self.users[0].id}/")
+        self.assertEqual(response.status_code, 200)
+        metric = response.data["metrics"][0]
+        self.assertEqual((metric["self"], metric["peer"], metric["gap"], metric["peer_count"]), (5.0, 3.0, 2.0, 2))
+        self.assertEqual((metric["group_peer_mean"], metric["percentile"]), (3.5, 25.0))
+
+        response = self.client.get(f"/api/review-cycle/{self.cycle.id}/report/{self.users[1].id}/")
+        self.assertEqual(response.status_code, 403)
+
+        self.client.force_authenticate(User.objects.create(username="admin", is_staff=True))
+        response = self.client.get(f"/api/review-cycle/{self.cycle.id}/report/9999/")
+        self.assertEqual(response.status_code, 404)
+
+
+class MetricTrendTests(TestCase):
+    def setUp(self):
+        first, self.users, self.metrics = make_cycle(3)
+        self.group = first.group
+        self.cycles = [first] + [
+            ReviewCycle.objects.create(name=f"Sprint {n}", group=self.group,
+                                       start_date=date(2025, n + 5, 1), end_date=date(2025, n + 5, 15))
+            for n in (2, 3)
+        ]
+        self.admin = User.objects.create(username="admin", is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        for cycle, value in zip(self.cycles, (2, 4, 5)):
+            cycle.metrics.set(self.metrics)
+            submit(cycle, self.users[0], full_payload(self.users, self.metrics, value=value))
+            response = self.client.post(f"/api/review-cycle/{cycle.id}/close/")
+            self.assertEqual(response.status_code, 200)
+
+    def test_close_appends_rollup_once(self):
+        cycle = self.cycles[0]
+        cycle.refresh_from_db()
+        self.assertFalse(cycle.is_active)
+        self.assertIsNotNone(cycle.closed_at)
+        # 3 users x 2 metrics plus one group row per metric
+        self.assertEqual(MetricTrendPoint.objects.filter(review_cycle=cycle).count(), 8)
+        response = self.client.post(f"/api/review-cycle/{cycle.id}/close/")
+        self.assertEqual(response.status_code, 409)
+
+    def test_user_trend_moving_average_and_delta(self):
+        url = f"/api/trends/users/{self.users[1].id}/"
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {"window": 2, "metric": self.metrics[0].id})
+
+        (series,) = response.data["metrics"]
+        points = series["points"]
+        self.assertEqual([p["peer_mean"] for p in points], [2, 4, 5])
+        self.assertEqual([p["moving_average"] for p in points], [2, 3, 4.5])
+        self.assertEqual([p["delta"] for p in points], [None, 2, 1])
+
+        response = self.client.get(url, {"last": 2})
+        self.assertEqual([p["cycle_id"] for p in response.data["metrics"][0]["points"]],
+                         [c.id for c in self.cycles[1:]])
+
+        self.client.force_authenticate(self.users[2])
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+    def test_group_trend_reads_group_rows(self):
+        response = self.client.get(f"/api/trends/groups/{self.group.id}/", {"start": "2025-06-16"})
+
+        self.assertEqual(len(response.data["metrics"]), 2)
+        points = response.data["metrics"][0]["points"]
+        self.assertEqual([p["cycle_id"] for p in points], [c.id for c in self.cycles[1:]])
+        self.assertEqual([(p["peer_count"], p["peer_mean"], p["self_mean"]) for p in points], [(2, 4, 4), (2, 5, 5)])
+
+        MetricTrendPoint.objects.all().delete()
+        call_command("rebuild_metric_trends", stdout=StringIO())
+        self.assertEqual(MetricTrendPoint.objects.count(), 24)
+
+
+class ReviewCycleSchedulingTests(TestCase):
+    def setUp(self):
+        self.ended, users, metrics = make_cycle(2, name="Ended")
+        submit(self.ended, users[0], full_payload(users, metrics, value=3))
+        self.current = ReviewCycle.objects.create(name="Current", group=self.ended.group, is_active=False,
+                                                  start_date=date(2025, 6, 16), end_date=date(2025, 6, 30))
+        self.upcoming = ReviewCycle.objects.create(name="Upcoming", group=self.ended.group,
+                                                   start_date=date(2025, 7, 1), end_date=date(2025, 7, 15))
+
+    def test_sync_activates_and_closes_by_date(self):
+        out = StringIO()
+        call_command("sync_review_cycles", "--date", "2025-06-20", stdout=out)
+        self.assertIn("Activated 1, deferred 1 and closed 1", out.getvalue())
+
+        states = dict(ReviewCycle.objects.values_list('id', 'is_active'))
+        self.assertEqual(states, {self.ended.id: False, self.current.id: True, self.upcoming.id: False})
+        self.ended.refresh_from_db()
+        self.assertIsNotNone(self.ended.closed_at)
+        self.assertTrue(MetricTrendPoint.objects.filter(review_cycle=self.ended).exists())
+
+        # a second run has nothing left to do
+        call_command("sync_review_cycles", "--date", "2025-06-20", stdout=out)
+        self.assertIn("Activated 0, deferred 0 and closed 0", out.getvalue())
+
+    def test_failed_close_is_retried_and_manual_deactivation_sticks(self):
+        self.current.is_active = True
+        self.current.save()
+        self.current.is_active = False  # paused by an admin within its dates
+        self.current.save()
+
+        with patch("review.cycles.rollup_cycle", side_effect=RuntimeError("rollup failed")), \
+                self.assertLogs("review.cycles", "ERROR"):
+            changes = sync_review_cycles(date(2025, 6, 20))
+        self.assertEqual((changes["activated"], changes["closed"]), ([], []))
+        self.ended.refresh_from_db()
+        self.assertIsNone(self.ended.closed_at)
+
+        self.assertEqual(sync_review_cycles(date(2025, 6, 20))["closed"], [self.ended.id])
+        self.assertTrue(FrozenCycleResults.objects.filter(review_cycle=self.ended).exists())
+        self.current.refresh_from_db()
+        self.assertFalse(self.current.is_active)
+
+    def test_deferred_cycle_is_not_closed(self):
+        # inactive because it has not started yet, which is not the same as closed
+        with self.assertRaises(ArchiveError):
+            archive_cycle(self.current)
+        self.assertEqual(rebuild_trends([self.current.id]), 0)
+
+        client = APIClient()
+        client.force_authenticate(User.objects.create(username="admin", is_staff=True))
+        self.assertEqual(client.post(f"/api/review-cycle/{self.current.id}/close/").status_code, 200)
+        self.assertEqual(client.post(f"/api/review-cycle/{self.current.id}/close/").status_code, 409)
+
+    def test_closed_cycle_reads_frozen_results(self):
+        call_command("sync_review_cycles", "--date", "2025-06-20", stdout=StringIO())
+        self.assertTrue(FrozenCycleResults.objects.filter(review_cycle=self.ended).exists())
+        Rating.objects.all().delete()
+        RatingAggregate.objects.all().delete()
+
+        admin = User.objects.create(username="admin", is_staff=True)
+        client = APIClient()
+        client.force_authenticate(admin)
+        with self.assertNumQueries(1):
+            response = client.get(f"/api/review-cycle/{self.ended.id}/results/")
+        self.assertEqual(len(response.data["results"]), 4)
+        with self.assertNumQueries(1):
+            response = client.get(f"/api/review-cycle/{self.ended.id}/report/")
+        self.assertEqual(response.data["users"][1]["peer_mean"], 3.0)
+        response = self.client.get(f"/api/async/review-cycle/{self.ended.id}/results/",
+                                   HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(admin)}")
+        self.assertEqual(len(response.json()["results"]), 4)
+
+
+class CycleCompletionTests(TestCase):
+    def setUp(self):
+        self.cycle, self.users, self.metrics = make_cycle(3)
+        self.other, _, _ = make_cycle(2, name="Other")
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username="admin", is_staff=True))
+
+    def counters(self, cycle):
+        completion = CycleCompletion.objects.get(review_cycle=cycle)
+        return completion.participant_count, completion.finalized_count
+
+    def test_dashboard_reads_counters_in_one_query(self):
+        submit(self.cycle, self.users[0], full_payload(self.users, self.metrics))
+
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/review-cycle/completion/")
+
+        cycles = {row["cycle_id"]: row for row in response.data["cycles"]}
+        self.assertEqual((cycles[self.cycle.id]["finalized"], cycles[self.cycle.id]["percentage"]), (1, 33.3))
+        self.assertEqual(cycles[self.other.id]["percentage"], 0.0)
+        self.assertEqual([g["participants"] for g in response.data["groups"]], [3, 2])
+
+        response = self.client.get(f"/api/review-cycle/{self.cycle.id}/completion/")
+        self.assertEqual([u["id"] for u in response.data["pending_users"]], [u.id for u in self.users[1:]])
+
+    def test_counters_follow_memberships_and_submissions(self):
+        newcomer = User.objects.create(username="newcomer")
+        self.cycle.group.user_set.add(newcomer)
+        self.assertEqual(self.counters(self.cycle), (4, 0))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f"/api/groups/{self.cycle.group.id}/users/", {"remove": [newcomer.id]}, format="json")
+        self.assertEqual(self.counters(self.cycle), (3, 0))
+
+        submit(self.cycle, self.users[0], full_payload(self.users, self.metrics))
+        submit(self.cycle, self.users[0], full_payload(self.users, self.metrics))  # rejected, no double count
+        self.assertEqual(self.counters(self.cycle), (3, 1))
+        SubmissionStatus.objects.filter(review_cycle=self.cycle).delete()
+        self.assertEqual(self.counters(self.cycle), (3, 0))
+
+        CycleCompletion.objects.all().delete()
+        call_command("rebuild_cycle_completion", stdout=StringIO())
+        self.assertEqual(self.counters(self.other), (2, 0))
+
+
+class ReviewCycleExportTests(TestCase):
+    def setUp(self):
+        self.cycle, self.users, self.metrics = make_cycle(2)
+        submit(self.cycle, self.users[0], full_payload(self.users, self.metrics, value=4))
+        WeaknessNote.objects.create(review_cycle=self.cycle, target_user=self.users[1], note="Needs more tests")
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username="admin", is_staff=True))
+
+    def export(self, **params):
+        response = self.client.get(f"/api/review-cycle/{self.cycle.id}/export/", params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content)
+
+    def test_csv_export_joins_names(self):
+        lines = self.export().decode().splitlines()
+
+        self.assertEqual(lines[0], "id,target_user_id,target_user,metric_id,metric,value,is_self_review")
+        self.assertEqual(len(lines), 5)
+        # rating ids are random, so rows come in no particular order
+        expected = f",{self.users[1].username},{self.metrics[0].id},{self.metrics[0].name},4,False"
+        self.assertTrue(any(line.endswith(expected) for line in lines[1:]))
+
+    def test_ndjson_notes_export(self):
+        rows = [json.loads(line) for line in self.export(kind="notes", output="ndjson").decode().splitlines()]
+
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["target_user"], self.users[1].username)
+        self.assertEqual(rows[0]["note"], "Needs more tests")
+
+    def test_gzip_export(self):
+        body = gzip.decompress(self.export(output="ndjson", gzip="1")).decode()
+
+        self.assertEqual(len(body.splitlines()), 4)
+
+    def test_invalid_output(self):
+        response = self.client.get(f"/api/review-cycle/{self.cycle.id}/export/", {"output": "xml"})
+
+        self.assertEqual(response.status_code, 400)
+
+
+class WeaknessNoteSearchTests(TestCase):
+    def setUp(self):
+        self.cycle, self.users, _ = make_cycle(3)
+        self.other_cycle, self.other_users, _ = make_cycle(2, name="Sprint 2")
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username="admin", is_staff=True))
+
+    def leave_notes(self, cycle, reviewer, notes):
+        client = APIClient()
+        client.force_authenticate(reviewer)
+        return client.post(f"/api/review-cycle/{cycle.id}/notes/", {"notes": notes}, format="json")
+
+    def search(self, **params):
+        response = self.client.get("/api/notes/search/", params)
+        self.assertEqual(response.status_code, 200)
+        return response.data["results"]
+
+    def test_notes_are_only_left_on_peers(self):
+        response = self.leave_notes(self.cycle, self.users[0], [
+            {"target_user": self.users[1].id, "note": "Could write more tests"},
+            {"target_user": self.other_users[0].id, "note": "Not in this group"},
+        ])
+        self.assertEqual(response.status_code, 400)
+        response = self.leave_notes(self.cycle, self.users[0], [{"target_user": self.users[0].id, "note": "Me"}])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(WeaknessNote.objects.exists())
+
+        response = self.leave_notes(self.cycle, self.users[0], [
+            {"target_user": self.users[1].id, "note": "Tests"},
+            {"target_user": self.users[2].id, "note": "Docs"},
+        ])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["submitted"], [{"target_user": self.users[1].username, "note": "Tests"},
+                                                      {"target_user": self.users[2].username, "note": "Docs"}])
+        # a batch is neither a run of ids nor dated in search results
+        ids = sorted(WeaknessNote.objects.values_list("id", flat=True))
+        self.assertTrue(ids[0] >= 2 ** 32 and ids[1] - ids[0] > 1)
+        self.assertNotIn("created_at", self.search(q="tests")[0])
+
+    def test_ranked_stemmed_search_with_snippets(self):
+        self.leave_notes(self.cycle, self.users[0], [
+            {"target_user": self.users[1].id, "note": "Communication in standups could be clearer"},
+            {"target_user": self.users[2].id, "note": "Rarely writes tests; testing is an afterthought"},
+        ])
+        self.leave_notes(self.other_cycle, self.other_users[0], [
+            {"target_user": self.other_users[1].id, "note": "Tested code but forgot the docs"},
+        ])
+
+        results = self.search(q="tests")
+        self.assertEqual([r["target_user"] for r in results], [self.users[2].id, self.other_users[1].id])
+        self.assertIn("<mark>tests</mark>", results[0]["snippet"])
+        self.assertGreater(results[0]["rank"], results[1]["rank"])
+
+        self.assertEqual(len(self.search(q="test", cycle=self.cycle.id)), 1)
+        self.assertEqual(len(self.search(q="test", group=self.other_cycle.group_id)), 1)
+        if connection.vendor == "sqlite":
+            # PostgreSQL's websearch syntax has no prefix queries
+            self.assertEqual(len(self.search(q="stand*", target_user=self.users[1].id)), 1)
+        self.assertEqual(self.search(q='"standups could"')[0]["target_user"], self.users[1].id)
+        # index syntax in user input is dropped, not passed through
+        self.assertEqual(len(self.search(q='tests: ( ^"')), 2)
+
+    def test_snippets_escape_note_text(self):
+        self.leave_notes(self.cycle, self.users[0], [
+            {"target_user": self.users[1].id, "note": "Tests <script>alert(1)</script> \x02rarely\x03"},
+        ])
+        expected = "<mark>Tests</mark> &lt;script&gt;alert(1)&lt;/script&gt; rarely"
+
+        self.assertEqual(self.search(q="tests")[0]["snippet"], expected)
+        # backends without an index scan instead, and escape the same way
+        with patch.dict(SEARCH_BACKENDS, clear=True):
+            self.assertEqual(self.search(q="script")[0]["snippet"], expected.replace("<mark>Tests</mark>", "Tests"))
+
+    def test_scan_fallback_ranks_matches(self):
+        self.leave_notes(self.cycle, self.users[0], [
+            {"target_user": self.users[1].id, "note": "Misses tests now and then, otherwise solid work"},
+            {"target_user": self.users[2].id, "note": "No tests, no tests, no tests"},
+        ])
+
+        with patch.dict(SEARCH_BACKENDS, clear=True):
+            results = self.search(q="tests")
+        self.assertEqual([r["target_user"] for r in results], [self.users[2].id, self.users[1].id])
+        self.assertGreater(results[0]["rank"], results[1]["rank"])
+
+    def test_postgres_query_and_headline_options(self):
+        config = {**note_search_settings(), "SNIPPET_WORDS": 9}
+        sql, params = SEARCH_BACKENDS["postgresql"]([("code review", False), ("tests", True)],
+                                                    "AND n.review_cycle_id = %s", [7], 5, config)
+
+        self.assertIn("websearch_to_tsquery(%s::regconfig, %s)", sql)
+        self.assertIn("ts_rank_cd(n.search_vector, q)", sql)
+        self.assertNotIn("created_at", sql)
+        self.assertEqual(sql.count("%s"), len(params))
+        self.assertEqual(params[2:], ["english", '"code review" tests', 7, 5])
+        self.assertIn('StartSel="\x02", StopSel="\x03"', params[1])
+        self.assertIn("MaxWords=9, MinWords=3", params[1])
+
+    def test_index_follows_updates_and_deletes(self):
+        note = WeaknessNote.objects.create(review_cycle=self.cycle, target_user=self.users[1], note="Late to meetings")
+        self.assertEqual(len(self.search(q="meetings")), 1)
+
+        WeaknessNote.objects.filter(id=note.id).update(note="Late with reviews")
+        self.assertEqual(self.search(q="meetings"), [])
+        self.assertEqual(len(self.search(q="reviews")), 1)
+
+        self.users[1].delete()
+        self.assertEqual(self.search(q="reviews"), [])
+
+    def test_search_is_staff_only(self):
+        client = APIClient()
+        client.force_authenticate(self.users[0])
+        self.assertEqual(client.get("/api/notes/search/", {"q": "tests"}).status_code, 403)
+        self.assertEqual(self.client.get("/api/notes/search/").status_code, 400)
+
+
+class RatingArchiveTests(TestCase):
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        overridden = self.settings(REVIEW_ARCHIVE={"ROOT": root.name, "PURGE": False})
+        overridden.enable()
+        self.addCleanup(overridden.disable)
+
+        self.cycle, self.users, self.metrics = make_cycle(3)
+        for i, reviewer in enumerate(self.users):
+            submit(self.cycle, reviewer, full_payload(self.users, self.metrics, value=i + 2))
+        close_review_cycle(self.cycle)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username="admin", is_staff=True))
+
+    def export(self):
+        response = self.client.get(f"/api/review-cycle/{self.cycle.id}/export/")
+        return b"".join(response.streaming_content)
+
+    def test_purged_cycle_reads_from_memory_mapped_archive(self):
+        before = self.export()
+        archive = archive_cycle(self.cycle, purge=True)
+
+        self.assertEqual(archive.row_count, 18)
+        self.assertFalse(Rating.objects.filter(review_cycle=self.cycle).exists())
+        columns = load_archive(archive)
+        self.assertIsInstance(columns["value"], np.memmap)
+        self.assertEqual(columns["value"].dtype, np.int8)
+        self.assertEqual(self.export(), before)
+
+        # aggregates rebuilt from the archive match the ones kept on submit
+        self.assertEqual(find_drift([self.cycle.id]), [])
+        rebuild_aggregates([self.cycle.id])
+        self.assertEqual(find_drift([self.cycle.id]), [])
+
+    def test_restore_writes_rows_back(self):
+        before = sorted(Rating.objects.filter(review_cycle=self.cycle).values_list(
+            'id', 'target_user_id', 'metric_id', 'value', 'is_self_review', 'reviewer_token'))
+        response = self.client.post(f"/api/review-cycle/{self.cycle.id}/archive/?purge=true")
+        self.assertEqual(response.data["purged"], True)
+        self.assertEqual(self.client.post(f"/api/review-cycle/{self.cycle.id}/archive/").status_code, 409)
+
+        response = self.client.delete(f"/api/review-cycle/{self.cycle.id}/archive/")
+        self.assertEqual(response.data["rows"], 18)
+        after = sorted(Rating.objects.filter(review_cycle=self.cycle).values_list(
+            'id', 'target_user_id', 'metric_id', 'value', 'is_self_review', 'reviewer_token'))
+        self.assertEqual(after, before)
+        self.assertFalse(RatingArchive.objects.get().purged)
+
+    def test_active_cycle_is_not_archived(self):
+        cycle, _, _ = make_cycle(2, name="Open")
+        with self.assertRaises(ArchiveError):
+            archive_cycle(cycle)
+        self.assertEqual(restore_cycle(cycle), 0)
+
+
+class PackedSubmissionTests(TestCase):
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        overridden = self.settings(REVIEW_ARCHIVE={"ROOT": root.name, "PURGE": False})
+        overridden.enable()
+        self.addCleanup(overridden.disable)
+
+        self.cycle, self.users, self.metrics = make_cycle(3)
+        self.cycle.packed_ratings = True
+        self.cycle.save()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username="admin", is_staff=True))
+
+    def submit_all(self):
+        for i, reviewer in enumerate(self.users):
+            self.assertEqual(submit(self.cycle, reviewer, full_payload(self.users, self.metrics, value=i + 2))
+                             .status_code, 201)
+
+    def export(self):
+        response = self.client.get(f"/api/review-cycle/{self.cycle.id}/export/")
+        return b"".join(response.streaming_content)
+
+    def test_peer_ratings_are_one_insert_of_per_target_rows(self):
+        with CaptureQueriesContext(connection) as queries:
+            submit(self.cycle, self.users[0], full_payload(self.users, self.metrics))
+        inserts = [q for q in queries.captured_queries
+                   if q["sql"].startswith("INSERT") and "review_packedsubmission" in q["sql"]]
+        self.assertEqual(len(inserts), 1)
+
+        rows = list(PackedSubmission.objects.all())
+        self.assertEqual(sorted(row.target_user_id for row in rows), [self.users[1].id, self.users[2].id])
+        self.assertEqual({row.rating_count for row in rows}, {2})
+        self.assertEqual(len({row.reviewer_token for row in rows}), 2)
+        self.assertTrue(all(row.id >= 2 ** 32 for row in rows))
+        metrics, values = unpack_ratings(rows[0].data)
+        self.assertEqual(metrics.tolist(), sorted(metric.id for metric in self.metrics))
+        self.assertEqual(values.tolist(), [4, 4])
+        # self ratings name their reviewer, so they stay out of the packed rows
+        self.assertEqual(Rating.objects.filter(is_self_review=True, reviewer_token=None).count(), 2)
+        self.assertFalse(Rating.objects.filter(is_self_review=False).exists())
+
+        response = submit(self.cycle, self.users[0], full_payload(self.users, self.metrics))
+        self.assertEqual(response.status_code, 400)
+        SubmissionStatus.objects.all().delete()
+        ratings = full_payload(self.users, self.metrics)["ratings"]
+        with self.assertRaises(SubmissionError):
+            submit_ratings(self.cycle, self.users[0], ratings, *check_complete(self.cycle, ratings, self.users[0]))
+
+    def test_pack_narrows_each_array(self):
+        data = pack_ratings([(70000, 5), (300, -1)])
+        metrics, values = unpack_ratings(memoryview(data))
+
+        self.assertEqual(len(data), 12 + 2 * (4 + 1))
+        self.assertEqual(metrics.tolist(), [300, 70000])
+        self.assertEqual(values.tolist(), [-1, 5])
+
+    def test_aggregates_and_export_decode_packed_rows(self):
+        self.submit_all()
+
+        peer = RatingAggregate.objects.get(review_cycle=self.cycle, target_user=self.users[0],
+                                           metric=self.metrics[0], is_self_review=False)
+        self.assertEqual((peer.count, peer.total, peer.min_value, peer.max_value), (2, 7, 3, 4))
+        self.assertEqual(find_drift([self.cycle.id]), [])
+        lines = self.export().decode().splitlines()
+        self.assertEqual(len(lines), 19)
+        # self ratings are Rating rows with an id; packed peer ratings have none
+        self.assertEqual(sum(line.startswith(",") for line in lines[1:]), 12)
+        self.assertIn(f",{self.users[1].id},{self.users[1].username},{self.metrics[0].id},"
+                      f"{self.metrics[0].name},2,False", lines)
+
+    def test_archive_round_trip(self):
+        self.submit_all()
+        close_review_cycle(self.cycle)
+        before = self.export()
+
+        archive = archive_cycle(self.cycle, purge=True)
+        self.assertEqual(archive.row_count, 18)
+        self.assertFalse(PackedSubmission.objects.exists())
+        self.assertEqual(self.export(), before)
+        self.assertEqual(find_drift([self.cycle.id]), [])
+
+        self.assertEqual(restore_cycle(self.cycle), 18)
+        self.assertEqual(Rating.objects.filter(is_self_review=True).exclude(reviewer_token=None).count(), 0)
+        # packed ratings go back to packed rows under random ids, not to sequential Rating ids
+        self.assertFalse(Rating.objects.filter(is_self_review=False).exists())
+        rows = list(PackedSubmission.objects.filter(review_cycle=self.cycle))
+        self.assertEqual(len(rows), 6)
+        self.assertTrue(all(row.id >= 2 ** 32 for row in rows))
+        self.assertEqual(sorted(self.export().splitlines()), sorted(before.splitlines()))
+        self.assertEqual(find_drift([self.cycle.id]), [])
+
+
+class ListEndpointQueryCountTests(TestCase):
+    """Pins the query count of every list endpoint so N+1 regressions fail loudly."""
+
+    LIST_ENDPOINTS = [
+        ("/api/groups/list/", 1),
+        ("/api/review-cycle/list/", 1),
+        ("/api/metrics/list/", 2),
+        ("/api/users/list/", 2),
+        ("/api/jobs/list/", 1),
+        ("/api/trends/users/{user}/", 1),
+        ("/api/trends/groups/{group}/", 2),
+        ("/api/notes/search/?q=standups", 1),
+    ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username="admin", is_staff=True))
+
+    def assert_pinned(self, user, group):
+        for url, expected in self.LIST_ENDPOINTS:
+            url = url.format(user=user.id, group=group.id)
+            with self.subTest(url=url), self.assertNumQueries(expected):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+    def add_closed_cycle(self, name, group, users, metrics):
+        cycle = ReviewCycle.objects.create(name=name, group=group, start_date=date(2025, 7, 1),
+                                           end_date=date(2025, 7, 15))
+        cycle.metrics.set(metrics)
+        submit(cycle, users[0], full_payload(users, metrics))
+        WeaknessNote.objects.create(review_cycle=cycle, target_user=users[1], note="Skips standups.")
+        enqueue("rebuild_aggregates", user=users[0])
+        self.assertEqual(self.client.post(f"/api/review-cycle/{cycle.id}/close/").status_code, 200)
+
+    def test_query_counts_are_pinned_as_data_grows(self):
+        cycle, users, metrics = make_cycle(2, name="Alpha")
+        self.add_closed_cycle("Alpha 0", cycle.group, users, metrics)
+        self.assert_pinned(users[1], cycle.group)
+        for index in range(5):
+            make_cycle(4, name=f"Beta {index}")
+            self.add_closed_cycle(f"Alpha {index + 1}", cycle.group, users, metrics)
+        self.assert_pinned(users[1], cycle.group)
+
+    def test_review_cycle_keyset_pagination_and_projection(self):
+        cycles = [make_cycle(1, name=f"Cycle {index}")[0] for index in range(5)]
+
+        response = self.client.get("/api/review-cycle/list/", {"limit": 2, "fields": "id,group"})
+        self.assertEqual(response.data, [{"id": c.id, "group": c.group.name} for c in cycles[:2]])
+
+        seen = [row["id"] for row in response.data]
+        while "Link" in response:
+            next_url = response["Link"].split(";")[0].strip("<>")
+            response = self.client.get(next_url)
+            seen += [row["id"] for row in response.data]
+        self.assertEqual(seen, [c.id for c in cycles])
+
+    def test_group_list_counts_members(self):
+        cycle, users, _ = make_cycle(3)
+
+        response = self.client.get("/api/groups/list/", {"limit": 10})
+
+        self.assertEqual(response.data, [{"id": cycle.group.id, "name": cycle.group.name, "membersCount": 3}])
+        self.assertNotIn("Link", response)
+
+    def test_unknown_projection_field(self):
+        response = self.client.get("/api/groups/list/", {"fields": "id,secret"})
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_tampered_cursor_is_a_bad_request(self):
+        make_cycle(1)
+        for values in (["2025-06-01"], ["June", 1], ["2025-06-01", "x"], ["2025-06-01", [1]],
+                       ["2025-06-01", 2 ** 70], [None, 1], {"id": 1}):
+            cursor = encode_cursor(values)
+            with self.subTest(cursor=values):
+                response = self.client.get("/api/review-cycle/list/", {"cursor": cursor})
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.data, {"cursor": "Invalid cursor."})
+        self.assertEqual(self.client.get("/api/groups/list/", {"cursor": "not base64!"}).status_code, 400)
+        response = self.client.get("/api/review-cycle/list/", {"cursor": encode_cursor(["2025-06-01", 0])})
+        self.assertEqual(len(response.data), 1)
+
+
+class ParticipantsSnapshotTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.cycle, self.users, self.metrics = make_cycle(3)
+        Metric.objects.create(name="Unlinked")
+        self.client = APIClient()
+        self.client.force_authenticate(self.users[0])
+        self.url = f"/api/review-cycle/participants/{self.cycle.id}/"
+
+    def test_returns_cycle_metrics_and_marks_self(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual([m["id"] for m in response.data["metrics"]], [m.id for m in self.metrics])
+        self.assertEqual([p["is_self"] for p in response.data["participants"]], [True, False, False])
+
+    def test_cached_snapshot_needs_no_queries_and_supports_etags(self):
+        etag = self.client.get(self.url)["ETag"]
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        other = APIClient()
+        other.force_authenticate(self.users[1])
+        self.assertNotEqual(other.get(self.url)["ETag"], etag)
+
+    def test_membership_and_metric_changes_invalidate(self):
+        etag = self.client.get(self.url)["ETag"]
+        newcomer = User.objects.create(username="newcomer")
+        self.cycle.group.user_set.add(newcomer)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(newcomer.id, [p["id"] for p in response.data["participants"]])
+
+        self.cycle.metrics.remove(self.metrics[0])
+        response = self.client.get(self.url)
+        self.assertEqual([m["id"] for m in response.data["metrics"]], [self.metrics[1].id])
+
+    def test_process_local_cache_is_refused_outside_debug(self):
+        locmem = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+        redis = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache",
+                             "LOCATION": "redis://cache:6379"}}
+        with self.settings(DEBUG=False, CACHES=locmem), self.assertRaises(ImproperlyConfigured):
+            check_shared_cache()
+        with self.settings(DEBUG=False, CACHES=redis):
+            check_shared_cache()
+        with self.settings(DEBUG=True, CACHES=locmem):
+            check_shared_cache()
+        # primary pins must reach every worker as soon as there is a replica
+        with self.settings(DEBUG=True, CACHES=locmem, DATABASES={**settings.DATABASES, "replica": {}}), \
+                self.assertRaises(ImproperlyConfigured):
+            check_shared_cache()
+
+    def test_non_members_are_rejected(self):
+        outsider = APIClient()
+        outsider.force_authenticate(User.objects.create(username="outsider"))
+
+        self.assertEqual(outsider.get(self.url).status_code, 403)
+
+
+class ReviewPageBootstrapTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.cycle, self.users, self.metrics = make_cycle(3)
+        self.client = APIClient()
+        self.client.force_authenticate(self.users[0])
+        self.url = f"/api/review-cycle/{self.cycle.id}/bootstrap/"
+
+    def test_one_response_from_fixed_queries(self):
+        self.client.get(self.url)  # warms the cycle snapshot
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([m["id"] for m in response.data["metrics"]], [m.id for m in self.metrics])
+        self.assertEqual([p["is_self"] for p in response.data["participants"]], [True, False, False])
+        self.assertEqual(response.data["reviewer"]["finalized"], False)
+        self.assertEqual(response.data["reviewer"]["draft"]["ratings"], [])
+
+    def test_etag_follows_reviewer_state(self):
+        etag = self.client.get(self.url)["ETag"]
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.client.patch(f"/api/ratings/draft/{self.cycle.id}/",
+                          {"metric": self.metrics[0].id, "target_user": self.users[1].id, "value": 3}, format="json")
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["reviewer"]["draft"]["ratings"],
+                         [{"metric": self.metrics[0].id, "values": [{"target_user": self.users[1].id, "value": 3}]}])
+
+        outsider = User.objects.create(username="outsider")
+        self.client.force_authenticate(outsider)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+
+class AsyncReadEndpointTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.cycle, self.users, self.metrics = make_cycle(2)
+        submit(self.cycle, self.users[0], full_payload(self.users, self.metrics, value=4))
+        self.admin = User.objects.create(username="admin", is_staff=True)
+        self.admin.groups.add(self.cycle.group)
+
+    def get_both(self, path):
+        token = f"Bearer {AccessToken.for_user(self.admin)}"
+        sync = APIClient()
+        sync.force_authenticate(self.admin)
+        sync_response = sync.get(f"/api/{path}")
+        async_response = self.client.get(f"/api/async/{path}", HTTP_AUTHORIZATION=token)
+        self.assertEqual(async_response.status_code, sync_response.status_code)
+        self.assertEqual(async_response.get("Link", "").replace("/api/async/", "/api/"), sync_response.get("Link", ""))
+        return json.loads(sync_response.content), async_response.json()
+
+    def test_payloads_match_sync_views(self):
+        for path in ("review-cycle/list/", f"review-cycle/participants/{self.cycle.id}/",
+                     f"review-cycle/{self.cycle.id}/results/", "metrics/list/", "users/list/"):
+            with self.subTest(path=path):
+                sync_data, async_data = self.get_both(path)
+                self.assertEqual(sync_data, async_data)
+
+    def test_cycle_list_pages_and_projects_like_sync_view(self):
+        make_cycle(2, name="Sprint 2")
+        sync_data, async_data = self.get_both("review-cycle/list/?limit=1&fields=id,name")
+        self.assertEqual(async_data, sync_data)
+        self.assertEqual(list(async_data[0]), ["id", "name"])
+
+        token = f"Bearer {AccessToken.for_user(self.admin)}"
+        next_url = self.client.get("/api/async/review-cycle/list/?limit=1",
+                                   HTTP_AUTHORIZATION=token)["Link"].split(">")[0][1:]
+        [second] = self.client.get(next_url, HTTP_AUTHORIZATION=token).json()
+        self.assertEqual(second["name"], "Sprint 2")
+
+        for query in ("limit=0", "cursor=nonsense", "fields=secret"):
+            with self.subTest(query=query):
+                sync_data, async_data = self.get_both(f"review-cycle/list/?{query}")
+                self.assertEqual(async_data, sync_data)
+
+    def test_requires_valid_token(self):
+        self.assertEqual(self.client.get("/api/async/users/list/").status_code, 401)
+        response = self.client.get("/api/async/users/list/", HTTP_AUTHORIZATION="Bearer nonsense")
+        self.assertEqual(response.status_code, 401)
+
+    def test_results_are_admin_only(self):
+        token = f"Bearer {AccessToken.for_user(self.users[0])}"
+        response = self.client.get(f"/api/async/review-cycle/{self.cycle.id}/results/", HTTP_AUTHORIZATION=token)
+
+        self.assertEqual(response.status_code, 403)
+
+
+class CycleEventStreamTests(TestCase):
+    def setUp(self):
+        reset_broker()
+        self.addCleanup(reset_broker)
+        self.cycle, self.users, self.metrics = make_cycle(2)
+        self.admin = User.objects.create(username="admin", is_staff=True)
+        self.url = f"/api/async/review-cycle/{self.cycle.id}/events/"
+
+    def submit_and_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            submit(self.cycle, self.users[0], full_payload(self.users, self.metrics))
+
+    async def test_stream_pushes_submission_events(self):
+        response = await self.async_client.get(self.url, {"token": str(AccessToken.for_user(self.admin))})
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        stream = response.streaming_content
+
+        first = await anext(stream)
+        self.assertIn(b"event: completion", first)
+        self.assertIn(b'"finalized": 0', first)
+
+        await sync_to_async(self.submit_and_commit)()
+        finalized = await asyncio.wait_for(anext(stream), 5)
+        changed = await asyncio.wait_for(anext(stream), 5)
+        await stream.aclose()
+
+        self.assertIn(b"event: submission_finalized", finalized)
+        self.assertIn(b'"percentage": 50.0', finalized)
+        self.assertIn(b"event: aggregates_changed", changed)
+        self.assertIn(f'"metric_ids": [{self.metrics[0].id}, {self.metrics[1].id}]'.encode(), changed)
+
+    def test_stream_requires_staff(self):
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+        response = self.client.get(self.url, {"token": str(AccessToken.for_user(self.users[0]))})
+        self.assertEqual(response.status_code, 403)
+
+
+# The primary doubles as the "replica" so routing decisions are observable
+# (None means the default database) without a second connection.
+@override_settings(REVIEW_REPLICA={"ALIAS": "default", "PIN_SECONDS": 5})
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.router = ReplicaRouter()
+
+    def test_only_marked_reads_use_replica_until_a_write(self):
+        self.assertIsNone(self.router.db_for_read(Rating))
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(Rating), "default")
+            with primary_reads():
+                self.assertIsNone(self.router.db_for_read(Rating))
+            self.router.db_for_write(Rating)
+            self.assertIsNone(self.router.db_for_read(Rating))
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(Rating), "default")
+
+    def test_successful_write_pins_user_to_primary(self):
+        user = User.objects.create(username="writer")
+        factory = RequestFactory()
+
+        def request(method, status_code):
+            request = getattr(factory, method)("/api/metrics/create/")
+            request.user = user
+            PrimaryPinMiddleware(lambda request: HttpResponse(status=status_code))(request)
+
+        request("get", 200)
+        request("post", 400)
+        self.assertFalse(is_pinned(user.id))
+        request("post", 201)
+        self.assertTrue(is_pinned(user.id))
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        user_cache.clear()
+        self.cycle, self.users, self.metrics = make_cycle(2)
+        self.user = self.users[0]
+
+    def get(self, token, url="/api/metrics/list/"):
+        return self.client.get(url, HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def test_tokens_carry_staff_and_group_claims(self):
+        self.user.set_password("secret")
+        self.user.save()
+        response = self.client.post("/api/auth/token/", {"username": self.user.username, "password": "secret"})
+
+        token = AccessToken(response.json()["access"])
+        self.assertEqual(token["is_staff"], False)
+        self.assertEqual(token["groups"], [self.cycle.group.id])
+
+    def test_cached_user_needs_no_auth_queries(self):
+        token = ReviewRefreshToken.for_user(self.user).access_token
+        self.get(token)
+
+        with self.assertNumQueries(2):  # just the metric list and its prefetch
+            response = self.get(token)
+        self.assertEqual(response.status_code, 200)
+
+    def test_user_and_membership_changes_evict(self):
+        token = ReviewRefreshToken.for_user(self.user).access_token
+        self.get(token)
+
+        self.cycle.group.user_set.remove(self.user)
+        self.assertIsNone(user_cache.get(self.user.id))
+        self.get(token)
+        self.user.is_active = False
+        self.user.save()
+
+        self.assertEqual(self.get(token).status_code, 401)
+
+    def test_newer_token_with_different_claims_reloads(self):
+        self.get(ReviewRefreshToken.for_user(self.user).access_token)
+        User.objects.filter(id=self.user.id).update(is_staff=True)  # bypasses signals
+        staff = User.objects.get(id=self.user.id)
+        cached, loaded_at = user_cache.get(self.user.id)
+        user_cache.entries[self.user.id] = (cached, loaded_at - 10)  # token issued after the load
+        token = ReviewRefreshToken.for_user(staff).access_token
+
+        response = self.get(token, f"/api/review-cycle/{self.cycle.id}/results/")
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_logout_evicts_user(self):
+        refresh = ReviewRefreshToken.for_user(self.user)
+        self.get(refresh.access_token)
+
+        response = self.client.post("/api/logout/", {"refresh": str(refresh)},
+                                    HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(user_cache.get(self.user.id))
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"],
+                   REVIEW_USER_IMPORT={"WORKERS": 0})
+class BulkUserImportTests(TestCase):
+    def setUp(self):
+        self.group = Group.objects.create(name="Backend")
+        User.objects.create(username="taken", email="taken@example.com")
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username="admin", is_staff=True))
+
+    def row(self, username, **extra):
+        return {"username": username, "first_name": "A", "last_name": "B", "password": "pw-123456",
+                "email": f"{username}@example.com", **extra}
+
+    def test_json_import_reports_row_errors(self):
+        rows = [
+            self.row("alice", groups="Backend"),
+            self.row("taken"),
+            self.row("bob", email="Taken@Example.com"),
+            self.row("carol", groups=["Nope"]),
+            self.row("alice"),
+            {"username": "dave"},
+        ]
+
+        with self.assertNumQueries(6):  # lookups, savepoint, two inserts, release
+            response = self.client.post("/api/users/bulk-import/", rows, format="json")
+
+        self.assertEqual(response.data["created"], 1)
+        self.assertEqual([e["row"] for e in response.data["errors"]], [1, 2, 3, 4, 5])
+        alice = User.objects.get(username="alice")
+        self.assertTrue(alice.check_password("pw-123456"))
+        self.assertEqual(list(alice.groups.all()), [self.group])
+
+    def test_csv_upload_and_command(self):
+        upload = SimpleUploadedFile("users.csv", (
+            "username,first_name,last_name,password,email,groups\n"
+            "erin,E,R,pw-123456,erin@example.com,Backend\n"
+        ).encode())
+        response = self.client.post("/api/users/bulk-import/", {"file": upload}, format="multipart")
+        self.assertEqual(response.data, {"created": 1, "errors": []})
+
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as handle:
+            json.dump([self.row("frank")], handle)
+        self.addCleanup(os.remove, handle.name)
+        call_command("import_users", handle.name, stdout=StringIO())
+        self.assertTrue(User.objects.filter(username="frank").exists())
+
+    def test_emails_are_unique_regardless_of_case(self):
+        response = self.client.post("/api/users/bulk-import/", [
+            self.row("gina", email="Gina@Example.com"), self.row("hal", email="gina@example.com"),
+        ], format="json")
+
+        self.assertEqual(response.data["created"], 1)
+        self.assertEqual(response.data["errors"][0]["errors"], {"email": "Duplicate e-mail in import."})
+
+    @override_settings(REVIEW_USER_IMPORT={"SYNC_MAX_ROWS": 2})
+    def test_large_imports_are_queued(self):
+        rows = [self.row(f"bulk{i}") for i in range(3)]
+
+        response = self.client.post("/api/users/bulk-import/", rows, format="json")
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(Job.objects.get(id=response.data["id"]).kind, "import_users")
+        self.assertFalse(User.objects.filter(username__startswith="bulk").exists())
+
+    # Spawned workers load the real settings rather than the overrides.
+    @override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher",
+                                          "django.contrib.auth.hashers.PBKDF2PasswordHasher"])
+    def test_hashing_on_a_process_pool(self):
+        hashed = hash_passwords(["one", "two"], workers=2)
+
+        self.assertTrue(check_password("one", hashed[0]))
+        self.assertTrue(check_password("two", hashed[1]))
+
+
+class GroupMembershipUpdateTests(TestCase):
+    def setUp(self):
+        self.backend = Group.objects.create(name="Backend")
+        self.frontend = Group.objects.create(name="Frontend")
+        self.users = [User.objects.create(username=f"member{i}") for i in range(6)]
+        self.backend.user_set.set(self.users[:4])
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username="admin", is_staff=True))
+        self.events = []
+        receiver = lambda sender, signal, **kwargs: self.events.append(kwargs)
+        membership_changed.connect(receiver, weak=False)
+        self.addCleanup(membership_changed.disconnect, receiver)
+
+    def members(self, group):
+        return set(group.user_set.values_list("id", flat=True))
+
+    def test_set_is_applied_as_a_diff(self):
+        ids = [user.id for user in self.users]
+        wanted = ids[2:6]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(f"/api/groups/{self.backend.id}/users/", {"user_ids": wanted + [9999]},
+                                         format="json")
+
+        self.assertEqual((response.data["added"], response.data["removed"]), (2, 2))
+        self.assertEqual(response.data["unknown_user_ids"], [9999])
+        self.assertEqual(self.members(self.backend), set(wanted))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(f"/api/groups/{self.backend.id}/users/", {"user_ids": wanted}, format="json")
+        self.assertEqual((response.data["added"], response.data["removed"]), (0, 0))
+        self.assertEqual(len(self.events), 1)
+
+    def test_moves_across_groups_in_one_request(self):
+        moved = [user.id for user in self.users[:2]]
+        payload = {"changes": [
+            {"group_id": self.backend.id, "remove": moved},
+            {"group_id": self.frontend.id, "add": moved},
+        ]}
+        with self.captureOnCommitCallbacks(execute=True):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.patch("/api/groups/memberships/", payload, format="json")
+
+        self.assertEqual(response.status_code, 200)
+        # no User rows are loaded, only ids
+        self.assertFalse(any('"auth_user"."password"' in q["sql"] for q in queries.captured_queries))
+        self.assertEqual(self.members(self.frontend), set(moved))
+        self.assertEqual(self.members(self.backend), {user.id for user in self.users[2:4]})
+        self.assertEqual(self.events, [{"group_ids": {self.backend.id, self.frontend.id}, "user_ids": set(moved)}])
+
+    def test_later_changes_to_a_group_win(self):
+        newcomer, leaver = self.users[4].id, self.users[0].id
+        payload = {"changes": [
+            {"group_id": self.backend.id, "add": [newcomer, self.users[5].id], "remove": [leaver]},
+            {"group_id": self.backend.id, "add": [leaver], "remove": [newcomer]},
+        ]}
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch("/api/groups/memberships/", payload, format="json")
+
+        self.assertEqual(response.status_code, 200)
+        [summary] = response.data["groups"]
+        self.assertEqual((summary["added"], summary["removed"]), (1, 0))
+        self.assertEqual(self.members(self.backend), {user.id for user in self.users[:4]} | {self.users[5].id})
+        self.assertEqual(self.events, [{"group_ids": {self.backend.id}, "user_ids": {self.users[5].id}}])
+
+        response = self.client.patch(f"/api/groups/{self.backend.id}/users/",
+                                     {"add": [newcomer], "remove": [newcomer]}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn(newcomer, self.members(self.backend))
+
+    def test_rejects_unknown_groups_and_mixed_payloads(self):
+        response = self.client.patch("/api/groups/memberships/", {"changes": [{"group_id": 9999, "add": [1]}]},
+                                     format="json")
+        self.assertEqual(response.status_code, 404)
+        response = self.client.patch(f"/api/groups/{self.backend.id}/users/", {"user_ids": [], "add": [1]},
+                                     format="json")
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class BackgroundJobTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create(username="admin", is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_cycle_close_is_handed_to_the_worker(self):
+        cycle, users, metrics = make_cycle(2)
+        submit(cycle, users[0], full_payload(users, metrics))
+
+        response = self.client.post(f"/api/review-cycle/{cycle.id}/close/?async=true")
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response["Location"], f"/api/jobs/{response.data['id']}/")
+        cycle.refresh_from_db()
+        self.assertTrue(cycle.is_active)
+
+        call_command("run_jobs", "--once", "--workers", "1", stdout=StringIO())
+
+        cycle.refresh_from_db()
+        self.assertFalse(cycle.is_active)
+        job = self.client.get(response["Location"]).data
+        self.assertEqual((job["status"], job["progress"], job["result"]["trend_points"]), ("succeeded", 100.0, 6))
+
+        self.client.force_authenticate(users[1])
+        self.assertEqual(self.client.get(response["Location"]).status_code, 404)
+
+    def test_failures_are_retried_with_backoff(self):
+        calls = []
+
+        @job_handler("test_flaky")
+        def flaky(job):
+            calls.append(job.attempts)
+            if len(calls) < 2:
+                raise RuntimeError("try again")
+            return {"attempts": job.attempts}
+        self.addCleanup(HANDLERS.pop, "test_flaky")
+
+        job = enqueue("test_flaky", max_attempts=2)
+        with self.assertLogs("review.jobs", "ERROR"):
+            self.assertEqual(run_pending("test"), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertIn("try again", job.error)
+        self.assertEqual(run_pending("test"), 0)  # backing off
+
+        Job.objects.filter(id=job.id).update(run_after=job.created_at)
+        run_pending("test")
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result), (Job.SUCCEEDED, {"attempts": 2}))
+
+    def test_import_payload_is_cleared_once_consumed(self):
+        rows = [{"username": "erin", "first_name": "E", "last_name": "R", "password": "pw-123456"}]
+        response = self.client.post("/api/users/bulk-import/?async=1", rows, format="json")
+        self.assertEqual(response.status_code, 202)
+        stored = []
+        handler, sensitive = HANDLERS["import_users"]
+
+        def import_users_job(job):
+            stored.append(Job.objects.get(id=job.id).payload)
+            return handler(job)
+        HANDLERS["import_users"] = (import_users_job, sensitive)
+        self.addCleanup(HANDLERS.__setitem__, "import_users", (handler, sensitive))
+
+        run_pending("test")
+
+        job = Job.objects.get(id=response.data["id"])
+        self.assertEqual(stored, [{}])
+        self.assertEqual((job.status, job.payload, job.result["created"]), (Job.SUCCEEDED, {}, 1))
+        self.assertTrue(User.objects.filter(username="erin").exists())
+
+    def test_only_jobs_without_a_heartbeat_are_requeued(self):
+        now = timezone.now()
+        long_running = enqueue("rebuild_aggregates")
+        lost = enqueue("rebuild_aggregates")
+        lost_import = enqueue("import_users", {"rows": []})
+        Job.objects.update(status=Job.RUNNING, attempts=1, started_at=now - timedelta(hours=1),
+                           heartbeat_at=now - timedelta(hours=1))
+        Job.objects.filter(id=long_running.id).update(heartbeat_at=now)
+
+        self.assertEqual(requeue_stale(900), 2)
+
+        statuses = dict(Job.objects.values_list("id", "status"))
+        self.assertEqual(statuses, {long_running.id: Job.RUNNING, lost.id: Job.QUEUED, lost_import.id: Job.FAILED})
+        # the lost import is not rerun: its payload went with the worker
+        lost_import.refresh_from_db()
+        self.assertEqual(lost_import.payload, {})
+
+        report_progress(long_running, 1, 2)
+        long_running.refresh_from_db()
+        self.assertGreaterEqual(long_running.heartbeat_at, now)
+
+
+@override_settings(REVIEW_PROFILING={"ENABLED": True, "STORE": "", "DUPLICATE_THRESHOLD": 3})
+class QueryProfilingMiddlewareTests(TestCase):
+    def setUp(self):
+        reset_store()
+        self.addCleanup(reset_store)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username="admin", is_staff=True))
+
+    def test_server_timing_and_samples(self):
+        make_cycle(2)
+        response = self.client.get("/api/review-cycle/list/")
+
+        self.assertIn('db;dur=', response["Server-Timing"])
+        self.assertIn('desc="1 queries"', response["Server-Timing"])
+        self.assertNotIn("X-Duplicate-Queries", response)
+        [row] = summarize(get_store().all())
+        self.assertEqual((row["route"], row["count"], row["avg_queries"]), ("api/review-cycle/list/", 1, 1))
+
+    def test_file_store_keeps_no_memory_window(self):
+        with tempfile.TemporaryDirectory() as root:
+            with self.settings(REVIEW_PROFILING={"ENABLED": True, "STORE": os.path.join(root, "samples.db"),
+                                                 "FLUSH_EVERY": 2}):
+                reset_store()
+                self.client.get("/api/review-cycle/list/")
+                store = get_store()
+                self.assertFalse(hasattr(store, "samples"))
+                [row] = summarize(store.all())
+                self.assertEqual((row["route"], row["count"]), ("api/review-cycle/list/", 1))
+
+    def test_file_store_writes_off_the_request_thread(self):
+        with tempfile.TemporaryDirectory() as root:
+            store = SQLiteProfileStore(os.path.join(root, "samples.db"), 100, 2, flush_interval=60)
+            self.addCleanup(store.close)
+            written = threading.Event()
+            writers = []
+            write = store.write
+
+            def record_writer(samples):
+                writers.append(threading.current_thread())
+                write(samples)
+                written.set()
+
+            with patch.object(store, "write", side_effect=record_writer):
+                sample = {column: 0 for column in SAMPLE_COLUMNS} | {"route": "r", "method": "GET"}
+                store.add(sample)
+                self.assertEqual(writers, [])
+                store.add(sample)
+                self.assertTrue(written.wait(5))
+
+            self.assertNotIn(threading.current_thread(), writers)
+            self.assertEqual(len(store.all()), 2)
+
+    @override_settings(ROOT_URLCONF="review.tests")
+    def test_flags_repeated_sql(self):
+        for index in range(4):
+            User.objects.create(username=f"user{index}")
+
+        with self.assertLogs("review.middleware", "WARNING"):
+            response = self.client.get("/n-plus-one/")
+
+        self.assertEqual(response["X-Duplicate-Queries"], "1")
+
+
+def n_plus_one_view(request):
+    return HttpResponse(str([user.groups.count() for user in User.objects.all()]))
+
+
+urlpatterns = [path("n-plus-one/", n_plus_one_view)]
@@ -0,0 +1,105 @@
+# review/trends.py
+from django.db import transaction
+
+from .models import MetricTrendPoint, RatingAggregate, ReviewCycle
+
+DEFAULT_WINDOW = 3
+
+
+def rollup_cycle(review_cycle):
+    """
+    Replace the cycle's trend points with ones folded from its aggregates.
+
+    One row per (user, metric) plus one group row per metric; reads the
+    cycle's ``RatingAggregate`` rows only.
+    """
+    points = {}
+    rows = RatingAggregate.objects.filter(review_cycle=review_cycle, count__gt=0).values_list(
+        'target_user_id', 'metric_id', 'is_self_review', 'count', 'total'
+    )
+    for user_id, metric_id, is_self, count, total in rows:
+        for owner in (user_id, None):
+            point = points.get((owner, metric_id))
+            if point is None:
+                point = points[(owner, metric_id)] = MetricTrendPoint(
+                    review_cycle_id=review_cycle.id, group_id=review_cycle.group_id, metric_id=metric_id,
+                    target_user_id=owner, cycle_end=review_cycle.end_date,
+                )
+            if is_self:
+                point.self_count += count
+                point.self_total += total
+            else:
+                point.peer_count += count
+                point.peer_total += total
+
+    with transaction.atomic():
+        MetricTrendPoint.objects.filter(review_cycle=review_cycle).delete()
+        MetricTrendPoint.objects.bulk_create(points.values(), batch_size=500)
+    return len(points)
+
+
+def rebuild_trends(review_cycle_ids=None):
+    """Roll up every closed cycle, e.g. ones closed before trends existed."""
+    cycles = ReviewCycle.objects.filter(closed_at__isnull=False)
+    if review_cycle_ids:
+        cycles = cycles.filter(id__in=review_cycle_ids)
+    return sum(rollup_cycle(cycle) for cycle in cycles.only('id', 'group_id', 'end_date'))
+
+
+def trend_points(start=None, end=None, last=None, metric_ids=None, **owner):
+    """
+    Trend rows for one owner (``target_user_id=`` or ``group_id=`` with
+    ``target_user__isnull=True``), oldest first.
+
+    ``start``/``end`` bound the cycles' end dates and ``last`` keeps only the
+    most recent cycles, so the read is proportional to the cycles asked for.
+    """
+    points = MetricTrendPoint.objects.filter(**owner)
+    if metric_ids:
+        points = points.filter(metric_id__in=metric_ids)
+    if start:
+        points = points.filter(cycle_end__gte=start)
+    if end:
+        points = points.filter(cycle_end__lte=end)
+    points = points.values(
+        'review_cycle_id', 'metric_id', 'cycle_end', 'peer_count', 'peer_total', 'self_count', 'self_total',
+        'review_cycle__name', 'metric__name',
+    )
+    if last:
+        cycle_ids = (MetricTrendPoint.objects.filter(**owner).order_by('-cycle_end', '-review_cycle_id')
+                     .values_list('review_cycle_id', flat=True).distinct())
+        if metric_ids:
+            cycle_ids = cycle_ids.filter(metric_id__in=metric_ids)
+        points = points.filter(review_cycle_id__in=list(cycle_ids[:last]))
+    return points.order_by('metric_id', 'cycle_end', 'review_cycle_id')
+
+
+def build_trends(rows, window=DEFAULT_WINDOW):
+    """
+    Group trend rows per metric with a moving average and cycle-over-cycle
+    delta of the peer mean.
+    """
+    series = {}
+    for row in rows:
+        metric = series.setdefault(row['metric_id'], {
+            "metric_id": row['metric_id'],
+            "metric_name": row['metric__name'],
+            "points": [],
+        })
+        points = metric["points"]
+        peer_mean = row['peer_total'] / row['peer_count'] if row['peer_count'] else None
+        recent = [p["peer_mean"] for p in points[-(window - 1):] if p["peer_mean"] is not None] if window > 1 else []
+        if peer_mean is not None:
+            recent.append(peer_mean)
+        previous = next((p["peer_mean"] for p in reversed(points) if p["peer_mean"] is not None), None)
+        points.append({
+            "cycle_id": row['review_cycle_id'],
+            "cycle_name": row['review_cycle__name'],
+            "end_date": row['cycle_end'],
+            "peer_count": row['peer_count'],
+            "peer_mean": peer_mean,
+            "self_mean": row['self_total'] / row['self_count'] if row['self_count'] else None,
+            "moving_average": sum(recent) / len(recent) if recent else None,
+            "delta": peer_mean - previous if peer_mean is not None and previous is not None else None,
+        })
+    return list(series.values())
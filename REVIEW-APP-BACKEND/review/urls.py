@@ -1,6 +1,6 @@
 # review/urls.py
 from django.urls import path
-from review import rest
+from review import rest, async_views
 urlpatterns = [
     path("auth/token/", rest.SimpleAuthTokenView.as_view(), name="get-auth-token"),
     path('token/refresh/', rest.CustomTokenRefreshView.as_view(), name='token_refresh'),
@@ -11,17 +11,48 @@ urlpatterns = [
     path('groups/<int:pk>/', rest.GroupDetailView.as_view()),
     path('groups/<int:pk>/delete/', rest.GroupDeleteView.as_view()),
     path('groups/<int:pk>/users/', rest.GroupUserUpdateView.as_view()),
+    path('groups/memberships/', rest.GroupMembershipBulkUpdateView.as_view()),
 
     path('review-cycle/create/', rest.ReviewCycleCreateView.as_view()),
     path('review-cycle/list/', rest.ReviewCycleListView.as_view()),
     path('review-cycle/participants/<int:cycle_id>/', rest.ParticipantsAndMetricsView.as_view()),
+    path('review-cycle/<int:cycle_id>/bootstrap/', rest.ReviewPageBootstrapView.as_view()),
+    path('review-cycle/<int:cycle_id>/results/', rest.ReviewCycleResultsView.as_view()),
+    path('review-cycle/completion/', rest.CompletionDashboardView.as_view()),
+    path('review-cycle/<int:cycle_id>/completion/', rest.ReviewCycleCompletionView.as_view()),
+    path('review-cycle/<int:cycle_id>/close/', rest.ReviewCycleCloseView.as_view()),
+    path('review-cycle/<int:cycle_id>/assignments/', rest.ReviewCycleAssignmentView.as_view()),
+    path('review-cycle/<int:cycle_id>/archive/', rest.ReviewCycleArchiveView.as_view()),
+    path('review-cycle/<int:cycle_id>/report/', rest.ReviewCycleReportView.as_view()),
+    path('review-cycle/<int:cycle_id>/report/<int:user_id>/', rest.ReviewCycleUserReportView.as_view()),
+    path('review-cycle/<int:cycle_id>/export/', rest.ReviewCycleExportView.as_view()),
+    path('review-cycle/<int:cycle_id>/notes/', rest.WeaknessNoteSubmitView.as_view()),
 
 
     path('ratings/bulk-submit/<int:review_cycle_id>/', rest.BulkRatingSubmitView.as_view()),
+    path('ratings/draft/<int:review_cycle_id>/', rest.RatingDraftView.as_view()),
+    path('ratings/draft/<int:review_cycle_id>/finalize/', rest.RatingDraftFinalizeView.as_view()),
+
+    path('notes/search/', rest.WeaknessNoteSearchView.as_view()),
 
     path('metrics/create/', rest.MetricCreateView.as_view()),
     path('metrics/list/', rest.MetricListView.as_view()),
 
     path('users/list/', rest.UserList.as_view()),
+    path('jobs/list/', rest.JobListView.as_view()),
+    path('jobs/create/', rest.JobCreateView.as_view()),
+    path('jobs/<int:job_id>/', rest.JobDetailView.as_view()),
+    path('trends/users/<int:user_id>/', rest.UserTrendView.as_view()),
+    path('trends/groups/<int:group_id>/', rest.GroupTrendView.as_view()),
+    path('users/create/', rest.UserCreate.as_view()),
+    path('users/bulk-import/', rest.BulkUserImportView.as_view()),
+
+    # Async (ASGI) read endpoints, same payloads as their synchronous twins
+    path('async/review-cycle/list/', async_views.review_cycle_list),
+    path('async/review-cycle/participants/<int:cycle_id>/', async_views.participants_and_metrics),
+    path('async/review-cycle/<int:cycle_id>/results/', async_views.review_cycle_results),
+    path('async/review-cycle/<int:cycle_id>/events/', async_views.review_cycle_events),
+    path('async/metrics/list/', async_views.metric_list),
+    path('async/users/list/', async_views.user_list),
 
 ]
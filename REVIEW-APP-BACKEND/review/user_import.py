@@ -0,0 +1,199 @@
+# review/user_import.py
+import csv
+import io
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, User
+from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+from .memberships import send_membership_changed
+
+REQUIRED_FIELDS = ('username', 'first_name', 'last_name', 'password')
+IMPORT_DEFAULTS = {
+    # hashing processes for imports run by the job queue or the command; 0 hashes inline
+    'WORKERS': 2,
+    'CHUNK_SIZE': 500,
+    # larger imports sent to the API are queued as jobs instead of run in the request
+    'SYNC_MAX_ROWS': 100,
+}
+
+
+def import_settings():
+    return {**IMPORT_DEFAULTS, **getattr(settings, 'REVIEW_USER_IMPORT', {})}
+
+
+def parse_rows(content, fmt):
+    """Read import rows from CSV text or a JSON list of objects."""
+    if fmt == 'csv':
+        return [dict(row) for row in csv.DictReader(io.StringIO(content))]
+    if fmt == 'json':
+        rows = json.loads(content)
+        if isinstance(rows, dict):
+            rows = rows.get('users', [])
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise ValueError("Expected a JSON list of user objects.")
+        return rows
+    raise ValueError(f"Unsupported format: {fmt}")
+
+
+def split_groups(value):
+    """Groups may be a list or a ';' separated string of names."""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(';')
+    return [str(name).strip() for name in value if str(name).strip()]
+
+
+def validate_rows(rows):
+    """
+    Validate every row without touching the database per row.
+
+    Returns ``(valid, errors)`` where ``valid`` is a list of
+    ``(index, cleaned_row)`` and ``errors`` maps row index to field errors.
+    Uniqueness against existing users and group existence are each
+    checked with one set-based query.
+    """
+    username_validator = UnicodeUsernameValidator()
+    errors = {}
+    cleaned = []
+    seen_usernames = set()
+    seen_emails = set()
+
+    for index, row in enumerate(rows):
+        row_errors = {}
+        values = {field: str(row.get(field) or '').strip() for field in REQUIRED_FIELDS + ('email',)}
+        email = values['email'].lower()
+        values['groups'] = split_groups(row.get('groups'))
+        for field in REQUIRED_FIELDS:
+            if not values[field]:
+                row_errors[field] = "This field is required."
+        if values['username']:
+            try:
+                username_validator(values['username'])
+            except ValidationError as exc:
+                row_errors['username'] = exc.messages[0]
+            if len(values['username']) > 150:
+                row_errors['username'] = "Ensure this field has no more than 150 characters."
+            if values['username'] in seen_usernames:
+                row_errors['username'] = "Duplicate username in import."
+            seen_usernames.add(values['username'])
+        if values['email']:
+            try:
+                validate_email(values['email'])
+            except ValidationError:
+                row_errors['email'] = "Enter a valid email address."
+            if email in seen_emails:
+                row_errors['email'] = "Duplicate e-mail in import."
+            seen_emails.add(email)
+        if row_errors:
+            errors[index] = row_errors
+        else:
+            cleaned.append((index, values))
+
+    taken_usernames = set()
+    taken_emails = set()
+    if cleaned:
+        lookup = Q(username__in=[row['username'] for _, row in cleaned])
+        emails = [row['email'].lower() for _, row in cleaned if row['email']]
+        if emails:
+            lookup |= Q(email_lower__in=emails)
+        for username, email in User.objects.annotate(email_lower=Lower('email')).filter(lookup).values_list(
+                'username', 'email_lower'):
+            taken_usernames.add(username)
+            taken_emails.add(email)
+
+    group_names = {name for _, row in cleaned for name in row['groups']}
+    groups = dict(Group.objects.filter(name__in=group_names).values_list('name', 'id')) if group_names else {}
+
+    valid = []
+    for index, row in cleaned:
+        row_errors = {}
+        if row['username'] in taken_usernames:
+            row_errors['username'] = "Username already exists."
+        if row['email'] and row['email'].lower() in taken_emails:
+            row_errors['email'] = "E-mail already exists"
+        missing = [name for name in row['groups'] if name not in groups]
+        if missing:
+            row_errors['groups'] = f"Unknown groups: {missing}"
+        if row_errors:
+            errors[index] = row_errors
+        else:
+            row['group_ids'] = [groups[name] for name in row['groups']]
+            valid.append((index, row))
+    return valid, errors
+
+
+def hash_passwords(passwords, workers=None):
+    """
+    Hash passwords on a pool of ``workers`` processes (the configured
+    ``WORKERS`` by default); ``workers=0`` hashes inline.  The processes
+    are spawned rather than forked, as callers such as job workers are
+    threaded; they inherit ``DJANGO_SETTINGS_MODULE`` and run
+    ``django.setup()`` before hashing.
+    """
+    if workers is None:
+        workers = import_settings()['WORKERS']
+    if workers == 0 or len(passwords) < 2:
+        return [make_password(password) for password in passwords]
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'peerreview.settings')
+    chunksize = max(len(passwords) // (workers * 4), 1)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=django.setup) as pool:
+        return list(pool.map(make_password, passwords, chunksize=chunksize))
+
+
+def import_users(rows, workers=None, chunk_size=None):
+    """
+    Create users from import rows.
+
+    Valid rows are inserted with ``bulk_create`` in chunks and added to
+    their groups in the same transaction; invalid rows are skipped and
+    reported.  E-mail addresses are unique regardless of case.  Returns
+    ``{"created": int, "errors": [...]}``.
+    """
+    chunk_size = chunk_size or import_settings()['CHUNK_SIZE']
+
+    valid, errors = validate_rows(rows)
+    hashed = hash_passwords([row['password'] for _, row in valid], workers)
+
+    with transaction.atomic():
+        users = [
+            User(username=row['username'], first_name=row['first_name'], last_name=row['last_name'],
+                 email=row['email'], password=password)
+            for (_, row), password in zip(valid, hashed)
+        ]
+        User.objects.bulk_create(users, batch_size=chunk_size)
+
+        grouped = [(row['username'], row['group_ids']) for _, row in valid if row['group_ids']]
+        if grouped:
+            ids = {user.username: user.pk for user in users}
+            if not all(ids.values()):
+                # backends that can't return ids from bulk inserts
+                ids = dict(User.objects.filter(username__in=[username for username, _ in grouped])
+                           .values_list('username', 'id'))
+            User.groups.through.objects.bulk_create([
+                User.groups.through(user_id=ids[username], group_id=group_id)
+                for username, group_ids in grouped for group_id in group_ids
+            ], batch_size=chunk_size)
+            send_membership_changed({group_id for _, group_ids in grouped for group_id in group_ids},
+                                    [ids[username] for username, _ in grouped])
+
+    return {
+        "created": len(valid),
+        "errors": [
+            {"row": index, "username": str(rows[index].get('username') or ''), "errors": row_errors}
+            for index, row_errors in sorted(errors.items())
+        ],
+    }
@@ -25,17 +25,24 @@ const TeamReviewPage = () => {
   useEffect(() => {
     const fetchMetrics = async () => {
       try {
-        const response = await api.get("/metrics/list/", {
-          params: { review_cycle_id: reviewCycleId },
-        });
-        const metricData = response.data || [];
+        // cycle, metrics, participants and the saved draft in one request
+        const response = await api.get(
+          `/review-cycle/${reviewCycleId}/bootstrap/`
+        );
+        const metricData = response.data.metrics || [];
         setMetrics(metricData);
 
-        if (metricData.length > 0 && teamId) {
-          const response = await api.get("/users/list/", {
-            params: { group_id: teamId },
+        const draft = {};
+        response.data.reviewer.draft.ratings.forEach(({ metric, values }) => {
+          draft[metric] = {};
+          values.forEach(({ target_user, value }) => {
+            draft[metric][target_user] = value;
           });
-          const data = response.data;
+        });
+        setRatingsMap(draft);
+
+        if (metricData.length > 0) {
+          const data = response.data.participants;
 
           const processed = data.slice(0, 5).map((user, index) => ({
             id: user.id,